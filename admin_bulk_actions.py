@@ -0,0 +1,482 @@
+#!/usr/bin/env python3
+"""
+Set-Based Admin Bulk Actions
+Bulk order actions (status change, payment status, cancel, refund) and
+withdrawal actions (approve, reject) that take an id list or a filter and
+work chunk by chunk with set-based SQL instead of loading each row as an
+ORM object:
+- matching rows are paged by id (keyset), chunk_size at a time, and locked
+  FOR UPDATE on PostgreSQL so a concurrent callback cannot race the change
+- order status changes and their timeline events go through
+  order_events.bulk_update_order_status() (one INSERT ... SELECT plus one
+  UPDATE per chunk)
+- stock reservations are committed / released per chunk in one statement
+- wallet refunds are one executemany UPDATE per chunk, grouped by user;
+  withdrawal deductions one balance-guarded UPDATE per user
+- notifications are one executemany INSERT per chunk
+- every chunk commits on its own
+
+    POST /api/admin/orders/bulk       {"action": "status", "value": "shipped", "ids": [...]}
+    POST /api/admin/withdrawals/bulk  {"action": "reject", "filters": {"status": "pending"}}
+
+    return bulk_action_response('orders', request.get_json(), admin_id)
+
+Up to ADMIN_BULK_INLINE_LIMIT matching rows (default 1000) are processed in
+the request and the response carries the affected counts; larger batches
+are queued as an admin_bulk_action background job and the response is 202
+with the job id to poll.
+"""
+
+import os
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy import bindparam, text
+
+from background_jobs import create_job, register_job, start_job, update_job
+from inventory_reservations import (
+    commit_orders_reservations, release_orders_reservations, restock_orders_reservations,
+)
+from order_events import (
+    FINAL_STATUSES, STATUS_EVENTS, bulk_record_order_event, bulk_update_order_status,
+)
+
+JOB_TYPE = 'admin_bulk_action'
+DEFAULT_CHUNK_SIZE = 500
+DEFAULT_INLINE_LIMIT = 1000
+
+PAYMENT_STATUSES = ('pending', 'paid', 'failed')
+CANCELLABLE_STATUSES = ('pending', 'confirmed', 'processing')
+
+# target -> (table, {filter name: (WHERE fragment, parser)})
+TARGETS = {
+    'orders': ('orders', {
+        'status': ('status = :status', str),
+        'payment_status': ('payment_status = :payment_status', str),
+        'user_id': ('user_id = :user_id', int),
+        'created_from': ('created_at >= :created_from', datetime.fromisoformat),
+        'created_to': ('created_at < :created_to', datetime.fromisoformat),
+    }),
+    'withdrawals': ('withdrawals', {
+        'status': ('status = :status', str),
+        'user_id': ('user_id = :user_id', int),
+        'requested_from': ('requested_at >= :requested_from', datetime.fromisoformat),
+        'requested_to': ('requested_at < :requested_to', datetime.fromisoformat),
+    }),
+}
+
+
+class BulkActionError(ValueError):
+    """Unknown action, bad value or empty selection; routes return 400"""
+
+
+def get_inline_limit():
+    return int(os.environ.get('ADMIN_BULK_INLINE_LIMIT', DEFAULT_INLINE_LIMIT))
+
+
+def _for_update():
+    from app import db
+    return 'FOR UPDATE' if db.engine.dialect.name == 'postgresql' else ''
+
+
+def _selection(target, ids=None, filters=None):
+    """WHERE clause and params for an id list and/or filters"""
+    table, known = TARGETS[target]
+    clauses, params, expanding = [], {}, []
+    for name, value in (filters or {}).items():
+        if name not in known:
+            raise BulkActionError(f"Unknown {target} filter {name!r}")
+        fragment, parse = known[name]
+        try:
+            params[name] = parse(value)
+        except (TypeError, ValueError):
+            raise BulkActionError(f"Invalid value for filter {name!r}")
+        clauses.append(fragment)
+    if ids is not None:
+        ids = [int(i) for i in ids]
+        if not ids:
+            raise BulkActionError("No ids given")
+        clauses.append('id IN :ids')
+        params['ids'] = ids
+        expanding.append('ids')
+    if not clauses:
+        # Never act on a whole table by accident
+        raise BulkActionError("Give ids or at least one filter")
+    return table, ' AND '.join(clauses), params, expanding
+
+
+def count_matching(target, ids=None, filters=None):
+    from app import db
+
+    table, where, params, expanding = _selection(target, ids, filters)
+    return db.session.execute(text(f"SELECT COUNT(*) FROM {table} WHERE {where}").bindparams(
+        *[bindparam(name, expanding=True) for name in expanding]), params).scalar()
+
+
+def _chunks(target, ids, filters, chunk_size):
+    """Yield id lists in id order; rows changed by earlier chunks are past the cursor"""
+    from app import db
+
+    table, where, params, expanding = _selection(target, ids, filters)
+    statement = text(f"""
+        SELECT id FROM {table} WHERE {where} AND id > :after ORDER BY id LIMIT :limit
+    """).bindparams(*[bindparam(name, expanding=True) for name in expanding])
+    after = 0
+    while True:
+        chunk = db.session.execute(statement, dict(params, after=after, limit=chunk_size)).scalars().all()
+        if not chunk:
+            return
+        yield chunk
+        after = chunk[-1]
+
+
+def _lock_orders(ids, condition, params=None):
+    """Rows of the chunk that are eligible, locked until the chunk commits"""
+    from app import db
+
+    params = dict(params or {}, ids=list(ids))
+    if ':final' in condition:
+        params['final'] = list(FINAL_STATUSES)
+    expanding = [bindparam(name, expanding=True)
+                 for name, value in params.items() if isinstance(value, list)]
+    return db.session.execute(text(f"""
+        SELECT id, user_id, order_number, total_amount, status, payment_status FROM orders
+        WHERE id IN :ids AND {condition}
+        ORDER BY id
+        {_for_update()}
+    """).bindparams(*expanding), params).fetchall()
+
+
+def _notify(rows):
+    """One executemany INSERT of (user_id, title, message) notifications"""
+    from app import db
+    from app.models import Notification
+
+    if not rows:
+        return 0
+    columns = Notification.__table__.c
+    now = datetime.utcnow()
+    values = []
+    for user_id, title, message in rows:
+        row = {'user_id': user_id, 'title': title, 'message': message}
+        if 'is_read' in columns:
+            row['is_read'] = False
+        if 'created_at' in columns:
+            row['created_at'] = now
+        values.append(row)
+    db.session.execute(Notification.__table__.insert(), values)
+    return len(values)
+
+
+def _credit_wallets(totals):
+    """Refund {user_id: amount} to wallets (deposited balance); one executemany UPDATE"""
+    from app import db
+
+    if not totals:
+        return 0
+    return db.session.execute(text("""
+        UPDATE wallets
+        SET balance = balance + :amount,
+            deposited_balance = deposited_balance + :amount
+        WHERE user_id = :user_id
+    """), [{'user_id': user_id, 'amount': amount} for user_id, amount in totals.items()]).rowcount
+
+
+def _refund_orders(rows, actor_id, note, status):
+    """Credit wallets for paid orders and mark them refunded"""
+    from app import db
+
+    totals = defaultdict(Decimal)
+    for row in rows:
+        totals[row.user_id] += Decimal(str(row.total_amount or 0))
+    ids = [row.id for row in rows]
+    _credit_wallets(totals)
+    if status == 'refunded':
+        bulk_update_order_status(ids, 'refunded', actor_id, note)
+    db.session.execute(text("""
+        UPDATE orders SET payment_status = :refunded WHERE id IN :ids
+    """).bindparams(bindparam('ids', expanding=True)), {'refunded': 'refunded', 'ids': ids})
+    return sum(totals.values(), Decimal('0'))
+
+
+def _order_status(ids, value, actor_id, note):
+    if value not in STATUS_EVENTS or value in FINAL_STATUSES:
+        raise BulkActionError(f"Invalid status {value!r}; use the cancel or refund action")
+    rows = _lock_orders(ids, 'status <> :value AND status NOT IN :final', {'value': value})
+    updated = bulk_update_order_status([row.id for row in rows], value, actor_id, note)
+    notified = _notify([(row.user_id, 'Order update',
+                         f"Your order {row.order_number} is now {value}.") for row in rows])
+    return {'updated': updated, 'notified': notified}
+
+
+def _order_payment_status(ids, value, actor_id, note):
+    from app import db
+
+    if value not in PAYMENT_STATUSES:
+        raise BulkActionError(f"Invalid payment status {value!r}")
+    rows = _lock_orders(ids, 'payment_status <> :value AND status NOT IN :final', {'value': value})
+    order_ids = [row.id for row in rows]
+    if not order_ids:
+        return {'updated': 0, 'notified': 0}
+
+    assignments = ['payment_status = :value']
+    params = {'value': value, 'ids': order_ids, 'now': datetime.utcnow()}
+    if value == 'paid':
+        bulk_record_order_event(order_ids, 'paid', actor_id, note)
+        commit_orders_reservations(order_ids)
+        assignments += [
+            'paid_at = COALESCE(paid_at, :now)',
+            "progress_stage = CASE WHEN COALESCE(progress_percentage, 0) < 30"
+            " THEN 'payment_confirmed' ELSE progress_stage END",
+            'progress_percentage = CASE WHEN COALESCE(progress_percentage, 0) < 30'
+            ' THEN 30 ELSE progress_percentage END',
+        ]
+    elif value == 'failed':
+        release_orders_reservations(order_ids)
+    updated = db.session.execute(text(f"""
+        UPDATE orders SET {', '.join(assignments)} WHERE id IN :ids
+    """).bindparams(bindparam('ids', expanding=True)), params).rowcount
+    notified = _notify([(row.user_id, 'Payment update',
+                         f"Payment for order {row.order_number} is now {value}.") for row in rows])
+    return {'updated': updated, 'notified': notified}
+
+
+def _order_cancel(ids, value, actor_id, note):
+    """Cancel open orders, return their stock and refund any that were paid"""
+    rows = _lock_orders(ids, 'status IN :cancellable', {'cancellable': list(CANCELLABLE_STATUSES)})
+    order_ids = [row.id for row in rows]
+    paid = [row for row in rows if row.payment_status == 'paid']
+    refunded = _refund_orders(paid, actor_id, note, 'cancelled') if paid else Decimal('0')
+    updated = bulk_update_order_status(order_ids, 'cancelled', actor_id, note)
+    released = release_orders_reservations(order_ids)
+    # Paid orders hold committed reservations; their stock comes back too
+    restocked = restock_orders_reservations([row.id for row in paid])
+    notified = _notify([(row.user_id, 'Order cancelled',
+                         f"Your order {row.order_number} was cancelled"
+                         + (" and refunded to your wallet." if row.payment_status == 'paid' else "."))
+                        for row in rows])
+    return {'updated': updated, 'refunded_orders': len(paid), 'refunded_amount': float(refunded),
+            'units_restocked': released['units'] + restocked['units'], 'notified': notified}
+
+
+def _order_refund(ids, value, actor_id, note):
+    """
+    Refund paid orders to the customer's wallet and mark them refunded.
+    Orders that had not shipped yet give their stock back: refunded is
+    final, so it could not be returned by a later cancel.
+    """
+    rows = _lock_orders(ids, "payment_status = 'paid' AND status NOT IN :final")
+    unshipped = [row.id for row in rows if row.status in CANCELLABLE_STATUSES]
+    refunded = _refund_orders(rows, actor_id, note, 'refunded') if rows else Decimal('0')
+    released = release_orders_reservations(unshipped)
+    restocked = restock_orders_reservations(unshipped)
+    notified = _notify([(row.user_id, 'Order refunded',
+                         f"KSh {row.total_amount} for order {row.order_number} was refunded to your wallet.")
+                        for row in rows])
+    return {'updated': len(rows), 'refunded_amount': float(refunded),
+            'units_restocked': released['units'] + restocked['units'], 'notified': notified}
+
+
+def _withdrawal_approve(ids, value, actor_id, note):
+    """
+    Approve pending withdrawals user by user: a user's withdrawals in the
+    chunk are approved together only when the wallet balance covers them
+    (as approve_all_withdrawals in manage_pending_withdrawals.py does).
+    Commission balance is drawn down first, then deposited balance, with
+    one guarded UPDATE per user: a user whose wallet no longer covers the
+    total keeps their withdrawals pending and is counted as skipped.
+    """
+    from app import db
+
+    rows = db.session.execute(text(f"""
+        SELECT w.id, w.user_id, w.amount, wl.balance
+        FROM withdrawals w JOIN wallets wl ON wl.user_id = w.user_id
+        WHERE w.id IN :ids AND w.status = :pending
+        ORDER BY w.user_id, w.id
+        {_for_update()}
+    """).bindparams(bindparam('ids', expanding=True)),
+        {'ids': list(ids), 'pending': 'pending'}).fetchall()
+
+    totals, balances, by_user = defaultdict(Decimal), {}, defaultdict(list)
+    for row in rows:
+        totals[row.user_id] += Decimal(str(row.amount))
+        balances[row.user_id] = Decimal(str(row.balance or 0))
+        by_user[row.user_id].append(row)
+    approved_users = [user_id for user_id, total in totals.items() if total <= balances[user_id]]
+    skipped = sum(len(by_user[user_id]) for user_id in totals if user_id not in approved_users)
+    if not approved_users:
+        return {'updated': 0, 'skipped_insufficient_balance': skipped, 'notified': 0}
+
+    deduct = text("""
+        UPDATE wallets
+        SET commission_balance = commission_balance
+                - CASE WHEN commission_balance >= :total THEN :total ELSE commission_balance END,
+            deposited_balance = deposited_balance
+                - CASE WHEN commission_balance >= :total THEN 0 ELSE :total - commission_balance END,
+            balance = balance - :total
+        WHERE user_id = :user_id AND balance >= :total
+    """)
+    # executemany rowcounts are not reliable across drivers, so check each user
+    deducted = [user_id for user_id in approved_users
+                if db.session.execute(deduct, {'user_id': user_id,
+                                               'total': totals[user_id]}).rowcount == 1]
+    skipped += sum(len(by_user[user_id]) for user_id in approved_users if user_id not in deducted)
+    approved_users = deducted
+    if not approved_users:
+        return {'updated': 0, 'skipped_insufficient_balance': skipped, 'notified': 0}
+
+    now = datetime.utcnow()
+    approved = [row for user_id in approved_users for row in by_user[user_id]]
+    updated = db.session.execute(text("""
+        UPDATE withdrawals
+        SET status = :completed, transaction_id = :transaction_id, paid_at = :now
+        WHERE id IN :ids AND status = :pending
+    """).bindparams(bindparam('ids', expanding=True)), {
+        'completed': 'completed', 'pending': 'pending', 'now': now,
+        'transaction_id': f'BULK_APPROVAL_{now.strftime("%Y%m%d_%H%M%S")}',
+        'ids': [row.id for row in approved]}).rowcount
+    notified = _notify([(row.user_id, 'Withdrawal approved',
+                         f"Your withdrawal of KSh {row.amount} was approved.") for row in approved])
+    return {'updated': updated, 'skipped_insufficient_balance': skipped, 'notified': notified}
+
+
+def _withdrawal_reject(ids, value, actor_id, note):
+    """Nothing was deducted for pending withdrawals, so no wallet change"""
+    from app import db
+
+    rows = db.session.execute(text(f"""
+        SELECT id, user_id, amount FROM withdrawals
+        WHERE id IN :ids AND status = :pending
+        ORDER BY id
+        {_for_update()}
+    """).bindparams(bindparam('ids', expanding=True)),
+        {'ids': list(ids), 'pending': 'pending'}).fetchall()
+    if not rows:
+        return {'updated': 0, 'notified': 0}
+    updated = db.session.execute(text("""
+        UPDATE withdrawals SET status = :failed WHERE id IN :ids AND status = :pending
+    """).bindparams(bindparam('ids', expanding=True)),
+        {'failed': 'failed', 'pending': 'pending', 'ids': [row.id for row in rows]}).rowcount
+    reason = f" Reason: {note}" if note else ''
+    notified = _notify([(row.user_id, 'Withdrawal rejected',
+                         f"Your withdrawal of KSh {row.amount} was rejected.{reason}") for row in rows])
+    return {'updated': updated, 'notified': notified}
+
+
+# target -> action -> chunk handler(ids, value, actor_id, note) -> counts
+ACTIONS = {
+    'orders': {
+        'status': _order_status,
+        'payment_status': _order_payment_status,
+        'cancel': _order_cancel,
+        'refund': _order_refund,
+    },
+    'withdrawals': {
+        'approve': _withdrawal_approve,
+        'reject': _withdrawal_reject,
+    },
+}
+
+
+def _handler(target, action):
+    if target not in ACTIONS:
+        raise BulkActionError(f"Unknown bulk target {target!r}")
+    if action not in ACTIONS[target]:
+        raise BulkActionError(f"Unknown {target} action {action!r}")
+    return ACTIONS[target][action]
+
+
+def run_bulk_action(target, action, ids=None, filters=None, value=None, actor_id=None,
+                    note=None, chunk_size=DEFAULT_CHUNK_SIZE, progress=None):
+    """Apply the action chunk by chunk, committing each; returns summed counts"""
+    from app import db
+
+    handler = _handler(target, action)
+    summary = {'matched': 0, 'chunks': 0}
+    for chunk in _chunks(target, ids, filters, chunk_size):
+        try:
+            counts = handler(chunk, value, actor_id, note)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        summary['matched'] += len(chunk)
+        summary['chunks'] += 1
+        for key, count in counts.items():
+            summary[key] = summary.get(key, 0) + count
+        if progress:
+            progress(dict(summary))
+    return summary
+
+
+def request_bulk_action(app, target, action, ids=None, filters=None, value=None,
+                        actor_id=None, note=None):
+    """
+    Run small batches now, queue large ones. Returns (result, queued):
+    the counts, or {'job_id': ..., 'matched': n} when queued.
+    """
+    from app import db
+
+    _handler(target, action)
+    matched = count_matching(target, ids, filters)
+    if matched <= get_inline_limit():
+        return run_bulk_action(target, action, ids, filters, value, actor_id, note), False
+
+    job_id = create_job(JOB_TYPE, {
+        'target': target, 'action': action, 'ids': ids, 'filters': filters,
+        'value': value, 'actor_id': actor_id, 'note': note,
+    }, created_by=actor_id)
+    db.session.commit()
+    start_job(app, job_id)
+    return {'job_id': job_id, 'matched': matched}, True
+
+
+def bulk_action_response(target, data, actor_id=None):
+    """Flask response for POST /api/admin/<target>/bulk"""
+    from flask import current_app, jsonify
+
+    data = data or {}
+    try:
+        result, queued = request_bulk_action(
+            current_app._get_current_object(), target, data.get('action'),
+            ids=data.get('ids'), filters=data.get('filters'), value=data.get('value'),
+            actor_id=actor_id, note=data.get('note'))
+    except BulkActionError as e:
+        return jsonify({'error': str(e)}), 400
+    if queued:
+        return jsonify(dict(result, status='queued')), 202
+    return jsonify(result), 200
+
+
+@register_job(JOB_TYPE)
+def run_admin_bulk_action(job_id, payload):
+    return run_bulk_action(
+        payload['target'], payload['action'],
+        ids=payload.get('ids'), filters=payload.get('filters'), value=payload.get('value'),
+        actor_id=payload.get('actor_id'), note=payload.get('note'),
+        progress=lambda progress: update_job(job_id, progress=progress))
+
+
+if __name__ == "__main__":
+    import json
+    import sys
+
+    from app import create_app
+
+    if len(sys.argv) < 4:
+        print("Usage: python admin_bulk_actions.py <orders|withdrawals> <action> '<filters json>' [value]")
+        print("       e.g. orders status '{\"status\": \"processing\"}' shipped")
+        sys.exit(1)
+
+    app = create_app()
+    with app.app_context():
+        target, action, filters = sys.argv[1], sys.argv[2], json.loads(sys.argv[3])
+        value = sys.argv[4] if len(sys.argv) > 4 else None
+        print(f"🔄 {target}: {action} {value or ''} where {filters}")
+        print(f"   Matching rows: {count_matching(target, filters=filters)}")
+        result = run_bulk_action(target, action, filters=filters, value=value,
+                                 progress=lambda p: print(f"   ... {p['matched']} processed"))
+        for key, count in result.items():
+            print(f"   {key}: {count}")
+        print("✅ Bulk action finished")
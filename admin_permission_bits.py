@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Compiled Admin Permission Bitsets
+Each AdminRole's permission list is compiled into an integer bitset that is
+stored on the role (admin_roles.permission_bits) and embedded in the admin
+JWT as the 'perm_bits' claim. Permission checks become a bitwise AND against
+the token, with no DB access.
+
+Stored bitsets are read through the versioned cache 'admin_role_bits'
+(cache_versions), so a recompile in another process (recompile_all_roles,
+fix_permissions_final.py) reaches every worker within one poll interval.
+A recompile that changes a role's bits also bumps its admins' auth_version,
+and bits_permission_required() rejects tokens with a stale version or for
+a deactivated admin (identity_cache.get_current_identity).
+
+PERMISSIONS is append-only: a permission's bit is its index in the list, so
+never reorder or remove entries (tokens in flight depend on them).
+"""
+
+from functools import wraps
+
+from flask import jsonify
+from sqlalchemy import text
+
+from identity_cache import ADMIN, bump_role_identity_versions, get_current_identity
+from versioned_cache import VersionedCache, bump_cache_version
+
+PERMISSIONS = [
+    'view_dashboard',
+    'view_analytics',
+    'view_reports',
+    'view_users',
+    'manage_users',
+    'delete_users',
+    'view_products',
+    'create_products',
+    'manage_products',
+    'delete_products',
+    'manage_inventory',
+    'manage_categories',
+    'manage_brands',
+    'view_orders',
+    'manage_orders',
+    'delete_orders',
+    'view_cyber_services',
+    'create_cyber_service',
+    'manage_cyber_services',
+    'manage_cyber_service_orders',
+    'view_commissions',
+    'manage_commissions',
+    'view_withdrawals',
+    'manage_withdrawals',
+    'manage_coupons',
+    'manage_shipping',
+    'manage_taxes',
+    'view_settings',
+    'create_settings',
+    'manage_settings',
+    'manage_system_settings',
+    'view_admin_users',
+    'create_admin_users',
+    'delete_admin_users',
+    'manage_admins',
+    'manage_admin_users',
+    'manage_roles',
+    'manage_admin_roles',
+    'view_logs',
+    'view_activity_logs',
+    'view_system_monitor',
+    'manage_backups',
+    'manage_api_keys',
+    'manage_email_templates',
+    'manage_feature_flags',
+    'manage_maintenance_mode',
+]
+
+PERMISSION_BITS = {name: 1 << index for index, name in enumerate(PERMISSIONS)}
+ALL_PERMISSIONS = (1 << len(PERMISSIONS)) - 1
+
+# Admin portal menu sections and the permission that shows each one
+MENU_PERMISSIONS = {
+    'dashboard': 'view_dashboard',
+    'analytics': 'view_analytics',
+    'users': 'view_users',
+    'products': 'manage_products',
+    'orders': 'manage_orders',
+    'cyber_services': 'manage_cyber_services',
+    'commissions': 'view_commissions',
+    'withdrawals': 'manage_withdrawals',
+    'settings': 'manage_settings',
+    'admin_users': 'manage_admin_users',
+    'logs': 'view_logs',
+}
+
+ROLE_BITS_CACHE = 'admin_role_bits'
+
+
+def compile_permissions(permissions):
+    """Compile a role's permission list (may contain '*') into a bitset"""
+    bits = 0
+    for permission in permissions or []:
+        if permission == '*':
+            return ALL_PERMISSIONS
+        bits |= PERMISSION_BITS.get(permission, 0)
+    return bits
+
+
+def unknown_permissions(permissions):
+    """Permission names with no bit assigned (append them to PERMISSIONS)"""
+    return [p for p in permissions or [] if p != '*' and p not in PERMISSION_BITS]
+
+
+def has_permission_bits(bits, permission):
+    bit = PERMISSION_BITS.get(permission)
+    return bool(bit) and (int(bits) & bit) == bit
+
+
+def decode_permissions(bits):
+    return [name for name, bit in PERMISSION_BITS.items() if int(bits) & bit]
+
+
+def load_role_bits():
+    """Stored bitset of every role, {role_id: bits}"""
+    from app import db
+
+    rows = db.session.execute(text("""
+        SELECT id, permission_bits FROM admin_roles WHERE permission_bits IS NOT NULL
+    """)).fetchall()
+    return {row.id: int(row.permission_bits) for row in rows}
+
+
+role_bits_cache = VersionedCache(ROLE_BITS_CACHE, load_role_bits)
+
+
+def compile_role(role):
+    """
+    Recompute and store admin_roles.permission_bits; caller commits.
+    The column is not mapped on AdminRole, so it is read and written in SQL.
+    """
+    from app import db
+
+    bits = compile_permissions(role.permissions)
+    stored = db.session.execute(text("""
+        SELECT permission_bits FROM admin_roles WHERE id = :role_id
+    """), {'role_id': role.id}).scalar()
+    if stored is not None and int(stored) == bits:
+        return bits
+
+    db.session.execute(text("""
+        UPDATE admin_roles SET permission_bits = :bits WHERE id = :role_id
+    """), {'bits': bits, 'role_id': role.id})
+    bump_cache_version(ROLE_BITS_CACHE)
+    if stored is not None:
+        # Tokens issued with the old bits must log in again
+        bump_role_identity_versions(role.id)
+    return bits
+
+
+def get_role_bits(role):
+    """Stored bitset for a role, falling back to compiling its list"""
+    if role is None:
+        return 0
+    bits, _ = role_bits_cache.get()
+    if role.id in bits:
+        return bits[role.id]
+    return compile_permissions(role.permissions)
+
+
+def invalidate_role_bits(role_id=None):
+    """Reload stored bitsets in every worker; caller commits"""
+    bump_cache_version(ROLE_BITS_CACHE)
+
+
+def get_admin_bits(admin):
+    if admin.is_super_admin:
+        return ALL_PERMISSIONS
+    if not admin.is_active or not admin.role:
+        return 0
+    return get_role_bits(admin.role)
+
+
+def admin_token_claims(admin):
+    """additional_claims for create_access_token() at admin login/refresh"""
+    bits = get_admin_bits(admin)
+    return {
+        # String so JS clients do not lose precision past 2**53
+        'perm_bits': str(bits),
+        'menu': get_menu_visibility(bits),
+        # Checked against the account by bits_permission_required()
+        'ver': getattr(admin, 'auth_version', 0) or 0,
+    }
+
+
+def get_token_bits():
+    from flask_jwt_extended import get_jwt
+    try:
+        return int(get_jwt().get('perm_bits', 0))
+    except (TypeError, ValueError):
+        return 0
+
+
+def get_menu_visibility(bits):
+    """Menu sections visible for a bitset, served without a round-trip"""
+    return [menu for menu, permission in MENU_PERMISSIONS.items()
+            if has_permission_bits(bits, permission)]
+
+
+def bits_permission_required(permission):
+    """
+    Like admin permission_required, but checks the token bitset. The admin
+    behind the token must still be active with the token's auth_version
+    (a cached identity lookup, no query while warm).
+    """
+    if permission not in PERMISSION_BITS:
+        raise ValueError(f"Unknown admin permission: {permission}")
+
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            from flask_jwt_extended import verify_jwt_in_request
+            verify_jwt_in_request()
+            identity = get_current_identity(ADMIN)
+            if identity is None or not identity.is_active:
+                return jsonify({'error': 'Session expired, please log in again'}), 401
+            if not has_permission_bits(get_token_bits(), permission):
+                return jsonify({'error': f'Permission denied: {permission} required'}), 403
+            return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def recompile_all_roles():
+    """Recompile every role's bitset (run after editing role permissions)"""
+    from app import db
+    from app.models import AdminRole
+
+    results = []
+    for role in AdminRole.query.all():
+        bits = compile_role(role)
+        results.append((role, bits, unknown_permissions(role.permissions)))
+    db.session.commit()
+    return results
+
+
+if __name__ == "__main__":
+    from app import create_app
+
+    app = create_app()
+    with app.app_context():
+        print("🔐 Compiling admin role permission bitsets")
+        print("=" * 50)
+        for role, bits, unknown in recompile_all_roles():
+            print(f"👑 {role.name}: {bits:#x} ({len(decode_permissions(bits))} permissions)")
+            if unknown:
+                print(f"   ⚠️  Unknown permissions (no bit assigned): {unknown}")
+        print("✅ Role bitsets compiled")
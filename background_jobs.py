@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Background Jobs
+Minimal DB-backed job table for admin work that is too slow for a request
+(user deletion, bulk imports, bulk admin actions). Jobs run in a daemon
+thread of the web worker by default; set BACKGROUND_JOBS_INLINE=false and run
+`python background_jobs.py` on a worker dyno to process them out of band.
+
+A running job's updated_at is its lease: update_job() renews it with every
+progress report. Jobs whose worker died (dyno restart mid-job) stop
+renewing and are claimed again once updated_at is older than
+BACKGROUND_JOB_LEASE_SECONDS (default 1800), so handlers must be safe to
+re-run. The worker loop picks them up; with inline jobs, every start_job()
+thread sweeps them after its own job.
+
+Run migrate_background_jobs.py once to create the background_jobs table.
+"""
+
+import json
+import os
+import threading
+import time
+import traceback
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+QUEUED = 'queued'
+RUNNING = 'running'
+COMPLETED = 'completed'
+FAILED = 'failed'
+
+DEFAULT_LEASE_SECONDS = 1800
+
+# job_type -> handler(job_id, payload); registered by the job modules
+JOB_HANDLERS = {}
+
+
+def register_job(job_type):
+    def decorator(fn):
+        JOB_HANDLERS[job_type] = fn
+        return fn
+    return decorator
+
+
+def create_job(job_type, payload=None, created_by=None):
+    """Insert a queued job and return its id; caller commits"""
+    from app import db
+
+    now = datetime.utcnow()
+    params = {
+        'job_type': job_type,
+        'status': QUEUED,
+        'payload': json.dumps(payload or {}),
+        'progress': json.dumps({}),
+        'created_by': created_by,
+        'created_at': now,
+        'updated_at': now,
+    }
+    if db.engine.dialect.name == 'postgresql':
+        return db.session.execute(text("""
+            INSERT INTO background_jobs
+                (job_type, status, payload, progress, created_by, created_at, updated_at)
+            VALUES
+                (:job_type, :status, :payload, :progress, :created_by, :created_at, :updated_at)
+            RETURNING id
+        """), params).scalar()
+
+    result = db.session.execute(text("""
+        INSERT INTO background_jobs
+            (job_type, status, payload, progress, created_by, created_at, updated_at)
+        VALUES
+            (:job_type, :status, :payload, :progress, :created_by, :created_at, :updated_at)
+    """), params)
+    return result.lastrowid
+
+
+def update_job(job_id, status=None, progress=None, result=None, error=None):
+    """Update a job row and commit so progress is visible to pollers"""
+    from app import db
+
+    assignments = ['updated_at = :updated_at']
+    params = {'job_id': job_id, 'updated_at': datetime.utcnow()}
+    if status is not None:
+        assignments.append('status = :status')
+        params['status'] = status
+    if progress is not None:
+        assignments.append('progress = :progress')
+        params['progress'] = json.dumps(progress)
+    if result is not None:
+        assignments.append('result = :result')
+        params['result'] = json.dumps(result)
+    if error is not None:
+        assignments.append('error = :error')
+        params['error'] = error[:2000]
+
+    db.session.execute(text(f"""
+        UPDATE background_jobs SET {', '.join(assignments)} WHERE id = :job_id
+    """), params)
+    db.session.commit()
+
+
+def get_job(job_id):
+    """Job as a dict for admin progress endpoints, or None"""
+    from app import db
+
+    row = db.session.execute(text("""
+        SELECT id, job_type, status, payload, progress, result, error,
+               created_by, created_at, updated_at
+        FROM background_jobs WHERE id = :job_id
+    """), {'job_id': job_id}).mappings().first()
+    if not row:
+        return None
+
+    job = dict(row)
+    for field in ('payload', 'progress', 'result'):
+        job[field] = json.loads(job[field]) if job[field] else None
+    for field in ('created_at', 'updated_at'):
+        if job[field] is not None and not isinstance(job[field], str):
+            job[field] = job[field].isoformat()
+    return job
+
+
+def _lease_cutoff():
+    lease = int(os.environ.get('BACKGROUND_JOB_LEASE_SECONDS', DEFAULT_LEASE_SECONDS))
+    return datetime.utcnow() - timedelta(seconds=lease)
+
+
+def _claim_job(job_id):
+    """
+    Move a queued job, or a running one whose lease expired, to running;
+    False if another worker holds it
+    """
+    from app import db
+
+    claimed = db.session.execute(text("""
+        UPDATE background_jobs
+        SET status = :running, updated_at = :now
+        WHERE id = :job_id
+          AND (status = :queued OR (status = :running AND updated_at < :stale))
+    """), {'running': RUNNING, 'queued': QUEUED, 'job_id': job_id,
+           'now': datetime.utcnow(), 'stale': _lease_cutoff()}).rowcount
+    db.session.commit()
+    return claimed == 1
+
+
+def run_job(job_id):
+    """Run a job synchronously inside the current app context"""
+    from app import db
+
+    if not _claim_job(job_id):
+        return False
+
+    job = get_job(job_id)
+    handler = JOB_HANDLERS.get(job['job_type'])
+    if handler is None:
+        update_job(job_id, status=FAILED, error=f"No handler for {job['job_type']}")
+        return False
+
+    try:
+        result = handler(job_id, job['payload'])
+        update_job(job_id, status=COMPLETED, result=result or {})
+        return True
+    except Exception as e:
+        db.session.rollback()
+        print(f"❌ Job {job_id} ({job['job_type']}) failed: {str(e)}")
+        traceback.print_exc()
+        update_job(job_id, status=FAILED, error=str(e))
+        return False
+    finally:
+        db.session.remove()
+
+
+def inline_jobs_enabled():
+    return os.environ.get('BACKGROUND_JOBS_INLINE', 'true').lower() != 'false'
+
+
+def start_job(app, job_id):
+    """Kick off a committed job in a daemon thread (when inline jobs are on)"""
+    if not inline_jobs_enabled():
+        return None
+
+    def target():
+        with app.app_context():
+            run_job(job_id)
+            # No worker loop runs inline: pick up jobs a crashed process left
+            run_pending_jobs(once=True)
+
+    thread = threading.Thread(target=target, name=f'background-job-{job_id}', daemon=True)
+    thread.start()
+    return thread
+
+
+def run_pending_jobs(poll_seconds=5, once=False):
+    """Worker loop: process queued and abandoned running jobs oldest first"""
+    from app import db
+
+    while True:
+        job_ids = [row.id for row in db.session.execute(text("""
+            SELECT id FROM background_jobs
+            WHERE status = :queued OR (status = :running AND updated_at < :stale)
+            ORDER BY id
+            LIMIT 20
+        """), {'queued': QUEUED, 'running': RUNNING, 'stale': _lease_cutoff()})]
+        db.session.commit()
+
+        for job_id in job_ids:
+            print(f"🔄 Running job {job_id}...")
+            run_job(job_id)
+
+        if once:
+            return
+        if not job_ids:
+            time.sleep(poll_seconds)
+
+
+if __name__ == "__main__":
+    from app import create_app
+
+    # Import job modules so their handlers register
+    import admin_bulk_actions  # noqa: F401
+    import catalog_import  # noqa: F401
+    import image_variants  # noqa: F401
+    import item_storage  # noqa: F401
+    import stale_sweeper  # noqa: F401
+    import user_deletion_job  # noqa: F401
+
+    app = create_app()
+    with app.app_context():
+        print("🔄 Background job worker started")
+        run_pending_jobs()
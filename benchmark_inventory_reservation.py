@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Benchmark checkout stock decrements against a single hot SKU
+Runs concurrent checkouts that each buy one unit, first with the ORM
+read-check-write the order routes used to do, then with the atomic
+reservations from inventory_reservations.py, and reports checkouts per
+second, oversold units and final stock. The product's stock is restored and
+the benchmark reservations deleted afterwards.
+
+Usage: python benchmark_inventory_reservation.py --product-id 1 [--stock 200] [--checkouts 400] [--threads 16]
+"""
+
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import text
+
+from app import create_app, db
+from app.models import Product
+from inventory_reservations import OutOfStock, reserve_order_items
+
+# Synthetic order ids far below any real order
+ORDER_ID_BASE = -1_000_000
+
+
+def orm_checkout(app, product_id, order_id):
+    with app.app_context():
+        try:
+            product = Product.query.get(product_id)
+            if product.stock_quantity < 1:
+                db.session.rollback()
+                return False
+            product.stock_quantity = product.stock_quantity - 1
+            db.session.commit()
+            return True
+        except Exception:
+            db.session.rollback()
+            raise
+
+
+def atomic_checkout(app, product_id, order_id):
+    with app.app_context():
+        try:
+            reserve_order_items(order_id, [(product_id, 1)])
+            db.session.commit()
+            return True
+        except OutOfStock:
+            db.session.rollback()
+            return False
+
+
+def run(app, checkout, product_id, stock, checkouts, threads):
+    with app.app_context():
+        db.session.execute(text("UPDATE products SET stock_quantity = :stock WHERE id = :id"),
+                           {'stock': stock, 'id': product_id})
+        db.session.commit()
+
+    counter = iter(range(checkouts))
+    lock = threading.Lock()
+
+    def next_order_id(_):
+        with lock:
+            return ORDER_ID_BASE - next(counter)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(
+            lambda i: checkout(app, product_id, next_order_id(i)), range(checkouts)))
+    elapsed = time.perf_counter() - start
+
+    with app.app_context():
+        final_stock = db.session.execute(
+            text("SELECT stock_quantity FROM products WHERE id = :id"), {'id': product_id}).scalar()
+
+    sold = sum(results)
+    return {
+        'per_second': checkouts / elapsed,
+        'sold': sold,
+        'oversold': max(0, sold - stock),
+        'final_stock': final_stock,
+        'lost_updates': (stock - sold) - final_stock,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark hot-SKU checkout stock decrements')
+    parser.add_argument('--product-id', type=int, required=True)
+    parser.add_argument('--stock', type=int, default=200)
+    parser.add_argument('--checkouts', type=int, default=400)
+    parser.add_argument('--threads', type=int, default=16)
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        original_stock = db.session.execute(
+            text("SELECT stock_quantity FROM products WHERE id = :id"),
+            {'id': args.product_id}).scalar()
+    if original_stock is None:
+        print(f"❌ Product {args.product_id} not found")
+        return
+
+    print("📦 Hot SKU Checkout Benchmark")
+    print("=" * 60)
+    print(f"Product {args.product_id}   Stock: {args.stock}   "
+          f"Checkouts: {args.checkouts}   Threads: {args.threads}")
+    print()
+    print(f"{'Method':<10}  {'Checkouts/s':>11}  {'Sold':>6}  {'Oversold':>8}  {'Lost upd.':>9}  {'Stock':>6}")
+
+    try:
+        for label, checkout in [('ORM', orm_checkout), ('Atomic', atomic_checkout)]:
+            result = run(app, checkout, args.product_id, args.stock, args.checkouts, args.threads)
+            print(f"{label:<10}  {result['per_second']:>11.1f}  {result['sold']:>6}  "
+                  f"{result['oversold']:>8}  {result['lost_updates']:>9}  {result['final_stock']:>6}")
+    finally:
+        with app.app_context():
+            db.session.execute(text("DELETE FROM inventory_reservations WHERE order_id <= :base"),
+                               {'base': ORDER_ID_BASE})
+            db.session.execute(text("UPDATE products SET stock_quantity = :stock WHERE id = :id"),
+                               {'stock': original_stock, 'id': args.product_id})
+            db.session.commit()
+        print()
+        print(f"✅ Restored product {args.product_id} stock to {original_stock}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark order creation throughput
+Creates orders of 1, 5 and 20 items through order_pipeline.create_order()
+and reports orders per second and SQL statements per order. Every benchmark
+order is removed afterwards and its reserved stock given back.
+
+Usage: python benchmark_order_creation.py [--orders 50] [--sizes 1 5 20] [--user-id 1]
+"""
+
+import argparse
+import time
+
+from sqlalchemy import text
+
+from app import create_app, db
+from app.models import Order, OrderItem, Payment, Product, User
+from inventory_reservations import release_order_reservations
+from order_pipeline import create_order
+from serialization import count_queries
+
+
+def cleanup(order_ids):
+    for order_id in order_ids:
+        release_order_reservations(order_id)
+    if order_ids:
+        db.session.execute(text("DELETE FROM inventory_reservations WHERE order_id IN ({})".format(
+            ','.join(str(int(i)) for i in order_ids))))
+        Payment.query.filter(Payment.order_id.in_(order_ids)).delete(synchronize_session=False)
+        OrderItem.query.filter(OrderItem.order_id.in_(order_ids)).delete(synchronize_session=False)
+        Order.query.filter(Order.id.in_(order_ids)).delete(synchronize_session=False)
+    db.session.commit()
+
+
+def benchmark(user_id, product_ids, size, orders):
+    items = [(product_id, 1) for product_id in product_ids[:size]]
+    created = []
+    statements = 0
+    start = time.perf_counter()
+    try:
+        for i in range(orders):
+            with count_queries() as counter:
+                order = create_order(user_id, items, payment_fields={
+                    'phone_number': '254700000000',
+                    'checkout_request_id': f'bench_{size}_{i}_{int(time.time() * 1000)}',
+                })
+            statements += counter['count']
+            created.append(order.id)
+        elapsed = time.perf_counter() - start
+    finally:
+        cleanup(created)
+    return {
+        'size': size,
+        'per_second': orders / elapsed,
+        'ms_per_order': elapsed / orders * 1000,
+        'statements': statements / orders,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark single-transaction order creation')
+    parser.add_argument('--orders', type=int, default=50)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 5, 20])
+    parser.add_argument('--user-id', type=int)
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        user_id = args.user_id or User.query.order_by(User.id).first().id
+        needed = max(args.sizes)
+        product_ids = [p.id for p in Product.query.filter(
+            Product.is_active.is_(True), Product.stock_quantity >= args.orders
+        ).order_by(Product.id).limit(needed)]
+        if len(product_ids) < needed:
+            print(f"❌ Need {needed} active products with stock >= {args.orders}, found {len(product_ids)}")
+            return
+
+        print("🛒 Order Creation Benchmark")
+        print("=" * 60)
+        print(f"User {user_id}   Orders per size: {args.orders}")
+        print()
+        print(f"{'Items':>5}  {'Orders/s':>9}  {'ms/order':>9}  {'SQL/order':>9}")
+        for size in args.sizes:
+            result = benchmark(user_id, product_ids, size, args.orders)
+            print(f"{result['size']:>5}  {result['per_second']:>9.1f}  {result['ms_per_order']:>9.1f}"
+                  f"  {result['statements']:>9.1f}")
+        print()
+        print("✅ Benchmark orders removed and stock restored")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Benchmark password hashing throughput
+Reports bcrypt hashes per second per core for each cost factor so dynos can
+be sized for login storms.
+
+Usage: python benchmark_password_hashing.py [--rounds 10 11 12] [--hashes 64]
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from password_hashing import PasswordHasher
+
+
+def benchmark(rounds, hashes, workers):
+    """Hash `hashes` passwords at `rounds` through a pool of `workers`"""
+    hasher = PasswordHasher(max_workers=workers, queue_limit=hashes, timeout=300)
+    # Warm the pool so process start-up is not measured
+    hasher.hash_password('warmup', rounds=4)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=hashes) as submitters:
+        list(submitters.map(lambda i: hasher.hash_password(f'password-{i}', rounds=rounds),
+                            range(hashes)))
+    elapsed = time.perf_counter() - start
+
+    metrics = hasher.get_metrics()
+    hasher.shutdown()
+
+    per_second = hashes / elapsed
+    return {
+        'rounds': rounds,
+        'elapsed': elapsed,
+        'per_second': per_second,
+        'per_core': per_second / workers,
+        'latency_ms': elapsed / hashes * workers * 1000,
+        'peak_queue_depth': metrics['peak_queue_depth'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark bcrypt hashing pool')
+    parser.add_argument('--rounds', type=int, nargs='+', default=[10, 11, 12, 13])
+    parser.add_argument('--hashes', type=int, default=64)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    print("🔐 Password Hashing Benchmark")
+    print("=" * 60)
+    print(f"Workers: {args.workers}   Hashes per run: {args.hashes}")
+    print()
+    print(f"{'Cost':>4}  {'Hashes/s':>10}  {'Per core':>10}  {'Latency ms':>10}  {'Peak queue':>10}")
+
+    for rounds in args.rounds:
+        result = benchmark(rounds, args.hashes, args.workers)
+        print(f"{result['rounds']:>4}  {result['per_second']:>10.1f}  {result['per_core']:>10.1f}"
+              f"  {result['latency_ms']:>10.1f}  {result['peak_queue_depth']:>10}")
+
+    print()
+    print("💡 Logins/s a dyno can absorb ≈ per-core rate × cores available to the pool")
+
+
+if __name__ == "__main__":
+    main()
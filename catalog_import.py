@@ -0,0 +1,423 @@
+#!/usr/bin/env python3
+"""
+Streaming Catalog Import/Export
+Loads CSV or JSONL product catalogs in validated chunks with set-based
+upserts keyed by slug (PostgreSQL COPY into a staging table, then
+INSERT ... ON CONFLICT; SQLite uses INSERT ... ON CONFLICT directly), and
+streams the catalog back out as JSONL. Categories and brands referenced by
+slug are upserted first; images are replaced per product.
+Columns a row leaves out keep their stored values (new products get
+INSERT_DEFAULTS), and lines that cannot be parsed are reported as row
+errors like any other validation failure.
+
+The admin endpoint saves the upload and queues a `catalog_import` background
+job (see background_jobs.py); the export endpoint streams export_catalog().
+
+Usage:
+    python catalog_import.py import catalog.csv [--chunk-size 1000]
+    python catalog_import.py import catalog.jsonl
+    python catalog_import.py export catalog.jsonl
+
+CSV columns are product columns plus `category`, `brand` (slugs or names)
+and `images` (URLs separated by |). JSONL rows use a list for `images`.
+"""
+
+import csv
+import io
+import json
+import re
+import sys
+import time
+from decimal import Decimal, InvalidOperation
+
+from sqlalchemy import select
+
+from background_jobs import register_job, update_job
+
+DEFAULT_CHUNK_SIZE = 1000
+JOB_TYPE = 'catalog_import'
+
+PRODUCT_FIELDS = [
+    'name', 'slug', 'description', 'short_description', 'price', 'original_price',
+    'sku', 'stock_quantity', 'weight', 'dimensions', 'color', 'warranty_period',
+    'is_active', 'is_featured', 'meta_title', 'meta_description', 'keywords', 'image_url',
+]
+DECIMAL_FIELDS = {'price', 'original_price'}
+INT_FIELDS = {'stock_quantity'}
+FLOAT_FIELDS = {'weight'}
+BOOL_FIELDS = {'is_active', 'is_featured'}
+REQUIRED_FIELDS = {'name', 'price'}
+# Applied to new products only; an update never overwrites a column the row left out
+INSERT_DEFAULTS = {'is_active': True, 'is_featured': False, 'stock_quantity': 0}
+
+
+def slugify(value):
+    return re.sub(r'[^a-z0-9]+', '-', (value or '').lower()).strip('-')
+
+
+def _to_bool(value):
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ('1', 'true', 'yes', 'y')
+
+
+def validate_row(raw, line_number):
+    """Return (clean row, None) or (None, error message)"""
+    if not isinstance(raw, dict):
+        return None, f"line {line_number}: expected an object, got {type(raw).__name__}"
+    row = {}
+    for field in PRODUCT_FIELDS:
+        value = raw.get(field)
+        if value is None or value == '':
+            continue
+        try:
+            if field in DECIMAL_FIELDS:
+                value = Decimal(str(value))
+                if value < 0:
+                    raise ValueError('must not be negative')
+            elif field in INT_FIELDS:
+                value = int(value)
+            elif field in FLOAT_FIELDS:
+                value = float(value)
+            elif field in BOOL_FIELDS:
+                value = _to_bool(value)
+            else:
+                value = str(value).strip()
+        except (ValueError, InvalidOperation) as e:
+            return None, f"line {line_number}: invalid {field} {raw.get(field)!r} ({e})"
+        row[field] = value
+
+    missing = REQUIRED_FIELDS - row.keys()
+    if missing:
+        return None, f"line {line_number}: missing {', '.join(sorted(missing))}"
+
+    row['slug'] = slugify(row.get('slug') or row['name'])
+
+    images = raw.get('images') or []
+    if isinstance(images, str):
+        images = [url.strip() for url in images.split('|') if url.strip()]
+    elif not isinstance(images, list):
+        return None, f"line {line_number}: invalid images {images!r} (expected a list)"
+    row['_images'] = [str(url) for url in images]
+    row['_category'] = str(raw.get('category') or '').strip() or None
+    row['_brand'] = str(raw.get('brand') or '').strip() or None
+    return row, None
+
+
+def read_rows(stream, fmt):
+    """
+    Yield (line number, raw row, None) from a text stream, or
+    (line number, None, error) for a line that cannot be parsed
+    """
+    if fmt == 'csv':
+        for line_number, raw in enumerate(csv.DictReader(stream), start=2):
+            yield line_number, raw, None
+    elif fmt == 'jsonl':
+        for line_number, line in enumerate(stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield line_number, json.loads(line), None
+            except ValueError as e:
+                yield line_number, None, f"line {line_number}: invalid JSON ({e})"
+    else:
+        raise ValueError(f"Unsupported catalog format: {fmt}")
+
+
+def _chunks(rows, size):
+    chunk = []
+    for item in rows:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _dialect_insert(table):
+    from app import db
+    if db.engine.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(table)
+
+
+def _upsert_lookup(model, names, cache):
+    """Ensure categories/brands exist by slug; return {given value: id}"""
+    from app import db
+
+    wanted = {value: slugify(value) for value in names if value and value not in cache}
+    if wanted:
+        table = model.__table__
+        values = {}
+        for value, slug in wanted.items():
+            row = {'name': value, 'slug': slug}
+            if 'is_active' in table.c:
+                row['is_active'] = True
+            values[slug] = row
+        statement = _dialect_insert(table).values(list(values.values())).on_conflict_do_nothing(
+            index_elements=['slug'])
+        db.session.execute(statement)
+        ids = dict(db.session.execute(
+            select(table.c.slug, table.c.id).where(table.c.slug.in_(list(values)))).all())
+        for value, slug in wanted.items():
+            cache[value] = ids.get(slug)
+    return cache
+
+
+def _copy_upsert(rows, columns, update_columns):
+    """
+    PostgreSQL: COPY the rows into a temp table, then one INSERT ... ON
+    CONFLICT that updates only update_columns
+    """
+    from app import db
+
+    available = _product_columns()
+    column_list = ', '.join(columns)
+    cursor = db.session.connection().connection.cursor()
+
+    # Same column types as products, none of its NOT NULL constraints
+    cursor.execute("DROP TABLE IF EXISTS catalog_staging")
+    cursor.execute(f"""
+        CREATE TEMP TABLE catalog_staging ON COMMIT DROP AS
+        SELECT {column_list} FROM products WITH NO DATA
+    """)
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(['' if row.get(c) is None else row.get(c) for c in columns])
+    buffer.seek(0)
+    cursor.copy_expert(
+        f"COPY catalog_staging ({column_list}) FROM STDIN WITH (FORMAT csv, NULL '')", buffer)
+
+    insert_columns = list(columns)
+    select_columns = list(columns)
+    updates = [f"{c} = EXCLUDED.{c}" for c in update_columns]
+    for timestamp in ('created_at', 'updated_at'):
+        if timestamp in available and timestamp not in columns:
+            insert_columns.append(timestamp)
+            select_columns.append('NOW()')
+    if 'updated_at' in available and 'updated_at' not in columns:
+        updates.append('updated_at = NOW()')
+
+    cursor.execute(f"""
+        INSERT INTO products ({', '.join(insert_columns)})
+        SELECT {', '.join(select_columns)} FROM catalog_staging
+        ON CONFLICT (slug) DO UPDATE SET {', '.join(updates)}
+    """)
+    cursor.close()
+
+
+def _product_columns():
+    from app.models import Product
+    return set(Product.__table__.columns.keys())
+
+
+def _statement_upsert(rows, columns, update_columns):
+    from app import db
+    from app.models import Product
+
+    table = Product.__table__
+    statement = _dialect_insert(table).values([{c: row.get(c) for c in columns} for row in rows])
+    updates = {c: statement.excluded[c] for c in update_columns}
+    db.session.execute(statement.on_conflict_do_update(index_elements=['slug'], set_=updates))
+
+
+def _replace_images(rows, product_ids):
+    from app import db
+    from app.models import ProductImage
+
+    with_images = [row for row in rows if row['_images']]
+    if not with_images:
+        return 0
+    ids = [product_ids[row['slug']] for row in with_images]
+    db.session.execute(ProductImage.__table__.delete().where(
+        ProductImage.__table__.c.product_id.in_(ids)))
+
+    images = []
+    for row in with_images:
+        for index, url in enumerate(row['_images'], start=1):
+            images.append({
+                'product_id': product_ids[row['slug']],
+                'image_url': url,
+                'is_primary': index == 1,
+                'sort_order': index,
+                'is_active': True,
+                'alt_text': f"{row['name']} - Image {index}",
+            })
+    db.session.execute(ProductImage.__table__.insert(), images)
+    return len(images)
+
+
+def import_catalog(stream, fmt, chunk_size=DEFAULT_CHUNK_SIZE, progress=None):
+    """
+    Import a catalog stream. `progress(dict)` is called after each chunk
+    (the admin endpoint passes a background job updater). Returns a summary.
+    """
+    from app import db
+    from app.models import Brand, Category, Product
+
+    use_copy = db.engine.dialect.name == 'postgresql'
+    available = _product_columns()
+    category_ids, brand_ids = {}, {}
+    summary = {'processed': 0, 'upserted': 0, 'images': 0, 'errors': [], 'chunks': 0}
+    started = time.perf_counter()
+
+    for chunk in _chunks(read_rows(stream, fmt), chunk_size):
+        rows = []
+        for line_number, raw, error in chunk:
+            if error is None:
+                row, error = validate_row(raw, line_number)
+            if error:
+                summary['errors'].append(error)
+            else:
+                rows.append(row)
+        summary['processed'] += len(chunk)
+
+        # Last row wins when a slug repeats inside one chunk
+        rows = list({row['slug']: row for row in rows}.values())
+        if rows:
+            _upsert_lookup(Category, [r['_category'] for r in rows], category_ids)
+            _upsert_lookup(Brand, [r['_brand'] for r in rows], brand_ids)
+            for row in rows:
+                if row['_category']:
+                    row['category_id'] = category_ids.get(row['_category'])
+                if row['_brand']:
+                    row['brand_id'] = brand_ids.get(row['_brand'])
+
+            # Rows are upserted grouped by the columns they carry, so a row
+            # that omits a column never sends NULL over the stored value
+            groups = {}
+            for row in rows:
+                present = tuple(sorted(key for key in row
+                                       if not key.startswith('_') and key in available))
+                groups.setdefault(present, []).append(row)
+            for present, group in groups.items():
+                defaults = {c: v for c, v in INSERT_DEFAULTS.items()
+                            if c in available and c not in present}
+                group = [dict(defaults, **row) for row in group]
+                columns = sorted(set(present) | set(defaults))
+                update_columns = [c for c in present if c != 'slug']
+                if use_copy:
+                    _copy_upsert(group, columns, update_columns)
+                else:
+                    _statement_upsert(group, columns, update_columns)
+
+            table = Product.__table__
+            product_ids = dict(db.session.execute(select(table.c.slug, table.c.id).where(
+                table.c.slug.in_([row['slug'] for row in rows]))).all())
+            summary['images'] += _replace_images(rows, product_ids)
+            summary['upserted'] += len(rows)
+
+        db.session.commit()
+        summary['chunks'] += 1
+        summary['elapsed'] = round(time.perf_counter() - started, 2)
+        if progress:
+            progress({key: value for key, value in summary.items() if key != 'errors'}
+                     | {'error_count': len(summary['errors'])})
+
+    summary['elapsed'] = round(time.perf_counter() - started, 2)
+    return summary
+
+
+def export_catalog(batch_size=DEFAULT_CHUNK_SIZE):
+    """Yield the catalog as JSONL lines, batch by batch (for Flask Response streaming)"""
+    from app import db
+    from app.models import Brand, Category, Product, ProductImage
+
+    products = Product.__table__
+    columns = [products.c[f] for f in PRODUCT_FIELDS if f in products.c]
+    query = (
+        select(products.c.id, *columns,
+               Category.__table__.c.slug.label('category'),
+               Brand.__table__.c.slug.label('brand'))
+        .select_from(products
+                     .outerjoin(Category.__table__, Category.__table__.c.id == products.c.category_id)
+                     .outerjoin(Brand.__table__, Brand.__table__.c.id == products.c.brand_id))
+        .order_by(products.c.id)
+    )
+
+    last_id = 0
+    images_table = ProductImage.__table__
+    while True:
+        rows = db.session.execute(query.where(products.c.id > last_id).limit(batch_size)).mappings().all()
+        if not rows:
+            return
+        ids = [row['id'] for row in rows]
+        images = {}
+        for product_id, url in db.session.execute(
+                select(images_table.c.product_id, images_table.c.image_url)
+                .where(images_table.c.product_id.in_(ids))
+                .order_by(images_table.c.product_id, images_table.c.sort_order)):
+            images.setdefault(product_id, []).append(url)
+
+        for row in rows:
+            data = {key: value for key, value in row.items() if key != 'id'}
+            for key, value in data.items():
+                if isinstance(value, Decimal):
+                    data[key] = str(value)
+            data['images'] = images.get(row['id'], [])
+            yield json.dumps(data, default=str) + '\n'
+        last_id = ids[-1]
+
+
+@register_job(JOB_TYPE)
+def run_catalog_import(job_id, payload):
+    """
+    Background job for the admin upload endpoint, which saves the uploaded
+    file and queues {'path', 'format', 'chunk_size'}.
+    """
+    with open(payload['path'], newline='', encoding='utf-8') as stream:
+        summary = import_catalog(
+            stream, payload['format'], payload.get('chunk_size') or DEFAULT_CHUNK_SIZE,
+            progress=lambda progress: update_job(job_id, progress=progress))
+    summary['errors'] = summary['errors'][:100]
+    return summary
+
+
+def main():
+    import argparse
+    from app import create_app
+
+    parser = argparse.ArgumentParser(description='Stream-import or export the product catalog')
+    parser.add_argument('command', choices=['import', 'export'])
+    parser.add_argument('path')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        if args.command == 'export':
+            count = 0
+            with open(args.path, 'w', encoding='utf-8') as out:
+                for line in export_catalog(args.chunk_size):
+                    out.write(line)
+                    count += 1
+            print(f"✅ Exported {count} products to {args.path}")
+            return
+
+        fmt = 'csv' if args.path.lower().endswith('.csv') else 'jsonl'
+        print(f"📦 Importing {args.path} ({fmt}, chunks of {args.chunk_size})...")
+
+        def report(progress):
+            print(f"   🔄 {progress['processed']} rows processed, {progress['upserted']} upserted, "
+                  f"{progress['error_count']} errors ({progress['elapsed']}s)")
+
+        with open(args.path, newline='', encoding='utf-8') as stream:
+            summary = import_catalog(stream, fmt, args.chunk_size, progress=report)
+
+        print(f"✅ Upserted {summary['upserted']} products and {summary['images']} images "
+              f"in {summary['elapsed']}s")
+        if summary['errors']:
+            print(f"⚠️  {len(summary['errors'])} rows rejected:")
+            for error in summary['errors'][:20]:
+                print(f"   - {error}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Category & Brand Menu Cache
+Category and brand listings with active product counts, each computed in a
+single GROUP BY and served from the versioned in-memory cache with an ETag.
+Replaces the per-category product_count computation behind
+app.products.routes.get_categories (the source of the off-by-N counts
+checked in test_product_count_display.py).
+
+Wiring (in create_app, after models are imported):
+    from category_cache import register_category_cache
+    register_category_cache()
+
+and in app.products.routes:
+    return cached_json_response(category_cache, lambda d: {'categories': d['categories']})
+"""
+
+from sqlalchemy import and_, func
+
+from versioned_cache import VersionedCache, cached_json_response, invalidate_on_change
+
+CACHE_NAME = 'catalog_menu'
+
+
+def _row_to_dict(model, row):
+    data = {}
+    for column in model.__table__.columns:
+        value = getattr(row, column.key)
+        if hasattr(value, 'isoformat'):
+            value = value.isoformat()
+        elif value is not None and not isinstance(value, (str, int, float, bool, list, dict)):
+            value = str(value)
+        data[column.key] = value
+    return data
+
+
+def _counted(model, fk_column):
+    """Rows of `model` with COUNT of active products joined through fk_column"""
+    from app import db
+    from app.models import Product
+
+    query = db.session.query(model, func.count(Product.id).label('product_count')).outerjoin(
+        Product, and_(fk_column == model.id, Product.is_active.is_(True))
+    ).group_by(model.id)
+
+    if hasattr(model, 'is_active'):
+        query = query.filter(model.is_active.is_(True))
+    if hasattr(model, 'sort_order'):
+        query = query.order_by(model.sort_order, model.name)
+    else:
+        query = query.order_by(model.name)
+
+    results = []
+    for row, product_count in query.all():
+        data = _row_to_dict(model, row)
+        data['product_count'] = int(product_count or 0)
+        results.append(data)
+    return results
+
+
+def _build_tree(categories):
+    """Nest categories under parent_id when the model has one"""
+    by_id = {c['id']: dict(c, children=[]) for c in categories}
+    roots = []
+    for category in by_id.values():
+        parent = by_id.get(category.get('parent_id'))
+        if parent is not None:
+            parent['children'].append(category)
+        else:
+            roots.append(category)
+    return roots
+
+
+def load_catalog_menu():
+    from app.models import Brand, Category, Product
+
+    categories = _counted(Category, Product.category_id)
+    brands = _counted(Brand, Product.brand_id)
+    return {
+        'categories': categories,
+        'category_tree': _build_tree(categories) if 'parent_id' in Category.__table__.columns else None,
+        'brands': brands,
+        'total_products': sum(c['product_count'] for c in categories),
+    }
+
+
+category_cache = VersionedCache(CACHE_NAME, load_catalog_menu)
+
+
+def register_category_cache():
+    """Bump the menu version on any product, category or brand write"""
+    from app.models import Brand, Category, Product
+    invalidate_on_change(CACHE_NAME, Product, Category, Brand)
+
+
+def categories_response():
+    return cached_json_response(category_cache, lambda menu: {'categories': menu['categories']})
+
+
+def brands_response():
+    return cached_json_response(category_cache, lambda menu: {'brands': menu['brands']})
+
+
+def menu_response():
+    return cached_json_response(category_cache)
+
+
+if __name__ == "__main__":
+    from app import create_app
+
+    app = create_app()
+    with app.app_context():
+        print("📦 Catalog menu (single GROUP BY per listing)")
+        print("=" * 50)
+        menu = load_catalog_menu()
+        for category in menu['categories']:
+            count = category['product_count']
+            print(f"   {category['name']}: {count} {'product' if count == 1 else 'products'}")
+        print(f"🏷️  Brands: {len(menu['brands'])}")
+        print(f"✅ Total active products: {menu['total_products']}")
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Cyber-Service Catalog Cache
+The whole active cyber-service catalog is loaded in one query
+(serialization.CYBER_SERVICE_LIST) into the versioned in-memory cache and
+indexed by slug and by category, so /api/cyber-services/services,
+/services/<slug> and /categories are dictionary lookups with an ETag and
+no queries while warm. Any CyberService insert, update or delete (the
+app.admin.cyber_services screens) bumps the version.
+
+Wiring (in create_app, after models are imported):
+    from cyber_service_cache import register_cyber_service_cache
+    register_cyber_service_cache()
+
+and in the cyber-services routes:
+    return services_response()              # ?category=KRA&featured=true
+    return service_response(slug)
+    return cyber_categories_response()
+"""
+
+from serialization import CYBER_SERVICE_LIST
+from versioned_cache import VersionedCache, cached_json_response, invalidate_on_change
+
+CACHE_NAME = 'cyber_service_catalog'
+
+
+def load_cyber_service_catalog():
+    from app.models import CyberService
+
+    services = CYBER_SERVICE_LIST.load(
+        CyberService.query.filter(CyberService.is_active.is_(True))
+        .order_by(CyberService.sort_order, CyberService.name))
+
+    by_category = {}
+    subcategories = {}
+    for service in services:
+        category = service['category'] or 'Other'
+        by_category.setdefault(category, []).append(service)
+        names = subcategories.setdefault(category, [])
+        if service['subcategory'] and service['subcategory'] not in names:
+            names.append(service['subcategory'])
+
+    return {
+        'services': services,
+        'by_slug': {service['slug']: service for service in services},
+        'by_category': by_category,
+        'featured': [service for service in services if service['is_featured']],
+        'categories': [{
+            'name': category,
+            'service_count': len(items),
+            'subcategories': subcategories[category],
+        } for category, items in by_category.items()],
+    }
+
+
+cyber_service_cache = VersionedCache(CACHE_NAME, load_cyber_service_catalog)
+
+
+def register_cyber_service_cache():
+    """Bump the catalog version on any cyber-service write"""
+    from app.models import CyberService
+    invalidate_on_change(CACHE_NAME, CyberService)
+
+
+def _select_services(catalog, category=None, featured=False):
+    services = catalog['featured'] if featured else catalog['services']
+    if category:
+        if featured:
+            services = [s for s in services if (s['category'] or 'Other') == category]
+        else:
+            services = catalog['by_category'].get(category, [])
+    return {'services': services, 'total': len(services)}
+
+
+def services_response(args=None):
+    """GET /api/cyber-services/services[?category=...&featured=true]"""
+    from flask import request
+
+    args = request.args if args is None else args
+    category = args.get('category')
+    featured = str(args.get('featured', '')).lower() == 'true'
+    return cached_json_response(
+        cyber_service_cache, lambda catalog: _select_services(catalog, category, featured))
+
+
+def service_response(slug):
+    """GET /api/cyber-services/services/<slug>; 404 for unknown or inactive slugs"""
+    def build(catalog):
+        service = catalog['by_slug'].get(slug)
+        return {'service': service} if service is not None else None
+    return cached_json_response(cyber_service_cache, build)
+
+
+def cyber_categories_response():
+    """GET /api/cyber-services/categories"""
+    return cached_json_response(
+        cyber_service_cache, lambda catalog: {'categories': catalog['categories']})
+
+
+if __name__ == "__main__":
+    from app import create_app
+    from serialization import count_queries
+
+    app = create_app()
+    with app.app_context():
+        with count_queries() as counter:
+            catalog = load_cyber_service_catalog()
+        print(f"🛠️  Cyber-service catalog: {len(catalog['services'])} services "
+              f"in {counter['count']} queries")
+        for category in catalog['categories']:
+            print(f"   {category['name']}: {category['service_count']} services")
+        print(f"⭐ Featured: {len(catalog['featured'])}")
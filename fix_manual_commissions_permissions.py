@@ -10,6 +10,7 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from app import create_app, db
 from app.models import AdminUser, AdminRole
+from admin_permission_bits import get_admin_bits, has_permission_bits, recompile_all_roles
 
 def fix_manual_commissions_permissions():
     """Fix permissions for manual commissions access"""
@@ -73,13 +74,21 @@ def fix_manual_commissions_permissions():
             db.session.commit()
             print(f"\n✅ Successfully updated permissions for {len(admin_users)} admin users")
             
+            # Recompile role bitsets so token permission checks see the change
+            for role, bits, unknown in recompile_all_roles():
+                print(f"   🔢 {role.name}: bitset {bits:#x}")
+                if unknown:
+                    print(f"      ⚠️  No bit assigned for: {unknown}")
+            
             # Verify changes
             print(f"\n🔍 Verifying changes...")
             for admin_user in admin_users:
                 if admin_user.role:
                     has_view = admin_user.has_permission('view_commissions')
                     has_manage = admin_user.has_permission('manage_commissions')
-                    print(f"   {admin_user.email}: view_commissions={has_view}, manage_commissions={has_manage}")
+                    bits = get_admin_bits(admin_user)
+                    bits_ok = has_permission_bits(bits, 'view_commissions') and has_permission_bits(bits, 'manage_commissions')
+                    print(f"   {admin_user.email}: view_commissions={has_view}, manage_commissions={has_manage}, bitset_ok={bits_ok}")
             
             print(f"\n🎉 Manual commissions permissions fix completed!")
             
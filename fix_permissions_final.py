@@ -8,6 +8,7 @@ import sys
 from app import create_app, db
 from app.models import AdminUser, AdminRole
 from sqlalchemy import inspect
+from admin_permission_bits import compile_role, get_admin_bits, has_permission_bits
 
 def fix_commissions_permissions():
     """Fix commissions permissions properly"""
@@ -72,6 +73,12 @@ def fix_commissions_permissions():
                     db.session.refresh(admin.role)
                     print(f"   ✅ Session refreshed")
                     print(f"   📋 Final Permissions: {admin.role.permissions}")
+                    
+                    # Recompile the role bitset embedded in admin tokens
+                    bits = compile_role(admin.role)
+                    db.session.commit()
+                    print(f"   ✅ Permission bitset recompiled: {bits:#x}")
+                    print("   💡 Log out and back in to get a token with the new permissions")
                 else:
                     print("✅ All required permissions are already present")
                 
@@ -121,6 +128,12 @@ def verify_fix():
                 print(f"   view_commissions: {admin.has_permission('view_commissions')}")
                 print(f"   manage_commissions: {admin.has_permission('manage_commissions')}")
                 
+                # Test the compiled bitset used by token permission checks
+                bits = get_admin_bits(admin)
+                print(f"\n🔢 Testing compiled bitset ({bits:#x}):")
+                print(f"   view_commissions: {has_permission_bits(bits, 'view_commissions')}")
+                print(f"   manage_commissions: {has_permission_bits(bits, 'manage_commissions')}")
+                
                 return has_view and has_manage
             else:
                 print("❌ Could not verify - admin or role not found")
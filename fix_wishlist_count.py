@@ -14,70 +14,52 @@ def diagnose_wishlist_issue():
     app = create_app()
     with app.app_context():
         try:
-            # Get all users with wishlists
-            users = User.query.all()
+            from sqlalchemy import case, func
+            from item_storage import count_cleanup_candidates
+            
+            # One grouped query: stored vs valid (active product) items per wishlist
+            rows = db.session.query(
+                User.name,
+                User.email,
+                Wishlist.id.label('wishlist_id'),
+                func.count(WishlistItem.id).label('item_count'),
+                func.count(case((Product.is_active.is_(True), WishlistItem.id))).label('valid_count')
+            ).join(Wishlist, Wishlist.user_id == User.id
+            ).outerjoin(WishlistItem, WishlistItem.wishlist_id == Wishlist.id
+            ).outerjoin(Product, Product.id == WishlistItem.product_id
+            ).group_by(User.name, User.email, Wishlist.id).all()
+            
+            for row in rows:
+                print(f"\n👤 User: {row.name} ({row.email})")
+                print(f"   📊 Wishlist ID: {row.wishlist_id}")
+                print(f"   📊 Item count: {row.item_count}")
+                print(f"   ✅ Valid products: {row.valid_count}")
+                if row.item_count != row.valid_count:
+                    print(f"      ⚠️  {row.item_count - row.valid_count} items with invalid products")
+            
+            # Orphaned and inactive-product items, counted in the database
+            candidates = count_cleanup_candidates()['wishlist']
+            if candidates['orphaned']:
+                print(f"\n🗑️  Orphaned wishlist items: {candidates['orphaned']}")
+            if candidates['inactive_product']:
+                print(f"🗑️  Items with inactive or deleted products: {candidates['inactive_product']}")
+            
+            # Check for duplicate items (impossible once migrate_item_uniqueness.py ran)
+            duplicates = db.session.query(
+                WishlistItem.wishlist_id,
+                WishlistItem.product_id,
+                func.count(WishlistItem.id).label('count')
+            ).group_by(
+                WishlistItem.wishlist_id,
+                WishlistItem.product_id
+            ).having(func.count(WishlistItem.id) > 1).all()
             
-            for user in users:
-                print(f"\n👤 User: {user.name} ({user.email})")
-                
-                # Get user's wishlist
-                wishlist = Wishlist.query.filter_by(user_id=user.id).first()
-                
-                if not wishlist:
-                    print("   ❌ No wishlist found")
-                    continue
-                
-                # Count items in wishlist
-                item_count = wishlist.items.count()
-                print(f"   📊 Wishlist ID: {wishlist.id}")
-                print(f"   📊 Item count: {item_count}")
-                
-                # Get actual items
-                items = wishlist.items.all()
-                print(f"   📋 Actual items: {len(items)}")
-                
-                # Check for orphaned items
-                orphaned_items = WishlistItem.query.filter_by(wishlist_id=wishlist.id).all()
-                print(f"   🔗 Database items: {len(orphaned_items)}")
-                
-                # Check if products exist
-                valid_items = 0
-                for item in items:
-                    product = Product.query.get(item.product_id)
-                    if product and product.is_active:
-                        valid_items += 1
-                    else:
-                        print(f"      ⚠️  Invalid product ID: {item.product_id}")
-                
-                print(f"   ✅ Valid products: {valid_items}")
-                
-                # Check for orphaned wishlist items
-                orphaned_wishlist_items = db.session.query(WishlistItem).filter(
-                    ~WishlistItem.wishlist_id.in_([w.id for w in Wishlist.query.all()])
-                ).all()
-                
-                if orphaned_wishlist_items:
-                    print(f"   🗑️  Orphaned wishlist items: {len(orphaned_wishlist_items)}")
-                    for item in orphaned_wishlist_items:
-                        print(f"      - Item ID: {item.id}, Product ID: {item.product_id}")
-                
-                # Check for duplicate items
-                from sqlalchemy import func
-                duplicates = db.session.query(
-                    WishlistItem.wishlist_id,
-                    WishlistItem.product_id,
-                    func.count(WishlistItem.id).label('count')
-                ).group_by(
-                    WishlistItem.wishlist_id,
-                    WishlistItem.product_id
-                ).having(func.count(WishlistItem.id) > 1).all()
-                
-                if duplicates:
-                    print(f"   🔄 Duplicate items found: {len(duplicates)}")
-                    for dup in duplicates:
-                        print(f"      - Wishlist {dup.wishlist_id}, Product {dup.product_id}: {dup.count} times")
-                
-                print()
+            if duplicates:
+                print(f"🔄 Duplicate items found: {len(duplicates)}")
+                for dup in duplicates:
+                    print(f"      - Wishlist {dup.wishlist_id}, Product {dup.product_id}: {dup.count} times")
+            
+            print()
         
         except Exception as e:
             print(f"❌ Error: {str(e)}")
@@ -93,67 +75,42 @@ def fix_wishlist_issues():
     app = create_app()
     with app.app_context():
         try:
-            # 1. Remove orphaned wishlist items
-            print("1. Removing orphaned wishlist items...")
-            orphaned_items = db.session.query(WishlistItem).filter(
-                ~WishlistItem.wishlist_id.in_([w.id for w in Wishlist.query.all()])
-            ).all()
-            
-            for item in orphaned_items:
-                db.session.delete(item)
-            
-            print(f"   Removed {len(orphaned_items)} orphaned items")
-            
-            # 2. Remove duplicate items
-            print("2. Removing duplicate items...")
-            from sqlalchemy import func
-            
-            duplicates = db.session.query(
-                WishlistItem.wishlist_id,
-                WishlistItem.product_id,
-                func.count(WishlistItem.id).label('count')
-            ).group_by(
-                WishlistItem.wishlist_id,
-                WishlistItem.product_id
-            ).having(func.count(WishlistItem.id) > 1).all()
-            
-            for dup in duplicates:
-                # Keep the first item, delete the rest
-                items_to_keep = WishlistItem.query.filter_by(
-                    wishlist_id=dup.wishlist_id,
-                    product_id=dup.product_id
-                ).order_by(WishlistItem.id).first()
-                
-                if items_to_keep:
-                    items_to_delete = WishlistItem.query.filter_by(
-                        wishlist_id=dup.wishlist_id,
-                        product_id=dup.product_id
-                    ).filter(WishlistItem.id != items_to_keep.id).all()
-                    
-                    for item in items_to_delete:
-                        db.session.delete(item)
-            
-            print(f"   Removed duplicates for {len(duplicates)} product-wishlist combinations")
-            
-            # 3. Remove items with invalid products
-            print("3. Removing items with invalid products...")
-            invalid_items = []
-            
-            for wishlist_item in WishlistItem.query.all():
-                product = Product.query.get(wishlist_item.product_id)
-                if not product or not product.is_active:
-                    invalid_items.append(wishlist_item)
-            
-            for item in invalid_items:
-                db.session.delete(item)
-            
-            print(f"   Removed {len(invalid_items)} items with invalid products")
-            
-            # 4. Commit changes
+            from sqlalchemy import text
+            from item_storage import cleanup_items
+            
+            # 1. Remove duplicate items, keeping the oldest row of each pair
+            print("1. Removing duplicate items...")
+            removed = db.session.execute(text("""
+                DELETE FROM wishlist_items
+                WHERE EXISTS (
+                    SELECT 1 FROM wishlist_items d
+                    WHERE d.wishlist_id = wishlist_items.wishlist_id
+                      AND d.product_id = wishlist_items.product_id
+                      AND d.id < wishlist_items.id
+                )
+            """)).rowcount
             db.session.commit()
+            print(f"   Removed {removed} duplicate items")
+            
+            # 2. Remove orphaned items and items with invalid products (batched)
+            print("2. Removing orphaned items and items with invalid products...")
+            result = cleanup_items()
+            for key, deleted in result.items():
+                print(f"   {key}: {deleted} removed")
+            
+            # 3. Recompute the cached counters
+            try:
+                from item_counts import recompute_all_item_counts
+                recompute_all_item_counts()
+                db.session.commit()
+                print("3. Recomputed cached cart and wishlist counters")
+            except Exception as e:
+                db.session.rollback()
+                print(f"3. ⚠️  Counters not recomputed (run migrate_item_counts.py): {e}")
+            
             print("✅ All fixes applied successfully!")
             
-            # 5. Verify fixes
+            # 4. Verify fixes
             print("\n🔍 Verifying fixes...")
             diagnose_wishlist_issue()
             
@@ -189,15 +146,24 @@ def test_wishlist_count_api():
             
             print(f"API count: {count}")
             
-            # Get actual items
+            # Counter served by /api/wishlist/count (active products only)
+            try:
+                from item_counts import get_item_counts
+                print(f"Counter-cached count: {get_item_counts(user.id)['wishlist']}")
+            except Exception as e:
+                db.session.rollback()
+                print(f"⚠️  Counter not available (run migrate_item_counts.py): {e}")
+            
+            # Get actual items with their products in one query
             if wishlist:
-                items = wishlist.items.all()
+                items = db.session.query(WishlistItem.product_id, Product.name).outerjoin(
+                    Product, Product.id == WishlistItem.product_id
+                ).filter(WishlistItem.wishlist_id == wishlist.id).all()
                 print(f"Actual items: {len(items)}")
                 
                 for item in items:
-                    product = Product.query.get(item.product_id)
-                    if product:
-                        print(f"  - {product.name} (ID: {product.id})")
+                    if item.name:
+                        print(f"  - {item.name} (ID: {item.product_id})")
                     else:
                         print(f"  - Invalid product ID: {item.product_id}")
             
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Idempotency Keys for Checkout, Payment Initiation and Withdrawals
+Order creation, /api/cyber-services/orders/<order_number>/pay and withdrawal
+requests honour an `Idempotency-Key` header. The first request with a key
+claims it (one INSERT ... ON CONFLICT DO NOTHING) and runs; its response is
+stored. A repeat with the same key (double-click, client retry) gets the
+stored response back, marked `Idempotent-Replayed: true`, without creating
+another order, STK push or withdrawal.
+
+- keys are scoped per endpoint and per user (unique index on
+  scope, user_id, idempotency_key)
+- the same key with a different body is a client bug: 422
+- a repeat while the first request is still running: 409
+- 5xx responses and exceptions drop the claim so the client may retry
+- keys expire after IDEMPOTENCY_KEY_TTL_HOURS (default 24); claims stuck
+  in progress for IN_PROGRESS_TIMEOUT_SECONDS (a crashed worker) and expired
+  keys are taken over with one conditional UPDATE
+
+    @jwt_required()
+    @idempotent('order_create')
+    def create_order(): ...
+
+Requests without the header behave as before. purge_expired_keys() runs
+from the sweeper. Run migrate_idempotency_keys.py once to create the table.
+"""
+
+import hashlib
+import os
+from collections import namedtuple
+from datetime import datetime, timedelta
+from functools import wraps
+
+from sqlalchemy import text
+
+HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+IN_PROGRESS = 'in_progress'
+COMPLETED = 'completed'
+MAX_KEY_LENGTH = 255
+DEFAULT_TTL_HOURS = 24
+IN_PROGRESS_TIMEOUT_SECONDS = 120
+CLAIM_ATTEMPTS = 3
+
+ExistingKey = namedtuple('ExistingKey', [
+    'status', 'request_hash', 'response_status', 'response_body', 'content_type'])
+
+
+def get_key_ttl():
+    return timedelta(hours=int(os.environ.get('IDEMPOTENCY_KEY_TTL_HOURS', DEFAULT_TTL_HOURS)))
+
+
+def request_fingerprint(method, path, body):
+    digest = hashlib.sha256(f'{method} {path}\n'.encode('utf-8'))
+    digest.update(body or b'')
+    return digest.hexdigest()
+
+
+def claim_key(scope, user_id, key, fingerprint):
+    """
+    Try to own the key. Returns None when claimed, otherwise the existing
+    row (status, request_hash, response_status, response_body, content_type).
+    Commits so other workers see the claim at once.
+
+    The conflicting row can be released or purged between the INSERT and the
+    read-back; the claim is then retried, and if the key keeps changing hands
+    it is reported as in progress (409) rather than run unprotected.
+    """
+    for _ in range(CLAIM_ATTEMPTS):
+        claimed, existing = _try_claim(scope, user_id, key, fingerprint)
+        if claimed:
+            return None
+        if existing is not None:
+            return existing
+    return ExistingKey(IN_PROGRESS, fingerprint, None, None, None)
+
+
+def _try_claim(scope, user_id, key, fingerprint):
+    """(claimed, existing row or None) from one INSERT / takeover / read-back"""
+    from app import db
+
+    now = datetime.utcnow()
+    params = {'scope': scope, 'user_id': user_id, 'key': key, 'hash': fingerprint,
+              'in_progress': IN_PROGRESS, 'now': now, 'expires_at': now + get_key_ttl(),
+              'stale': now - timedelta(seconds=IN_PROGRESS_TIMEOUT_SECONDS)}
+
+    claimed = db.session.execute(text("""
+        INSERT INTO idempotency_keys
+            (scope, user_id, idempotency_key, request_hash, status, created_at, expires_at)
+        VALUES (:scope, :user_id, :key, :hash, :in_progress, :now, :expires_at)
+        ON CONFLICT (scope, user_id, idempotency_key) DO NOTHING
+    """), params).rowcount
+    if not claimed:
+        # Expired keys and abandoned claims are taken over atomically
+        claimed = db.session.execute(text("""
+            UPDATE idempotency_keys
+            SET request_hash = :hash, status = :in_progress, response_status = NULL,
+                response_body = NULL, content_type = NULL, created_at = :now,
+                expires_at = :expires_at
+            WHERE scope = :scope AND user_id = :user_id AND idempotency_key = :key
+              AND (expires_at < :now OR (status = :in_progress AND created_at < :stale))
+        """), params).rowcount
+    db.session.commit()
+    if claimed:
+        return True, None
+
+    return False, db.session.execute(text("""
+        SELECT status, request_hash, response_status, response_body, content_type
+        FROM idempotency_keys
+        WHERE scope = :scope AND user_id = :user_id AND idempotency_key = :key
+    """), params).first()
+
+
+def store_response(scope, user_id, key, status_code, body, content_type):
+    from app import db
+
+    db.session.execute(text("""
+        UPDATE idempotency_keys
+        SET status = :completed, response_status = :status_code,
+            response_body = :body, content_type = :content_type
+        WHERE scope = :scope AND user_id = :user_id AND idempotency_key = :key
+    """), {'completed': COMPLETED, 'status_code': status_code, 'body': body,
+           'content_type': content_type, 'scope': scope, 'user_id': user_id, 'key': key})
+    db.session.commit()
+
+
+def release_key(scope, user_id, key):
+    """Forget a claim whose request failed, so a retry runs again"""
+    from app import db
+
+    db.session.execute(text("""
+        DELETE FROM idempotency_keys
+        WHERE scope = :scope AND user_id = :user_id AND idempotency_key = :key
+          AND status = :in_progress
+    """), {'scope': scope, 'user_id': user_id, 'key': key, 'in_progress': IN_PROGRESS})
+    db.session.commit()
+
+
+def purge_expired_keys(batch_size=1000):
+    """Delete expired keys in batches, committing each; returns the count"""
+    from app import db
+
+    total = 0
+    while True:
+        deleted = db.session.execute(text("""
+            DELETE FROM idempotency_keys WHERE id IN (
+                SELECT id FROM idempotency_keys WHERE expires_at < :now LIMIT :batch_size
+            )
+        """), {'now': datetime.utcnow(), 'batch_size': batch_size}).rowcount
+        db.session.commit()
+        total += deleted
+        if deleted < batch_size:
+            return total
+
+
+def _current_user_id():
+    from flask_jwt_extended import get_jwt_identity
+    return int(get_jwt_identity())
+
+
+def idempotent(scope, get_user_id=None):
+    """
+    Replay the stored response for a repeated Idempotency-Key. Put it
+    below @jwt_required() so the user is known.
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            from flask import current_app, jsonify, make_response, request
+
+            key = request.headers.get(HEADER, '').strip()
+            if not key:
+                return fn(*args, **kwargs)
+            if len(key) > MAX_KEY_LENGTH:
+                return jsonify({'error': f'{HEADER} too long (max {MAX_KEY_LENGTH})'}), 400
+
+            user_id = (get_user_id or _current_user_id)()
+            fingerprint = request_fingerprint(request.method, request.path, request.get_data())
+            existing = claim_key(scope, user_id, key, fingerprint)
+
+            if existing is not None:
+                if existing.request_hash != fingerprint:
+                    return jsonify({'error': f'{HEADER} was already used for a different request'}), 422
+                if existing.status != COMPLETED:
+                    response = jsonify({'error': 'A request with this key is still in progress'})
+                    response.headers['Retry-After'] = '1'
+                    return response, 409
+                response = current_app.response_class(
+                    existing.response_body, status=existing.response_status,
+                    content_type=existing.content_type)
+                response.headers[REPLAYED_HEADER] = 'true'
+                return response
+
+            try:
+                response = make_response(fn(*args, **kwargs))
+            except Exception:
+                from app import db
+                db.session.rollback()
+                release_key(scope, user_id, key)
+                raise
+
+            if response.status_code >= 500:
+                release_key(scope, user_id, key)
+            else:
+                store_response(scope, user_id, key, response.status_code,
+                               response.get_data(as_text=True), response.content_type)
+            return response
+        return wrapper
+    return decorator
+
+
+if __name__ == "__main__":
+    from app import create_app
+
+    app = create_app()
+    with app.app_context():
+        print("🧹 Purging expired idempotency keys...")
+        print(f"✅ Removed {purge_expired_keys()} expired keys")
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+JWT Identity Cache
+Bounded in-process cache of the User/AdminUser behind a token subject, so
+@jwt_required() endpoints (cart count, wishlist count, notifications) do not
+reload the account, role and permissions on every request.
+
+Entries are keyed by (kind, subject, auth_version). Role, permission,
+password and deactivation changes call bump_identity_version(), which bumps
+the account's auth_version and appends to auth_invalidations; every worker
+polls that table at most once per IDENTITY_CACHE_POLL_SECONDS and evicts the
+affected subjects. Ids are assigned at INSERT but rows commit in any order,
+so the poll reads by created_at with an IDENTITY_CACHE_POLL_OVERLAP_SECONDS
+window behind the previous poll and skips ids it has already applied. The
+poll runs on its own connection, so it never touches
+the request's session. Rows are only needed until every cached entry they
+could evict has expired; prune_invalidations() (run by the stale sweeper)
+deletes them after the cache TTL. Run migrate_identity_cache.py before
+enabling.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+DEFAULT_MAX_ENTRIES = 5000
+DEFAULT_TTL = 300  # seconds
+DEFAULT_POLL_SECONDS = 5
+DEFAULT_POLL_OVERLAP_SECONDS = 60  # longer than any transaction that bumps a version
+
+USER = 'user'
+ADMIN = 'admin'
+
+# Detached snapshot; ORM instances are never shared across requests
+Identity = namedtuple('Identity', [
+    'kind', 'id', 'auth_version', 'email', 'name', 'is_active',
+    'is_super_admin', 'role_id', 'role_name', 'permissions',
+])
+
+
+def snapshot_user(user):
+    return Identity(
+        kind=USER,
+        id=user.id,
+        auth_version=getattr(user, 'auth_version', 0) or 0,
+        email=user.email,
+        name=user.name,
+        is_active=getattr(user, 'is_active', True),
+        is_super_admin=False,
+        role_id=None,
+        role_name=None,
+        permissions=frozenset(),
+    )
+
+
+def snapshot_admin(admin):
+    role = admin.role
+    return Identity(
+        kind=ADMIN,
+        id=admin.id,
+        auth_version=getattr(admin, 'auth_version', 0) or 0,
+        email=admin.email,
+        name=f"{admin.first_name} {admin.last_name}".strip(),
+        is_active=admin.is_active,
+        is_super_admin=bool(admin.is_super_admin),
+        role_id=role.id if role else None,
+        role_name=role.name if role else None,
+        permissions=frozenset(role.permissions or []) if role else frozenset(),
+    )
+
+
+class IdentityCache:
+    """LRU + TTL cache of identity snapshots with polled invalidation"""
+
+    def __init__(self, max_entries=None, ttl=None, poll_seconds=None):
+        self.max_entries = max_entries or int(
+            os.environ.get('IDENTITY_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES))
+        self.ttl = ttl or float(os.environ.get('IDENTITY_CACHE_TTL', DEFAULT_TTL))
+        self.poll_seconds = poll_seconds or float(
+            os.environ.get('IDENTITY_CACHE_POLL_SECONDS', DEFAULT_POLL_SECONDS))
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.poll_overlap = float(
+            os.environ.get('IDENTITY_CACHE_POLL_OVERLAP_SECONDS', DEFAULT_POLL_OVERLAP_SECONDS))
+        self._polled_at = None
+        self._seen_ids = {}  # invalidation id -> monotonic time it can be forgotten
+        self._next_poll = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, kind, subject, version):
+        return (kind, str(subject), int(version or 0))
+
+    def get(self, kind, subject, version, loader):
+        """
+        Return the snapshot for a token subject, calling loader() (which
+        queries the DB and returns a snapshot or None) only on a miss.
+        """
+        self._maybe_poll_invalidations()
+        key = self._key(kind, subject, version)
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+            self.misses += 1
+        identity = loader()
+        if identity is None or identity.auth_version != key[2]:
+            # Token issued before the last version bump; force re-auth
+            return None
+
+        with self._lock:
+            self._entries[key] = (now + self.ttl, identity)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return identity
+
+    def evict(self, kind, subject):
+        subject = str(subject)
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == kind and k[1] == subject]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _maybe_poll_invalidations(self):
+        now = time.monotonic()
+        if now < self._next_poll:
+            return
+        self._next_poll = now + self.poll_seconds
+
+        from app import db
+        polled_at = datetime.utcnow()
+        # Nothing is cached before the first poll, so it starts from now
+        since = (self._polled_at or polled_at) - timedelta(seconds=self.poll_overlap)
+        try:
+            # Separate connection: a failure here must not roll back the
+            # request's pending work in db.session
+            with db.engine.connect() as conn:
+                rows = conn.execute(text("""
+                    SELECT id, subject_kind, subject_id
+                    FROM auth_invalidations
+                    WHERE created_at >= :since
+                    ORDER BY id
+                """), {'since': since}).fetchall()
+        except Exception:
+            # Table missing or DB hiccup: fail safe by dropping everything
+            self.clear()
+            return
+
+        # A row keeps matching until `since` passes its created_at, at most
+        # one overlap plus a poll interval after it was first seen
+        forget_at = now + self.poll_overlap + 2 * self.poll_seconds
+        for row in rows:
+            if row.id in self._seen_ids:
+                continue
+            self.evict(row.subject_kind, row.subject_id)
+            self._seen_ids[row.id] = forget_at
+        self._seen_ids = {id_: until for id_, until in self._seen_ids.items() if until > now}
+        self._polled_at = polled_at
+
+    def get_stats(self):
+        with self._lock:
+            size = len(self._entries)
+        return {'size': size, 'hits': self.hits, 'misses': self.misses,
+                'max_entries': self.max_entries, 'ttl': self.ttl}
+
+
+identity_cache = IdentityCache()
+
+
+def bump_identity_version(kind, subject_id):
+    """
+    Call on role, permission, password or deactivation changes, inside the
+    same transaction as the change (the caller commits).
+    """
+    from app import db
+
+    table = 'admin_users' if kind == ADMIN else 'users'
+    db.session.execute(text(f"""
+        UPDATE {table}
+        SET auth_version = COALESCE(auth_version, 0) + 1
+        WHERE id = :subject_id
+    """), {'subject_id': subject_id})
+    db.session.execute(text("""
+        INSERT INTO auth_invalidations (subject_kind, subject_id, created_at)
+        VALUES (:kind, :subject_id, :now)
+    """), {'kind': kind, 'subject_id': str(subject_id), 'now': datetime.utcnow()})
+    identity_cache.evict(kind, subject_id)
+
+
+def bump_role_identity_versions(role_id):
+    """Invalidate every admin holding a role whose permissions changed"""
+    from app import db
+
+    db.session.execute(text("""
+        UPDATE admin_users
+        SET auth_version = COALESCE(auth_version, 0) + 1
+        WHERE role_id = :role_id
+    """), {'role_id': role_id})
+    db.session.execute(text("""
+        INSERT INTO auth_invalidations (subject_kind, subject_id, created_at)
+        SELECT :kind, CAST(id AS VARCHAR(64)), :now
+        FROM admin_users
+        WHERE role_id = :role_id
+    """), {'kind': ADMIN, 'role_id': role_id, 'now': datetime.utcnow()})
+    identity_cache.clear()
+
+
+def prune_invalidations(batch_size=1000):
+    """
+    Delete invalidations older than the cache TTL plus the poll interval
+    and overlap; by then every entry they could evict has expired and every
+    worker has read them. Returns the count.
+    """
+    from app import db
+
+    cutoff = datetime.utcnow() - timedelta(seconds=(
+        identity_cache.ttl + identity_cache.poll_seconds + identity_cache.poll_overlap))
+    total = 0
+    while True:
+        deleted = db.session.execute(text("""
+            DELETE FROM auth_invalidations WHERE id IN (
+                SELECT id FROM auth_invalidations WHERE created_at < :cutoff LIMIT :batch_size
+            )
+        """), {'cutoff': cutoff, 'batch_size': batch_size}).rowcount
+        db.session.commit()
+        total += deleted
+        if deleted < batch_size:
+            return total
+
+
+def get_current_identity(kind=USER):
+    """
+    Identity for the current request's JWT. Tokens carry the account's
+    auth_version in the 'ver' claim (add it via additional_claims at login).
+    """
+    from flask_jwt_extended import get_jwt, get_jwt_identity
+    from app.models import AdminUser, User
+
+    subject = get_jwt_identity()
+    version = get_jwt().get('ver', 0)
+
+    def load():
+        if kind == ADMIN:
+            admin = AdminUser.query.get(int(subject))
+            return snapshot_admin(admin) if admin else None
+        user = User.query.get(int(subject))
+        return snapshot_user(user) if user else None
+
+    return identity_cache.get(kind, subject, version, load)
@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+"""
+Image Variant Pipeline
+Admin uploads (cyber service and product images) are stored as-is and
+acknowledged immediately; a background job then renders thumb/card/detail
+variants in WebP and JPEG in a process pool, so Pillow decode/resize/encode
+never runs on a web worker's request thread.
+
+Variant URLs are derived from the upload's key, so the API can return
+srcset-ready URLs without extra columns:
+
+    /static/uploads/cyber-services/<key>.<ext>            original (served until ready)
+    /static/uploads/cyber-services/<key>-card.webp        card variant, WebP
+    /static/uploads/cyber-services/<key>-card.jpg         card variant, JPEG fallback
+
+Upload endpoints call handle_image_upload(); serializers call
+image_sources(image_url) to add `srcset` / `webp_srcset` when variants exist.
+Rows saved with the original URL are repointed at the detail JPEG once the
+variants are written.
+
+Keys are the SHA-256 of the uploaded bytes, so uploading the same picture
+twice stores (and renders) it once; image_blobs keeps a reference count and
+delete_upload() only removes files when the last reference goes. Because a
+content-addressed URL can never change meaning, send_upload() serves them
+with `Cache-Control: immutable` and a one-year expiry. Older uuid-named
+uploads keep a short max-age.
+
+Run migrate_image_blobs.py once to create the image_blobs table.
+"""
+
+import glob
+import hashlib
+import io
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+from background_jobs import create_job, register_job, start_job, update_job
+
+JOB_TYPE = 'image_variants'
+
+ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
+MAX_UPLOAD_BYTES = 5 * 1024 * 1024
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+LEGACY_MAX_AGE = 3600
+
+# name -> bounding box; ordered largest first so each resize starts from the
+# previous (already smaller) variant
+VARIANTS = [
+    ('detail', (1200, 900)),
+    ('card', (400, 300)),
+    ('thumb', (160, 160)),
+]
+FORMATS = [
+    ('webp', 'WEBP', {'quality': 80, 'method': 4}),
+    ('jpg', 'JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+]
+
+# upload kind -> (directory under static/uploads, [(table, image column), ...])
+UPLOAD_KINDS = {
+    'cyber-services': ('cyber-services', [('cyber_services', 'image_url')]),
+    'products': ('products', [('product_images', 'image_url'), ('products', 'image_url')]),
+}
+
+# 64 hex chars: SHA-256 content key; 32: legacy uuid4 upload
+_KEY_PATTERN = re.compile(
+    r'^/static/uploads/(?P<folder>[\w-]+)/(?P<key>[0-9a-f]{64}|[0-9a-f]{32})(?:-\w+)?\.\w+$')
+_CONTENT_NAME = re.compile(r'^[0-9a-f]{64}(?:-\w+)?\.\w+$')
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+class InvalidImage(ValueError):
+    """Upload rejected before it is stored; routes return 400"""
+
+
+def _uploads_root():
+    from flask import current_app
+    return os.path.join(current_app.root_path, '..', 'static', 'uploads')
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            workers = int(os.environ.get('IMAGE_WORKERS') or max(1, (os.cpu_count() or 2) // 2))
+            _pool = ProcessPoolExecutor(max_workers=workers)
+        return _pool
+
+
+def allowed_file(filename):
+    """Check if file extension is allowed"""
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+
+
+def variant_url(folder, key, variant, ext):
+    return f"/static/uploads/{folder}/{key}-{variant}.{ext}"
+
+
+def _variant_urls(folder, key):
+    return {variant: {ext: variant_url(folder, key, variant, ext) for ext, _, _ in FORMATS}
+            for variant, _ in VARIANTS}
+
+
+def _add_reference(folder, key, ext, size):
+    """
+    Take a reference on a blob; returns (ext, is_new). Concurrent uploads of
+    the same bytes resolve to one row, and only the first writes the file.
+    """
+    from sqlalchemy import text
+    from app import db
+
+    params = {'folder': folder, 'key': key, 'ext': ext, 'size': size, 'now': datetime.utcnow()}
+    if db.engine.dialect.name == 'postgresql':
+        row = db.session.execute(text("""
+            INSERT INTO image_blobs (folder, content_key, ext, size_bytes, ref_count, created_at)
+            VALUES (:folder, :key, :ext, :size, 1, :now)
+            ON CONFLICT (folder, content_key)
+            DO UPDATE SET ref_count = image_blobs.ref_count + 1
+            RETURNING ext, ref_count
+        """), params).one()
+        return row.ext, row.ref_count == 1
+
+    updated = db.session.execute(text("""
+        UPDATE image_blobs SET ref_count = ref_count + 1
+        WHERE folder = :folder AND content_key = :key
+    """), params).rowcount
+    if updated:
+        ext = db.session.execute(text("""
+            SELECT ext FROM image_blobs WHERE folder = :folder AND content_key = :key
+        """), params).scalar()
+        return ext, False
+    db.session.execute(text("""
+        INSERT INTO image_blobs (folder, content_key, ext, size_bytes, ref_count, created_at)
+        VALUES (:folder, :key, :ext, :size, 1, :now)
+    """), params)
+    return ext, True
+
+
+def save_raw_upload(file, kind):
+    """
+    Validate and store the original bytes under their content hash.
+    Returns (key, url, path, is_new); is_new is False for a duplicate, whose
+    file (and variants) already exist. Caller commits.
+    """
+    if kind not in UPLOAD_KINDS:
+        raise InvalidImage(f"Unknown upload kind {kind!r}")
+    if not file or file.filename == '':
+        raise InvalidImage('No file selected')
+    if not allowed_file(file.filename):
+        raise InvalidImage('Invalid file type. Allowed: PNG, JPG, JPEG, GIF, WEBP')
+
+    data = file.read(MAX_UPLOAD_BYTES + 1)
+    if len(data) > MAX_UPLOAD_BYTES:
+        raise InvalidImage('File too large. Maximum size is 5MB')
+
+    folder = UPLOAD_KINDS[kind][0]
+    upload_dir = os.path.join(_uploads_root(), folder)
+    os.makedirs(upload_dir, exist_ok=True)
+
+    key = hashlib.sha256(data).hexdigest()
+    ext, is_new = _add_reference(folder, key, file.filename.rsplit('.', 1)[1].lower(), len(data))
+    path = os.path.join(upload_dir, f"{key}.{ext}")
+    if is_new or not os.path.exists(path):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    return key, f"/static/uploads/{folder}/{key}.{ext}", path, is_new
+
+
+def _drop_reference(folder, key):
+    """Release one reference; returns (dropped, was_last)"""
+    from sqlalchemy import text
+    from app import db
+
+    params = {'folder': folder, 'key': key}
+    updated = db.session.execute(text("""
+        UPDATE image_blobs SET ref_count = ref_count - 1
+        WHERE folder = :folder AND content_key = :key AND ref_count > 0
+    """), params).rowcount
+    if not updated:
+        return False, False
+    deleted = db.session.execute(text("""
+        DELETE FROM image_blobs
+        WHERE folder = :folder AND content_key = :key AND ref_count = 0
+    """), params).rowcount
+    db.session.commit()
+    return True, deleted == 1
+
+
+def delete_upload(kind, filename):
+    """
+    Drop one reference to an upload, given the original or any variant
+    name; the original and its variants are removed only with the last
+    reference. Legacy uuid uploads are removed directly. False when there
+    was nothing to delete (unknown name or no reference left).
+    """
+    folder = UPLOAD_KINDS[kind][0]
+    upload_dir = os.path.join(_uploads_root(), folder)
+    match = _KEY_PATTERN.match(f"/static/uploads/{folder}/{filename}")
+    if match is None:
+        # Not one of our generated names; remove the file itself if present
+        path = os.path.join(upload_dir, filename)
+        if os.path.exists(path):
+            os.remove(path)
+            return True
+        return False
+
+    key = match.group('key')
+    if len(key) == 64:
+        dropped, last = _drop_reference(folder, key)
+        if not dropped:
+            return False
+        if not last:
+            return True
+
+    removed = False
+    for pattern in (f"{key}.*", f"{key}-*.*"):
+        for path in glob.glob(os.path.join(upload_dir, pattern)):
+            os.remove(path)
+            removed = True
+    # A content-addressed reference was dropped even if the files were already gone
+    return removed or len(key) == 64
+
+
+def render_variants(raw_path, out_dir, key):
+    """
+    Runs in a pool process. Decodes once (using JPEG draft mode to decode at
+    reduced scale when the source is much larger than the detail box) and
+    writes every variant/format pair. Returns {filename: bytes written}.
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(raw_path) as source:
+        if source.format == 'JPEG':
+            source.draft('RGB', VARIANTS[0][1])
+        img = ImageOps.exif_transpose(source)
+        if img.mode in ('RGBA', 'LA', 'P'):
+            rgba = img.convert('RGBA')
+            img = Image.new('RGB', rgba.size, (255, 255, 255))
+            img.paste(rgba, mask=rgba.split()[-1])
+        elif img.mode != 'RGB':
+            img = img.convert('RGB')
+
+    written = {}
+    for variant, box in VARIANTS:
+        img.thumbnail(box, Image.Resampling.LANCZOS)
+        for ext, fmt, options in FORMATS:
+            filename = f"{key}-{variant}.{ext}"
+            buffer = io.BytesIO()
+            img.save(buffer, format=fmt, **options)
+            tmp_path = os.path.join(out_dir, filename + '.tmp')
+            with open(tmp_path, 'wb') as f:
+                f.write(buffer.getvalue())
+            os.replace(tmp_path, os.path.join(out_dir, filename))
+            written[filename] = buffer.tell()
+    return written
+
+
+def image_sources(image_url):
+    """
+    srcset fields for an uploaded image_url, or {} when it is external or
+    its variants are not rendered yet (clients keep using image_url).
+    """
+    match = _KEY_PATTERN.match(image_url or '')
+    if not match:
+        return {}
+    folder, key = match.group('folder'), match.group('key')
+    smallest = VARIANTS[-1][0]
+    if not os.path.exists(os.path.join(_uploads_root(), folder, f"{key}-{smallest}.jpg")):
+        return {}
+
+    def srcset(ext):
+        return ', '.join(f"{variant_url(folder, key, variant, ext)} {box[0]}w"
+                         for variant, box in reversed(VARIANTS))
+
+    return {
+        'srcset': srcset('jpg'),
+        'webp_srcset': srcset('webp'),
+        'variants': _variant_urls(folder, key),
+    }
+
+
+def queue_image_variants(kind, key, image_url, raw_path, created_by=None):
+    """Queue variant rendering; caller commits then start_job()s"""
+    return create_job(JOB_TYPE, {
+        'kind': kind, 'key': key, 'image_url': image_url, 'raw_path': os.path.abspath(raw_path),
+    }, created_by=created_by)
+
+
+def handle_image_upload(file, kind, created_by=None):
+    """
+    Store the upload, queue its variants and return the response payload.
+    image_url is usable immediately; srcset URLs resolve once the job is done.
+    """
+    from flask import current_app
+    from app import db
+
+    folder = UPLOAD_KINDS[kind][0]
+    key, image_url, raw_path, is_new = save_raw_upload(file, kind)
+    job_id = None
+    if is_new:
+        job_id = queue_image_variants(kind, key, image_url, raw_path, created_by)
+    db.session.commit()
+    if job_id:
+        start_job(current_app._get_current_object(), job_id)
+    elif os.path.exists(os.path.join(_uploads_root(), folder, f"{key}-detail.jpg")):
+        # Same picture uploaded before and already rendered
+        image_url = variant_url(folder, key, 'detail', 'jpg')
+
+    return {
+        'success': True,
+        'message': 'Image uploaded successfully',
+        'image_url': image_url,
+        'filename': os.path.basename(raw_path),
+        'job_id': job_id,
+        'deduplicated': not is_new,
+        'variants': _variant_urls(folder, key),
+    }
+
+
+def send_upload(filename):
+    """
+    Serve a file under static/uploads. Content-addressed files are immutable
+    for a year; legacy uuid names, which delete-image could reuse, are not.
+    """
+    from flask import send_from_directory
+
+    response = send_from_directory(_uploads_root(), filename, conditional=True)
+    if _CONTENT_NAME.match(os.path.basename(filename)):
+        response.headers['Cache-Control'] = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+        response.expires = datetime.utcnow() + timedelta(seconds=IMMUTABLE_MAX_AGE)
+    else:
+        response.headers['Cache-Control'] = f'public, max-age={LEGACY_MAX_AGE}'
+    return response
+
+
+@register_job(JOB_TYPE)
+def run_image_variants(job_id, payload):
+    """
+    Render in the process pool, then repoint rows already saved with the
+    original URL at the detail JPEG so plain image_url readers shrink too.
+    """
+    from sqlalchemy import text
+    from app import db
+
+    kind, key = payload['kind'], payload['key']
+    folder, targets = UPLOAD_KINDS[kind]
+    out_dir = os.path.dirname(payload['raw_path'])
+
+    written = _get_pool().submit(render_variants, payload['raw_path'], out_dir, key).result()
+    update_job(job_id, progress={'variants': len(written)})
+
+    repointed = 0
+    for table, column in targets:
+        repointed += db.session.execute(text(f"""
+            UPDATE {table} SET {column} = :detail_url WHERE {column} = :image_url
+        """), {'detail_url': variant_url(folder, key, 'detail', 'jpg'),
+               'image_url': payload['image_url']}).rowcount
+    db.session.commit()
+
+    return {'key': key, 'bytes': written, 'total_bytes': sum(written.values()),
+            'repointed': repointed}
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    # Render variants for a local file: python image_variants.py photo.jpg [out_dir]
+    if len(sys.argv) < 2:
+        print("Usage: python image_variants.py <image> [out_dir]")
+        sys.exit(1)
+    raw = sys.argv[1]
+    out = sys.argv[2] if len(sys.argv) > 2 else os.path.dirname(os.path.abspath(raw))
+    started = time.perf_counter()
+    sizes = render_variants(raw, out, 'preview')
+    print(f"🖼️ Original: {os.path.getsize(raw):,} bytes")
+    for name, size in sizes.items():
+        print(f"   {name}: {size:,} bytes")
+    print(f"✅ Rendered {len(sizes)} files in {time.perf_counter() - started:.2f}s")
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Atomic Inventory Reservations
+Checkout decrements stock with one conditional UPDATE per product
+(`... SET stock_quantity = stock_quantity - :qty WHERE stock_quantity >= :qty`),
+so concurrent checkouts can neither oversell nor serialize on row locks held
+across the request. The decrement is recorded as a reservation with a TTL:
+- M-Pesa callback marks the order paid -> commit_order_reservations()
+- cancellation / failed payment          -> release_order_reservations()
+- TTL passes while still unpaid          -> release_expired_reservations()
+  (run from the sweeper, or `python inventory_reservations.py`), which
+  cancels the pending order in the same transaction, so stock that went
+  back on the shelf can no longer be paid for
+
+Run migrate_inventory_reservations.py once to create the table.
+"""
+
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import bindparam, text
+
+RESERVED = 'reserved'
+COMMITTED = 'committed'
+RELEASED = 'released'
+
+DEFAULT_TTL_MINUTES = 30
+
+
+class OutOfStock(Exception):
+    """Raised when a conditional decrement matched no row; caller rolls back"""
+
+    def __init__(self, product_id, requested):
+        super().__init__(f"Insufficient stock for product {product_id} (requested {requested})")
+        self.product_id = product_id
+        self.requested = requested
+
+
+def get_reservation_ttl():
+    return timedelta(minutes=int(os.environ.get('STOCK_RESERVATION_TTL_MINUTES', DEFAULT_TTL_MINUTES)))
+
+
+def reserve_order_items(order_id, items, ttl=None):
+    """
+    Decrement stock for [(product_id, quantity), ...] inside the caller's
+    transaction. Products are locked in id order to avoid deadlocks between
+    overlapping carts. Raises OutOfStock on the first item that cannot be met.
+    """
+    from app import db
+
+    totals = {}
+    for product_id, quantity in items:
+        totals[product_id] = totals.get(product_id, 0) + int(quantity)
+
+    now = datetime.utcnow()
+    expires_at = now + (ttl or get_reservation_ttl())
+    reservations = []
+    for product_id in sorted(totals):
+        quantity = totals[product_id]
+        updated = db.session.execute(text("""
+            UPDATE products
+            SET stock_quantity = stock_quantity - :quantity
+            WHERE id = :product_id
+              AND is_active = :is_active
+              AND stock_quantity >= :quantity
+        """), {'quantity': quantity, 'product_id': product_id, 'is_active': True}).rowcount
+        if updated != 1:
+            raise OutOfStock(product_id, quantity)
+        reservations.append({
+            'order_id': order_id, 'product_id': product_id, 'quantity': quantity,
+            'status': RESERVED, 'expires_at': expires_at, 'created_at': now,
+        })
+
+    db.session.execute(text("""
+        INSERT INTO inventory_reservations
+            (order_id, product_id, quantity, status, expires_at, created_at)
+        VALUES
+            (:order_id, :product_id, :quantity, :status, :expires_at, :created_at)
+    """), reservations)
+    return expires_at
+
+
+def commit_order_reservations(order_id):
+    """
+    Payment settled: the stock stays decremented for good. Returns 0 when
+    the reservation already expired; the order was cancelled with it, so
+    the payment callback must refund instead of fulfilling.
+    """
+    return commit_orders_reservations([order_id])
+
+
+def commit_orders_reservations(order_ids):
+    """Bulk form for admin payment updates; one UPDATE, caller commits"""
+    from app import db
+
+    order_ids = list(order_ids)
+    if not order_ids:
+        return 0
+    return db.session.execute(text("""
+        UPDATE inventory_reservations
+        SET status = :committed, resolved_at = :now
+        WHERE order_id IN :order_ids AND status = :reserved
+    """).bindparams(bindparam('order_ids', expanding=True)),
+        {'committed': COMMITTED, 'reserved': RESERVED, 'order_ids': order_ids,
+         'now': datetime.utcnow()}).rowcount
+
+
+def _release(where_sql, params, limit=None, expanding=(), from_status=RESERVED):
+    """
+    Flip matching rows in from_status (reserved, or committed for paid
+    orders being cancelled) to released and give their stock back.
+    The status guard makes each reservation release at most once even when
+    the sweeper and a cancellation race.
+    """
+    from app import db
+
+    params = dict(params, reserved=from_status, released=RELEASED, now=datetime.utcnow())
+    limit_sql = f"LIMIT {int(limit)}" if limit else ''
+    expanding = [bindparam(name, expanding=True) for name in expanding]
+
+    if db.engine.dialect.name == 'postgresql':
+        row = db.session.execute(text(f"""
+            WITH candidates AS (
+                SELECT id FROM inventory_reservations
+                WHERE status = :reserved AND {where_sql}
+                ORDER BY id
+                {limit_sql}
+                FOR UPDATE SKIP LOCKED
+            ), released AS (
+                UPDATE inventory_reservations r
+                SET status = :released, resolved_at = :now
+                FROM candidates c
+                WHERE r.id = c.id AND r.status = :reserved
+                RETURNING r.product_id, r.quantity
+            ), totals AS (
+                SELECT product_id, SUM(quantity) AS quantity
+                FROM released GROUP BY product_id
+            ), restocked AS (
+                UPDATE products p
+                SET stock_quantity = p.stock_quantity + t.quantity
+                FROM totals t
+                WHERE p.id = t.product_id
+                RETURNING t.quantity
+            )
+            SELECT COUNT(*) AS released_count,
+                   COALESCE((SELECT SUM(quantity) FROM restocked), 0) AS units
+            FROM released
+        """).bindparams(*expanding), params).one()
+        return {'reservations': int(row.released_count), 'units': int(row.units)}
+
+    rows = db.session.execute(text(f"""
+        SELECT id, product_id, quantity FROM inventory_reservations
+        WHERE status = :reserved AND {where_sql}
+        ORDER BY id
+        {limit_sql}
+    """).bindparams(*expanding), params).fetchall()
+
+    released = units = 0
+    for row in rows:
+        flipped = db.session.execute(text("""
+            UPDATE inventory_reservations
+            SET status = :released, resolved_at = :now
+            WHERE id = :id AND status = :reserved
+        """), dict(params, id=row.id)).rowcount
+        if flipped:
+            db.session.execute(text("""
+                UPDATE products SET stock_quantity = stock_quantity + :quantity WHERE id = :product_id
+            """), {'quantity': row.quantity, 'product_id': row.product_id})
+            released += 1
+            units += row.quantity
+    return {'reservations': released, 'units': units}
+
+
+def release_order_reservations(order_id):
+    """Order cancelled or payment failed; caller commits"""
+    return _release('order_id = :order_id', {'order_id': order_id})
+
+
+def release_orders_reservations(order_ids):
+    """Bulk cancellation; caller commits"""
+    order_ids = list(order_ids)
+    if not order_ids:
+        return {'reservations': 0, 'units': 0}
+    return _release('order_id IN :order_ids', {'order_ids': order_ids}, expanding=['order_ids'])
+
+
+def _add(totals, result):
+    totals['reservations'] += result['reservations']
+    totals['units'] += result['units']
+
+
+def restock_orders_reservations(order_ids):
+    """
+    Paid orders cancelled after all: their committed reservations are
+    released and the stock goes back on the shelf. Caller commits.
+    """
+    order_ids = list(order_ids)
+    if not order_ids:
+        return {'reservations': 0, 'units': 0}
+    return _release('order_id IN :order_ids', {'order_ids': order_ids}, expanding=['order_ids'],
+                    from_status=COMMITTED)
+
+
+def cancel_expired_orders(order_ids):
+    """
+    Cancel the locked pending, unpaid orders whose reservation expired, with
+    a 'cancelled' timeline event (order_events); caller commits
+    """
+    from order_events import bulk_update_order_status
+
+    return bulk_update_order_status(
+        order_ids, 'cancelled', note='Expired: stock reservation timed out')
+
+
+def release_expired_reservations(batch_size=500):
+    """
+    Release reservations whose TTL passed, committing per batch:
+    - unpaid pending orders holding one are locked, released and cancelled
+      together, so a late payment finds a cancelled order rather than a
+      payable one whose stock was sold again
+    - reservations of orders that are no longer pending (or gone) are
+      just released
+    Paid orders are left alone; their callback commits the reservation.
+    """
+    from app import db
+
+    skip_locked = 'FOR UPDATE SKIP LOCKED' if db.engine.dialect.name == 'postgresql' else ''
+    totals = {'reservations': 0, 'units': 0, 'orders_expired': 0}
+    while True:
+        order_ids = db.session.execute(text(f"""
+            SELECT o.id FROM orders o
+            WHERE o.status = :pending AND o.payment_status <> :paid
+              AND EXISTS (
+                SELECT 1 FROM inventory_reservations r
+                WHERE r.order_id = o.id AND r.status = :reserved AND r.expires_at < :now)
+            ORDER BY o.id
+            LIMIT :batch_size
+            {skip_locked}
+        """), {'pending': 'pending', 'paid': 'paid', 'reserved': RESERVED,
+               'now': datetime.utcnow(), 'batch_size': batch_size}).scalars().all()
+        if order_ids:
+            _add(totals, release_orders_reservations(order_ids))
+            totals['orders_expired'] += cancel_expired_orders(order_ids)
+        db.session.commit()
+        if len(order_ids) < batch_size:
+            break
+
+    while True:
+        result = _release("""expires_at < :now AND NOT EXISTS (
+            SELECT 1 FROM orders o WHERE o.id = inventory_reservations.order_id
+              AND (o.status = :pending OR o.payment_status = :paid))""",
+                          {'pending': 'pending', 'paid': 'paid'}, limit=batch_size)
+        db.session.commit()
+        _add(totals, result)
+        if result['reservations'] < batch_size:
+            return totals
+
+
+if __name__ == "__main__":
+    from app import create_app
+
+    app = create_app()
+    with app.app_context():
+        print("📦 Releasing expired stock reservations...")
+        result = release_expired_reservations()
+        print(f"✅ Released {result['reservations']} reservations ({result['units']} units back in stock)")
+        print(f"   Cancelled {result['orders_expired']} unpaid orders whose reservation expired")
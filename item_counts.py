@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Counter-Cached Cart and Wishlist Counts
+The storefront header asks for /api/cart/count and /api/wishlist/count on
+every navigation. Instead of loading the Cart/Wishlist and counting (and
+filtering inactive products item by item), each user has one
+user_item_counts row holding both numbers, kept current by SQLAlchemy events:
+- CartItem / WishlistItem insert and delete adjust the counter by one, in
+  the same flush, only when the product is active
+- Product is_active changes recompute the counters of every user holding
+  that product, in one set-based UPDATE
+
+Bulk deletes (e.g. Query.delete() when a cart is cleared after checkout)
+bypass ORM events; call refresh_item_counts([user_id]) after them.
+
+    register_item_count_events()                  # once, in create_app()
+    return item_count_response(user_id, 'cart')   # GET /api/cart/count
+
+Run migrate_item_counts.py once to create and backfill the table.
+"""
+
+from datetime import datetime
+
+from sqlalchemy import bindparam, event, inspect, text
+
+KINDS = ('cart', 'wishlist')
+
+CART_COUNT_SQL = """
+    SELECT COUNT(*) FROM cart_items ci
+    JOIN carts c ON c.id = ci.cart_id
+    JOIN products p ON p.id = ci.product_id
+    WHERE c.user_id = {user_id} AND p.is_active = :is_active
+"""
+
+WISHLIST_COUNT_SQL = """
+    SELECT COUNT(*) FROM wishlist_items wi
+    JOIN wishlists w ON w.id = wi.wishlist_id
+    JOIN products p ON p.id = wi.product_id
+    WHERE w.user_id = {user_id} AND p.is_active = :is_active
+"""
+
+HOLDERS_SQL = """
+    SELECT c.user_id FROM carts c JOIN cart_items ci ON ci.cart_id = c.id
+    WHERE ci.product_id = :product_id
+    UNION
+    SELECT w.user_id FROM wishlists w JOIN wishlist_items wi ON wi.wishlist_id = w.id
+    WHERE wi.product_id = :product_id
+"""
+
+_ITEM_TABLES = {
+    'cart': ('cart_count', 'carts', 'cart_id'),
+    'wishlist': ('wishlist_count', 'wishlists', 'wishlist_id'),
+}
+
+_registered = False
+
+
+def _session():
+    from app import db
+    return db.session
+
+
+def _recompute_sql(where_sql):
+    return f"""
+        UPDATE user_item_counts
+        SET cart_count = ({CART_COUNT_SQL.format(user_id='user_item_counts.user_id')}),
+            wishlist_count = ({WISHLIST_COUNT_SQL.format(user_id='user_item_counts.user_id')}),
+            updated_at = :now
+        WHERE {where_sql}
+    """
+
+
+def refresh_item_counts(user_ids, connection=None):
+    """Recompute the counters of the given users (after bulk changes)"""
+    user_ids = list(user_ids)
+    if not user_ids:
+        return 0
+    executor = connection if connection is not None else _session()
+    statement = text(_recompute_sql('user_id IN :user_ids')).bindparams(
+        bindparam('user_ids', expanding=True))
+    return executor.execute(statement, {
+        'user_ids': user_ids, 'is_active': True, 'now': datetime.utcnow()}).rowcount
+
+
+def recompute_all_item_counts(connection=None):
+    """Recompute every counter (after migrations or bulk cleanups)"""
+    executor = connection if connection is not None else _session()
+    return executor.execute(text(_recompute_sql('1 = 1')), {
+        'is_active': True, 'now': datetime.utcnow()}).rowcount
+
+
+def refresh_product_holders(product_id, connection=None):
+    """Recompute the counters of everyone with the product in a cart or wishlist"""
+    executor = connection if connection is not None else _session()
+    return executor.execute(text(_recompute_sql(f'user_id IN ({HOLDERS_SQL})')), {
+        'product_id': product_id, 'is_active': True, 'now': datetime.utcnow()}).rowcount
+
+
+def _adjust(connection, kind, container_id, product_id, delta):
+    """+/-1 on the owner's counter when the item's product is active"""
+    column, container_table, _ = _ITEM_TABLES[kind]
+    connection.execute(text(f"""
+        UPDATE user_item_counts
+        SET {column} = CASE WHEN {column} + :delta < 0 THEN 0 ELSE {column} + :delta END,
+            updated_at = :now
+        WHERE user_id = (SELECT user_id FROM {container_table} WHERE id = :container_id)
+          AND EXISTS (SELECT 1 FROM products WHERE id = :product_id AND is_active = :is_active)
+    """), {'delta': delta, 'container_id': container_id, 'product_id': product_id,
+           'is_active': True, 'now': datetime.utcnow()})
+
+
+def adjust_item_count(kind, container_id, product_id, delta, connection=None):
+    """For Core inserts/deletes that bypass the ORM events (see item_storage.py)"""
+    _adjust(connection if connection is not None else _session(), kind,
+            container_id, product_id, delta)
+
+
+def _listen_items(model, kind):
+    container_attr = _ITEM_TABLES[kind][2]
+
+    def after_insert(mapper, connection, target):
+        _adjust(connection, kind, getattr(target, container_attr), target.product_id, 1)
+
+    def after_delete(mapper, connection, target):
+        _adjust(connection, kind, getattr(target, container_attr), target.product_id, -1)
+
+    def after_update(mapper, connection, target):
+        state = inspect(target)
+        moved = [state.attrs[name].history for name in (container_attr, 'product_id')]
+        if not any(history.has_changes() for history in moved):
+            return
+        container_history, product_history = moved
+        old_container = (container_history.deleted or [getattr(target, container_attr)])[0]
+        old_product = (product_history.deleted or [target.product_id])[0]
+        _adjust(connection, kind, old_container, old_product, -1)
+        _adjust(connection, kind, getattr(target, container_attr), target.product_id, 1)
+
+    event.listen(model, 'after_insert', after_insert)
+    event.listen(model, 'after_delete', after_delete)
+    event.listen(model, 'after_update', after_update)
+
+
+def register_item_count_events():
+    """Attach the counter maintenance listeners (idempotent)"""
+    global _registered
+    if _registered:
+        return
+    from app.models import CartItem, Product, WishlistItem
+
+    _listen_items(CartItem, 'cart')
+    _listen_items(WishlistItem, 'wishlist')
+
+    def product_updated(mapper, connection, target):
+        if inspect(target).attrs.is_active.history.has_changes():
+            refresh_product_holders(target.id, connection)
+
+    event.listen(Product, 'after_update', product_updated)
+    _registered = True
+
+
+def get_item_counts(user_id, commit=False):
+    """
+    {'cart': n, 'wishlist': n} from one primary-key read. A missing row is
+    computed and inserted in the same statement (ON CONFLICT DO NOTHING for
+    races), in the caller's transaction; pass commit=True only where the
+    request has nothing else pending (the count endpoints).
+    """
+    from app import db
+
+    select_counts = text("""
+        SELECT cart_count, wishlist_count FROM user_item_counts WHERE user_id = :user_id
+    """)
+    row = db.session.execute(select_counts, {'user_id': user_id}).first()
+    if row is None:
+        db.session.execute(text(f"""
+            INSERT INTO user_item_counts (user_id, cart_count, wishlist_count, updated_at)
+            SELECT :user_id, ({CART_COUNT_SQL.format(user_id=':user_id')}),
+                   ({WISHLIST_COUNT_SQL.format(user_id=':user_id')}), :now
+            ON CONFLICT (user_id) DO NOTHING
+        """), {'user_id': user_id, 'is_active': True, 'now': datetime.utcnow()})
+        if commit:
+            db.session.commit()
+        row = db.session.execute(select_counts, {'user_id': user_id}).one()
+    return {'cart': row.cart_count, 'wishlist': row.wishlist_count}
+
+
+def item_count_response(user_id, kind):
+    """Body for GET /api/cart/count and /api/wishlist/count"""
+    from flask import jsonify
+
+    if kind not in KINDS:
+        raise ValueError(f"Unknown count {kind!r}")
+    # A read-only endpoint, so a first-use counter row can be committed here
+    response = jsonify({'count': get_item_counts(user_id, commit=True)[kind]})
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def with_item_counts(payload, user_id):
+    """
+    Add cart_count / wishlist_count to a token refresh response so the
+    header needs no extra calls after a refresh.
+    """
+    counts = get_item_counts(user_id)
+    payload['cart_count'] = counts['cart']
+    payload['wishlist_count'] = counts['wishlist']
+    return payload
+
+
+if __name__ == "__main__":
+    from app import create_app, db
+
+    app = create_app()
+    with app.app_context():
+        print("🔄 Recomputing cart and wishlist counters...")
+        updated = recompute_all_item_counts()
+        db.session.commit()
+        print(f"✅ Recomputed counters for {updated} users")
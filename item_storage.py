@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Duplicate-Safe Cart and Wishlist Storage
+cart_items and wishlist_items carry unique (owner, product) indexes
+(migrate_item_uniqueness.py), and adds go through INSERT ... ON CONFLICT,
+so a double-clicked "add to wishlist" or two tabs adding the same product
+can no longer create duplicate rows. Adding a product already in the cart
+increases its quantity instead.
+
+Maintenance is set-based and batched: the item_cleanup background job (or
+`python item_storage.py`) deletes orphaned items and items of inactive or
+deleted products with DELETE ... WHERE id IN (SELECT ... LIMIT n), never
+loading a table into Python.
+
+Counters in user_item_counts (see item_counts.py) are adjusted for every
+row inserted or deleted here, and cart writes bump carts.updated_at so the
+stale sweeper (stale_sweeper.py) only reclaims carts nobody touched. Cart
+writes made elsewhere through the ORM bump it too once
+register_cart_activity() is called in create_app().
+"""
+
+from datetime import datetime
+
+from sqlalchemy import event, text
+
+from background_jobs import register_job, update_job
+from item_counts import adjust_item_count
+
+CLEANUP_JOB_TYPE = 'item_cleanup'
+DEFAULT_BATCH_SIZE = 1000
+
+# kind -> (container model, item model, container table, item table, container column)
+KINDS = {
+    'cart': ('Cart', 'CartItem', 'carts', 'cart_items', 'cart_id'),
+    'wishlist': ('Wishlist', 'WishlistItem', 'wishlists', 'wishlist_items', 'wishlist_id'),
+}
+
+
+class ProductUnavailable(ValueError):
+    """Product missing or inactive; routes return 404"""
+
+
+def _models(kind):
+    from app import models
+    container_model, item_model = KINDS[kind][:2]
+    return getattr(models, container_model), getattr(models, item_model)
+
+
+def _dialect_insert(table):
+    from app import db
+    if db.engine.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(table)
+
+
+def get_container_id(kind, user_id, create=True):
+    """The user's cart/wishlist id (oldest if several), created on demand"""
+    from app import db
+
+    container_table = KINDS[kind][2]
+    container_id = db.session.execute(text(f"""
+        SELECT id FROM {container_table} WHERE user_id = :user_id ORDER BY id LIMIT 1
+    """), {'user_id': user_id}).scalar()
+    if container_id is None and create:
+        container_model, _ = _models(kind)
+        container_id = db.session.execute(
+            container_model.__table__.insert().values(user_id=user_id)).inserted_primary_key[0]
+        if kind == 'cart':
+            # New carts start ageing now; the sweeper never sees NULL updated_at
+            touch_cart(container_id)
+    return container_id
+
+
+def touch_cart(container_id):
+    """Mark cart activity; the stale sweeper ages carts by carts.updated_at"""
+    from app import db
+
+    db.session.execute(text("""
+        UPDATE carts SET updated_at = :now WHERE id = :container_id
+    """), {'now': datetime.utcnow(), 'container_id': container_id})
+
+
+def register_cart_activity():
+    """Set carts.updated_at on ORM cart inserts and any cart item write"""
+    from app.models import Cart, CartItem
+
+    def touch(connection, cart_id):
+        connection.execute(text("""
+            UPDATE carts SET updated_at = :now WHERE id = :cart_id
+        """), {'now': datetime.utcnow(), 'cart_id': cart_id})
+
+    def touch_item_cart(mapper, connection, target):
+        touch(connection, target.cart_id)
+
+    def touch_new_cart(mapper, connection, target):
+        touch(connection, target.id)
+
+    for event_name in ('after_insert', 'after_update', 'after_delete'):
+        event.listen(CartItem, event_name, touch_item_cart)
+    event.listen(Cart, 'after_insert', touch_new_cart)
+
+
+def _require_active(product_id):
+    from app import db
+
+    active = db.session.execute(text("""
+        SELECT 1 FROM products WHERE id = :product_id AND is_active = :is_active
+    """), {'product_id': product_id, 'is_active': True}).scalar()
+    if not active:
+        raise ProductUnavailable(f"Product {product_id} is not available")
+
+
+def add_item(kind, user_id, product_id, quantity=1):
+    """
+    Upsert a product into the user's cart or wishlist; caller commits.
+    Returns {'added': True} for a new row, {'added': False} when it was
+    already there (cart quantity is increased by `quantity`).
+    """
+    from app import db
+
+    _require_active(product_id)
+    container_id = get_container_id(kind, user_id)
+    _, item_model = _models(kind)
+    container_column = KINDS[kind][4]
+
+    values = {container_column: container_id, 'product_id': product_id}
+    if kind == 'cart':
+        values['quantity'] = quantity
+        touch_cart(container_id)
+    inserted = db.session.execute(
+        _dialect_insert(item_model.__table__).values(**values).on_conflict_do_nothing(
+            index_elements=[container_column, 'product_id'])).rowcount
+
+    if inserted:
+        adjust_item_count(kind, container_id, product_id, 1)
+        return {'added': True, 'container_id': container_id}
+
+    if kind == 'cart':
+        db.session.execute(text("""
+            UPDATE cart_items SET quantity = quantity + :quantity
+            WHERE cart_id = :container_id AND product_id = :product_id
+        """), {'quantity': quantity, 'container_id': container_id, 'product_id': product_id})
+    return {'added': False, 'container_id': container_id}
+
+
+def set_cart_quantity(user_id, product_id, quantity):
+    """Set an absolute quantity; 0 or less removes the item. Caller commits."""
+    from app import db
+
+    if quantity <= 0:
+        return remove_item('cart', user_id, product_id)
+    container_id = get_container_id('cart', user_id, create=False)
+    if container_id is None:
+        return 0
+    touch_cart(container_id)
+    return db.session.execute(text("""
+        UPDATE cart_items SET quantity = :quantity
+        WHERE cart_id = :container_id AND product_id = :product_id
+    """), {'quantity': quantity, 'container_id': container_id, 'product_id': product_id}).rowcount
+
+
+def remove_item(kind, user_id, product_id):
+    """Delete a product from the user's cart or wishlist; caller commits"""
+    from app import db
+
+    container_table, item_table, container_column = KINDS[kind][2:]
+    params = {'user_id': user_id, 'product_id': product_id}
+    containers = db.session.execute(text(f"""
+        SELECT DISTINCT i.{container_column} FROM {item_table} i
+        JOIN {container_table} c ON c.id = i.{container_column}
+        WHERE c.user_id = :user_id AND i.product_id = :product_id
+    """), params).scalars().all()
+
+    removed = 0
+    for container_id in containers:
+        if kind == 'cart':
+            touch_cart(container_id)
+        deleted = db.session.execute(text(f"""
+            DELETE FROM {item_table}
+            WHERE {container_column} = :container_id AND product_id = :product_id
+        """), {'container_id': container_id, 'product_id': product_id}).rowcount
+        # Only rows this call deleted move the counter (a concurrent remove
+        # of the same item deletes nothing); still only for active products
+        if deleted:
+            adjust_item_count(kind, container_id, product_id, -deleted)
+        removed += deleted
+    return removed
+
+
+def cleanup_conditions(kind):
+    """label -> WHERE clause over item alias `i` for rows that should go"""
+    container_table, _, container_column = KINDS[kind][2:]
+    return {
+        'orphaned': f"""NOT EXISTS (
+            SELECT 1 FROM {container_table} c WHERE c.id = i.{container_column})""",
+        'inactive_product': """NOT EXISTS (
+            SELECT 1 FROM products p WHERE p.id = i.product_id AND p.is_active = :is_active)""",
+    }
+
+
+def count_cleanup_candidates():
+    """{'cart': {'orphaned': n, ...}, 'wishlist': {...}} for diagnostics"""
+    from app import db
+
+    counts = {}
+    for kind in KINDS:
+        item_table = KINDS[kind][3]
+        counts[kind] = {
+            label: db.session.execute(text(f"""
+                SELECT COUNT(*) FROM {item_table} i WHERE {condition}
+            """), {'is_active': True}).scalar()
+            for label, condition in cleanup_conditions(kind).items()
+        }
+    return counts
+
+
+def cleanup_items(batch_size=DEFAULT_BATCH_SIZE, progress=None):
+    """
+    Delete orphaned and inactive-product items in batches, committing each
+    batch. Counters need no adjustment: neither kind of row is counted.
+    """
+    from app import db
+
+    summary = {}
+    for kind in KINDS:
+        item_table = KINDS[kind][3]
+        for label, condition in cleanup_conditions(kind).items():
+            key = f'{kind}_{label}'
+            summary[key] = 0
+            while True:
+                deleted = db.session.execute(text(f"""
+                    DELETE FROM {item_table} WHERE id IN (
+                        SELECT i.id FROM {item_table} i WHERE {condition}
+                        LIMIT :batch_size
+                    )
+                """), {'is_active': True, 'batch_size': batch_size}).rowcount
+                db.session.commit()
+                summary[key] += deleted
+                if progress:
+                    progress(dict(summary))
+                if deleted < batch_size:
+                    break
+    return summary
+
+
+@register_job(CLEANUP_JOB_TYPE)
+def run_item_cleanup(job_id, payload):
+    return cleanup_items(
+        batch_size=int(payload.get('batch_size') or DEFAULT_BATCH_SIZE),
+        progress=lambda progress: update_job(job_id, progress=progress))
+
+
+if __name__ == "__main__":
+    from app import create_app
+
+    app = create_app()
+    with app.app_context():
+        print("🧹 Cleaning up cart and wishlist items...")
+        started = datetime.utcnow()
+        result = cleanup_items()
+        for key, deleted in result.items():
+            print(f"   {key}: {deleted} removed")
+        print(f"✅ Cleanup finished in {(datetime.utcnow() - started).total_seconds():.1f}s")
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Keyset (Cursor) Pagination
+Opaque cursor pagination over indexed sort keys for the product, order,
+user, commission, withdrawal and cyber service order lists. Each page is a
+single indexed range scan of per_page + 1 rows: no OFFSET, and COUNT(*) only
+when asked for (?count=exact) or estimated from the planner (?count=estimate).
+
+The response keeps the existing `pagination` object shape
+(page, per_page, total, pages, has_next, has_prev) and adds next_cursor.
+Requests that send ?page=N without a cursor still get classic
+Query.paginate() so older admin screens keep working.
+
+Run migrate_keyset_indexes.py once to create the (sort key, id) indexes.
+"""
+
+import base64
+import json
+import math
+from datetime import date, datetime
+from decimal import Decimal
+
+from flask import request
+from sqlalchemy import and_, false, or_
+
+DEFAULT_PER_PAGE = 20
+MAX_PER_PAGE = 100
+
+# list name -> (model name, sort column name); id is always the tie-breaker
+SORT_KEYS = {
+    'products': ('Product', 'created_at'),
+    'orders': ('Order', 'created_at'),
+    'users': ('User', 'created_at'),
+    'commissions': ('Commission', 'created_at'),
+    'withdrawals': ('Withdrawal', 'requested_at'),
+    'cyber_service_orders': ('CyberServiceOrder', 'created_at'),
+}
+
+
+class InvalidCursor(ValueError):
+    """Raised for cursors that cannot be decoded; routes return 400"""
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {'dt': value.isoformat()}
+    if isinstance(value, date):
+        return {'d': value.isoformat()}
+    if isinstance(value, Decimal):
+        return {'dec': str(value)}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        if 'dt' in value:
+            return datetime.fromisoformat(value['dt'])
+        if 'd' in value:
+            return date.fromisoformat(value['d'])
+        if 'dec' in value:
+            return Decimal(value['dec'])
+    return value
+
+
+def encode_cursor(values, page):
+    payload = {'v': [_encode_value(v) for v in values], 'p': page}
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return [_decode_value(v) for v in payload['v']], int(payload.get('p', 2))
+    except (ValueError, KeyError, TypeError) as e:
+        raise InvalidCursor(f"Invalid cursor: {e}")
+
+
+def _equal(column, value):
+    return column.is_(None) if value is None else column == value
+
+
+def _step(column, descending, value, nullable):
+    """Rows strictly after `value` in one column; NULL sorts as the largest value"""
+    if value is None:
+        return column.isnot(None) if descending else false()
+    if descending:
+        return column < value
+    return or_(column > value, column.is_(None)) if nullable else column > value
+
+
+def _after(sort_columns, values):
+    """
+    Row-value comparison "strictly after `values`" for mixed directions:
+    (a > x) OR (a = x AND b > y) OR ...
+    Sort keys before the unique tie-breaker may be NULL (created_at on old
+    rows); NULLs sort last ascending and first descending, as PostgreSQL
+    orders them by default, so the (sort key, id) indexes still apply.
+    """
+    last = len(sort_columns) - 1
+    clauses = []
+    for i, (column, descending) in enumerate(sort_columns):
+        equal_prefix = [_equal(sort_columns[j][0], values[j]) for j in range(i)]
+        step = _step(column, descending, values[i], nullable=i < last)
+        clauses.append(and_(*equal_prefix, step))
+    return or_(*clauses)
+
+
+def _order_by(sort_columns):
+    last = len(sort_columns) - 1
+    order_by = []
+    for i, (column, descending) in enumerate(sort_columns):
+        if i == last:
+            order_by.append(column.desc() if descending else column.asc())
+        else:
+            order_by.append(column.desc().nulls_first() if descending
+                            else column.asc().nulls_last())
+    return order_by
+
+
+def estimate_count(query):
+    """Planner row estimate (PostgreSQL); exact COUNT elsewhere"""
+    from app import db
+
+    if db.engine.dialect.name != 'postgresql':
+        return query.order_by(None).count()
+
+    # Bound parameters, not literal_binds: datetimes and other non-literal
+    # values (the date-filtered admin lists) cannot be inlined
+    compiled = query.order_by(None).statement.compile(
+        dialect=db.engine.dialect, compile_kwargs={'render_postcompile': True})
+    plan = db.session.connection().exec_driver_sql(
+        f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class KeysetPage:
+    def __init__(self, items, per_page, page, has_next, has_prev, next_cursor, total):
+        self.items = items
+        self.per_page = per_page
+        self.page = page
+        self.has_next = has_next
+        self.has_prev = has_prev
+        self.next_cursor = next_cursor
+        self.total = total
+
+    @property
+    def pages(self):
+        if self.total is None:
+            return None
+        return max(1, math.ceil(self.total / self.per_page))
+
+    def to_dict(self):
+        """Same keys as the classic `pagination` object, plus next_cursor"""
+        return {
+            'page': self.page,
+            'per_page': self.per_page,
+            'total': self.total,
+            'pages': self.pages,
+            'has_next': self.has_next,
+            'has_prev': self.has_prev,
+            'next_cursor': self.next_cursor,
+        }
+
+
+def keyset_paginate(query, sort_columns, cursor=None, per_page=DEFAULT_PER_PAGE, count=None):
+    """
+    sort_columns: [(column, descending), ...] ending with a unique column.
+    count: None (skip), 'exact' or 'estimate'.
+    """
+    per_page = max(1, min(int(per_page or DEFAULT_PER_PAGE), MAX_PER_PAGE))
+
+    total = None
+    if count == 'exact':
+        total = query.order_by(None).count()
+    elif count == 'estimate':
+        total = estimate_count(query)
+
+    page = 1
+    if cursor:
+        values, page = decode_cursor(cursor)
+        if len(values) != len(sort_columns):
+            raise InvalidCursor("Cursor does not match this list's sort keys")
+        query = query.filter(_after(sort_columns, values))
+
+    # Drop any ordering the caller applied; the cursor only fits these keys
+    rows = query.order_by(None).order_by(*_order_by(sort_columns)).limit(per_page + 1).all()
+
+    has_next = len(rows) > per_page
+    items = rows[:per_page]
+    next_cursor = None
+    if has_next and items:
+        last = items[-1]
+        next_cursor = encode_cursor(
+            [getattr(last, column.key) for column, _ in sort_columns], page + 1)
+
+    return KeysetPage(items, per_page, page, has_next, cursor is not None, next_cursor, total)
+
+
+def get_sort_columns(list_name, descending=True):
+    from app import models
+
+    model_name, column_name = SORT_KEYS[list_name]
+    model = getattr(models, model_name)
+    return [(getattr(model, column_name), descending), (model.id, descending)]
+
+
+def paginate_request(query, list_name):
+    """
+    Paginate a list endpoint from request.args.
+    Returns (items, pagination dict) in the existing response shape.
+    """
+    args = request.args
+    per_page = args.get('per_page', DEFAULT_PER_PAGE, type=int)
+    cursor = args.get('cursor')
+    page = args.get('page', type=int)
+
+    if page and page > 1 and not cursor:
+        # Legacy OFFSET pagination for clients that jump to a page number
+        classic = query.paginate(page=page, per_page=min(per_page, MAX_PER_PAGE), error_out=False)
+        return classic.items, {
+            'page': classic.page,
+            'per_page': classic.per_page,
+            'total': classic.total,
+            'pages': classic.pages,
+            'has_next': classic.has_next,
+            'has_prev': classic.has_prev,
+            'next_cursor': None,
+        }
+
+    count = args.get('count')
+    if count not in ('exact', 'estimate'):
+        count = None
+    result = keyset_paginate(query, get_sort_columns(list_name), cursor=cursor,
+                             per_page=per_page, count=count)
+    return result.items, result.to_dict()
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Migration script to add permission_bits column to admin_roles table
+and compile every role's permission list into it (see admin_permission_bits.py)
+"""
+
+from app import create_app, db
+from sqlalchemy import inspect, text
+
+
+def migrate_admin_permission_bits():
+    app = create_app()
+    with app.app_context():
+        try:
+            columns = [c['name'] for c in inspect(db.engine).get_columns('admin_roles')]
+
+            with db.engine.connect() as conn:
+                if 'permission_bits' not in columns:
+                    print("Adding permission_bits column to admin_roles table...")
+                    conn.execute(text("""
+                        ALTER TABLE admin_roles
+                        ADD COLUMN permission_bits BIGINT
+                    """))
+                    conn.commit()
+                    print("✅ permission_bits column added successfully!")
+                else:
+                    print("✅ permission_bits column already exists!")
+
+            from admin_permission_bits import decode_permissions, recompile_all_roles
+            for role, bits, unknown in recompile_all_roles():
+                print(f"   👑 {role.name}: {len(decode_permissions(bits))} permissions compiled")
+                if unknown:
+                    print(f"   ⚠️  No bit assigned for: {unknown}")
+
+            print("Migration completed successfully!")
+        except Exception as e:
+            print(f"❌ Migration failed: {str(e)}")
+            raise
+
+
+if __name__ == "__main__":
+    migrate_admin_permission_bits()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Migration script for background jobs
+Creates the background_jobs table (see background_jobs.py) and adds the
+deleted_at column used by background user deletion (see user_deletion_job.py)
+"""
+
+from app import create_app, db
+from sqlalchemy import inspect, text
+
+
+def migrate_background_jobs():
+    app = create_app()
+    with app.app_context():
+        try:
+            inspector = inspect(db.engine)
+            is_postgres = db.engine.dialect.name == 'postgresql'
+
+            with db.engine.connect() as conn:
+                if 'background_jobs' not in inspector.get_table_names():
+                    print("Creating background_jobs table...")
+                    id_column = ('SERIAL PRIMARY KEY' if is_postgres
+                                 else 'INTEGER PRIMARY KEY AUTOINCREMENT')
+                    conn.execute(text(f"""
+                        CREATE TABLE background_jobs (
+                            id {id_column},
+                            job_type VARCHAR(50) NOT NULL,
+                            status VARCHAR(20) NOT NULL DEFAULT 'queued',
+                            payload TEXT,
+                            progress TEXT,
+                            result TEXT,
+                            error TEXT,
+                            created_by INTEGER,
+                            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                        )
+                    """))
+                    conn.execute(text("""
+                        CREATE INDEX ix_background_jobs_status_id
+                        ON background_jobs (status, id)
+                    """))
+                    print("✅ background_jobs table created!")
+                else:
+                    print("✅ background_jobs table already exists!")
+
+                columns = [c['name'] for c in inspector.get_columns('users')]
+                if 'deleted_at' not in columns:
+                    print("Adding deleted_at column to users table...")
+                    conn.execute(text("""
+                        ALTER TABLE users
+                        ADD COLUMN deleted_at TIMESTAMP
+                    """))
+                    print("✅ deleted_at column added successfully!")
+                else:
+                    print("✅ deleted_at column already exists!")
+
+                conn.commit()
+
+            print("Migration completed successfully!")
+        except Exception as e:
+            print(f"❌ Migration failed: {str(e)}")
+            raise
+
+
+if __name__ == "__main__":
+    migrate_background_jobs()
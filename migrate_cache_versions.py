@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Migration script for versioned caches
+Creates the cache_versions table (see versioned_cache.py) and the product
+indexes used by the category/brand count GROUP BY (see category_cache.py)
+"""
+
+from app import create_app, db
+from sqlalchemy import inspect, text
+
+PRODUCT_INDEXES = [
+    ('ix_products_category_active', 'products (category_id, is_active)'),
+    ('ix_products_brand_active', 'products (brand_id, is_active)'),
+]
+
+
+def migrate_cache_versions():
+    app = create_app()
+    with app.app_context():
+        try:
+            inspector = inspect(db.engine)
+
+            with db.engine.connect() as conn:
+                if 'cache_versions' not in inspector.get_table_names():
+                    print("Creating cache_versions table...")
+                    conn.execute(text("""
+                        CREATE TABLE cache_versions (
+                            name VARCHAR(64) PRIMARY KEY,
+                            version INTEGER NOT NULL DEFAULT 0
+                        )
+                    """))
+                    print("✅ cache_versions table created!")
+                else:
+                    print("✅ cache_versions table already exists!")
+
+                existing = {ix['name'] for ix in inspector.get_indexes('products')}
+                for name, definition in PRODUCT_INDEXES:
+                    if name not in existing:
+                        print(f"Creating index {name}...")
+                        conn.execute(text(f"CREATE INDEX {name} ON {definition}"))
+                        print(f"✅ {name} created!")
+                    else:
+                        print(f"✅ {name} already exists!")
+
+                conn.commit()
+
+            print("Migration completed successfully!")
+        except Exception as e:
+            print(f"❌ Migration failed: {str(e)}")
+            raise
+
+
+if __name__ == "__main__":
+    migrate_cache_versions()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Migration script for idempotency keys
+Creates the idempotency_keys table behind the Idempotency-Key header on
+checkout, payment initiation and withdrawal requests (see idempotency.py)
+"""
+
+from app import create_app, db
+from sqlalchemy import inspect, text
+
+
+def migrate_idempotency_keys():
+    app = create_app()
+    with app.app_context():
+        try:
+            inspector = inspect(db.engine)
+            is_postgres = db.engine.dialect.name == 'postgresql'
+
+            with db.engine.connect() as conn:
+                if 'idempotency_keys' not in inspector.get_table_names():
+                    print("Creating idempotency_keys table...")
+                    id_column = ('BIGSERIAL PRIMARY KEY' if is_postgres
+                                 else 'INTEGER PRIMARY KEY AUTOINCREMENT')
+                    conn.execute(text(f"""
+                        CREATE TABLE idempotency_keys (
+                            id {id_column},
+                            scope VARCHAR(50) NOT NULL,
+                            user_id INTEGER NOT NULL,
+                            idempotency_key VARCHAR(255) NOT NULL,
+                            request_hash VARCHAR(64) NOT NULL,
+                            status VARCHAR(20) NOT NULL,
+                            response_status INTEGER,
+                            response_body TEXT,
+                            content_type VARCHAR(100),
+                            created_at TIMESTAMP NOT NULL,
+                            expires_at TIMESTAMP NOT NULL
+                        )
+                    """))
+                    conn.execute(text("""
+                        CREATE UNIQUE INDEX uq_idempotency_keys_scope_user_key
+                        ON idempotency_keys (scope, user_id, idempotency_key)
+                    """))
+                    conn.execute(text("""
+                        CREATE INDEX ix_idempotency_keys_expires_at
+                        ON idempotency_keys (expires_at)
+                    """))
+                    print("✅ idempotency_keys table created!")
+                else:
+                    print("✅ idempotency_keys table already exists!")
+
+                conn.commit()
+
+            print("Migration completed successfully!")
+        except Exception as e:
+            print(f"❌ Migration failed: {str(e)}")
+            raise
+
+
+if __name__ == "__main__":
+    migrate_idempotency_keys()
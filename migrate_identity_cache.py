@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Migration script for the JWT identity cache
+Adds auth_version to users/admin_users and the auth_invalidations table
+used for cross-worker cache invalidation (see identity_cache.py).
+"""
+
+from app import create_app, db
+from sqlalchemy import inspect, text
+
+
+def migrate_identity_cache():
+    app = create_app()
+    with app.app_context():
+        try:
+            inspector = inspect(db.engine)
+            is_postgres = db.engine.dialect.name == 'postgresql'
+
+            with db.engine.connect() as conn:
+                for table in ('users', 'admin_users'):
+                    columns = [c['name'] for c in inspector.get_columns(table)]
+                    if 'auth_version' not in columns:
+                        print(f"Adding auth_version column to {table} table...")
+                        conn.execute(text(f"""
+                            ALTER TABLE {table}
+                            ADD COLUMN auth_version INTEGER NOT NULL DEFAULT 0
+                        """))
+                        print(f"✅ auth_version added to {table}")
+                    else:
+                        print(f"✅ {table}.auth_version already exists!")
+
+                if 'auth_invalidations' not in inspector.get_table_names():
+                    print("Creating auth_invalidations table...")
+                    id_column = ('SERIAL PRIMARY KEY' if is_postgres
+                                 else 'INTEGER PRIMARY KEY AUTOINCREMENT')
+                    conn.execute(text(f"""
+                        CREATE TABLE auth_invalidations (
+                            id {id_column},
+                            subject_kind VARCHAR(16) NOT NULL,
+                            subject_id VARCHAR(64) NOT NULL,
+                            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                        )
+                    """))
+                    conn.execute(text("""
+                        CREATE INDEX ix_auth_invalidations_created_at
+                        ON auth_invalidations (created_at)
+                    """))
+                    print("✅ auth_invalidations table created!")
+                else:
+                    print("✅ auth_invalidations table already exists!")
+
+                # Old rows are only needed for one poll interval
+                conn.execute(text("""
+                    DELETE FROM auth_invalidations
+                    WHERE created_at < CURRENT_TIMESTAMP - INTERVAL '1 day'
+                """ if is_postgres else """
+                    DELETE FROM auth_invalidations
+                    WHERE created_at < datetime('now', '-1 day')
+                """))
+                conn.commit()
+
+            print("Migration completed successfully!")
+        except Exception as e:
+            print(f"❌ Migration failed: {str(e)}")
+            raise
+
+
+if __name__ == "__main__":
+    migrate_identity_cache()
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Migration script for content-addressed image storage
+Creates the image_blobs reference-count table (see image_variants.py)
+"""
+
+from app import create_app, db
+from sqlalchemy import inspect, text
+
+
+def migrate_image_blobs():
+    app = create_app()
+    with app.app_context():
+        try:
+            inspector = inspect(db.engine)
+
+            with db.engine.connect() as conn:
+                if 'image_blobs' not in inspector.get_table_names():
+                    print("Creating image_blobs table...")
+                    conn.execute(text("""
+                        CREATE TABLE image_blobs (
+                            folder VARCHAR(50) NOT NULL,
+                            content_key VARCHAR(64) NOT NULL,
+                            ext VARCHAR(10) NOT NULL,
+                            size_bytes INTEGER NOT NULL,
+                            ref_count INTEGER NOT NULL DEFAULT 1,
+                            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                            PRIMARY KEY (folder, content_key)
+                        )
+                    """))
+                    print("✅ image_blobs table created!")
+                else:
+                    print("✅ image_blobs table already exists!")
+
+                conn.commit()
+
+            print("Migration completed successfully!")
+        except Exception as e:
+            print(f"❌ Migration failed: {str(e)}")
+            raise
+
+
+if __name__ == "__main__":
+    migrate_image_blobs()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Migration script for inventory reservations
+Creates the inventory_reservations table used by atomic checkout stock
+decrements (see inventory_reservations.py)
+"""
+
+from app import create_app, db
+from sqlalchemy import inspect, text
+
+
+def migrate_inventory_reservations():
+    app = create_app()
+    with app.app_context():
+        try:
+            inspector = inspect(db.engine)
+            is_postgres = db.engine.dialect.name == 'postgresql'
+
+            with db.engine.connect() as conn:
+                if 'inventory_reservations' not in inspector.get_table_names():
+                    print("Creating inventory_reservations table...")
+                    id_column = ('SERIAL PRIMARY KEY' if is_postgres
+                                 else 'INTEGER PRIMARY KEY AUTOINCREMENT')
+                    conn.execute(text(f"""
+                        CREATE TABLE inventory_reservations (
+                            id {id_column},
+                            order_id INTEGER NOT NULL,
+                            product_id INTEGER NOT NULL REFERENCES products(id),
+                            quantity INTEGER NOT NULL CHECK (quantity > 0),
+                            status VARCHAR(20) NOT NULL DEFAULT 'reserved',
+                            expires_at TIMESTAMP NOT NULL,
+                            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                            resolved_at TIMESTAMP
+                        )
+                    """))
+                    conn.execute(text("""
+                        CREATE INDEX ix_inventory_reservations_order
+                        ON inventory_reservations (order_id, status)
+                    """))
+                    conn.execute(text("""
+                        CREATE INDEX ix_inventory_reservations_status_expires
+                        ON inventory_reservations (status, expires_at)
+                    """))
+                    print("✅ inventory_reservations table created!")
+                else:
+                    print("✅ inventory_reservations table already exists!")
+
+                conn.commit()
+
+            print("Migration completed successfully!")
+        except Exception as e:
+            print(f"❌ Migration failed: {str(e)}")
+            raise
+
+
+if __name__ == "__main__":
+    migrate_inventory_reservations()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Migration script for counter-cached cart and wishlist counts
+Creates user_item_counts and backfills it for every user
+(see item_counts.py)
+"""
+
+from datetime import datetime
+
+from app import create_app, db
+from sqlalchemy import inspect, text
+
+from item_counts import CART_COUNT_SQL, WISHLIST_COUNT_SQL
+
+
+def migrate_item_counts():
+    app = create_app()
+    with app.app_context():
+        try:
+            inspector = inspect(db.engine)
+
+            with db.engine.connect() as conn:
+                if 'user_item_counts' not in inspector.get_table_names():
+                    print("Creating user_item_counts table...")
+                    conn.execute(text("""
+                        CREATE TABLE user_item_counts (
+                            user_id INTEGER PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+                            cart_count INTEGER NOT NULL DEFAULT 0,
+                            wishlist_count INTEGER NOT NULL DEFAULT 0,
+                            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                        )
+                    """))
+                    print("✅ user_item_counts table created!")
+                else:
+                    print("✅ user_item_counts table already exists!")
+
+                print("Backfilling counters...")
+                inserted = conn.execute(text(f"""
+                    INSERT INTO user_item_counts (user_id, cart_count, wishlist_count, updated_at)
+                    SELECT u.id,
+                           ({CART_COUNT_SQL.format(user_id='u.id')}),
+                           ({WISHLIST_COUNT_SQL.format(user_id='u.id')}),
+                           :now
+                    FROM users u
+                    WHERE NOT EXISTS (SELECT 1 FROM user_item_counts x WHERE x.user_id = u.id)
+                """), {'is_active': True, 'now': datetime.utcnow()}).rowcount
+                print(f"✅ Backfilled {inserted} users")
+
+                conn.commit()
+
+            print("Migration completed successfully!")
+        except Exception as e:
+            print(f"❌ Migration failed: {str(e)}")
+            raise
+
+
+if __name__ == "__main__":
+    migrate_item_counts()
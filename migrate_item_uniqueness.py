@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Migration script for duplicate-safe cart and wishlist items
+Merges existing duplicate (owner, product) rows, then creates the unique
+indexes that item_storage.py upserts against
+"""
+
+from app import create_app, db
+from sqlalchemy import inspect, text
+
+UNIQUE_INDEXES = [
+    ('cart_items', 'uq_cart_items_cart_product', 'cart_id'),
+    ('wishlist_items', 'uq_wishlist_items_wishlist_product', 'wishlist_id'),
+]
+
+
+def migrate_item_uniqueness():
+    app = create_app()
+    with app.app_context():
+        try:
+            inspector = inspect(db.engine)
+            tables = set(inspector.get_table_names())
+
+            with db.engine.connect() as conn:
+                for table, name, owner in UNIQUE_INDEXES:
+                    if table not in tables:
+                        print(f"⚠️  Table {table} not found, skipping {name}")
+                        continue
+                    existing = {ix['name'] for ix in inspector.get_indexes(table)}
+                    if name in existing:
+                        print(f"✅ {name} already exists!")
+                        continue
+
+                    if table == 'cart_items':
+                        # Keep the oldest row of each duplicate group with the summed quantity
+                        merged = conn.execute(text("""
+                            UPDATE cart_items
+                            SET quantity = (
+                                SELECT SUM(d.quantity) FROM cart_items d
+                                WHERE d.cart_id = cart_items.cart_id
+                                  AND d.product_id = cart_items.product_id
+                            )
+                            WHERE id IN (
+                                SELECT MIN(id) FROM cart_items
+                                GROUP BY cart_id, product_id
+                                HAVING COUNT(*) > 1
+                            )
+                        """)).rowcount
+                        print(f"Merged quantities for {merged} duplicate cart groups")
+
+                    removed = conn.execute(text(f"""
+                        DELETE FROM {table}
+                        WHERE EXISTS (
+                            SELECT 1 FROM {table} d
+                            WHERE d.{owner} = {table}.{owner}
+                              AND d.product_id = {table}.product_id
+                              AND d.id < {table}.id
+                        )
+                    """)).rowcount
+                    print(f"Removed {removed} duplicate rows from {table}")
+
+                    print(f"Creating unique index {name} on {table} ({owner}, product_id)...")
+                    conn.execute(text(f"CREATE UNIQUE INDEX {name} ON {table} ({owner}, product_id)"))
+                    print(f"✅ {name} created!")
+
+                if 'user_item_counts' in tables:
+                    from item_counts import recompute_all_item_counts
+                    updated = recompute_all_item_counts(conn)
+                    print(f"✅ Recomputed item counters for {updated} users")
+
+                conn.commit()
+
+            print("Migration completed successfully!")
+        except Exception as e:
+            print(f"❌ Migration failed: {str(e)}")
+            raise
+
+
+if __name__ == "__main__":
+    migrate_item_uniqueness()
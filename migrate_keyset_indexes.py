@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Migration script for keyset pagination indexes
+Creates (sort key, id) indexes so each cursor page is one index range scan
+(see keyset_pagination.py)
+"""
+
+from app import create_app, db
+from sqlalchemy import inspect, text
+
+KEYSET_INDEXES = [
+    ('products', 'ix_products_created_at_id', '(created_at, id)'),
+    ('orders', 'ix_orders_created_at_id', '(created_at, id)'),
+    ('orders', 'ix_orders_user_created_at_id', '(user_id, created_at, id)'),
+    ('users', 'ix_users_created_at_id', '(created_at, id)'),
+    ('commissions', 'ix_commissions_created_at_id', '(created_at, id)'),
+    ('withdrawals', 'ix_withdrawals_requested_at_id', '(requested_at, id)'),
+    ('cyber_service_orders', 'ix_cyber_service_orders_created_at_id', '(created_at, id)'),
+    ('cyber_service_orders', 'ix_cyber_service_orders_user_created_at_id', '(user_id, created_at, id)'),
+]
+
+
+def migrate_keyset_indexes():
+    app = create_app()
+    with app.app_context():
+        try:
+            inspector = inspect(db.engine)
+            tables = set(inspector.get_table_names())
+
+            with db.engine.connect() as conn:
+                for table, name, columns in KEYSET_INDEXES:
+                    if table not in tables:
+                        print(f"⚠️  Table {table} not found, skipping {name}")
+                        continue
+                    existing = {ix['name'] for ix in inspector.get_indexes(table)}
+                    if name in existing:
+                        print(f"✅ {name} already exists!")
+                        continue
+                    print(f"Creating index {name} on {table} {columns}...")
+                    conn.execute(text(f"CREATE INDEX {name} ON {table} {columns}"))
+                    print(f"✅ {name} created!")
+                conn.commit()
+
+            print("Migration completed successfully!")
+        except Exception as e:
+            print(f"❌ Migration failed: {str(e)}")
+            raise
+
+
+if __name__ == "__main__":
+    migrate_keyset_indexes()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Migration script for the order event timeline
+Creates order_events (see order_events.py) and backfills it from the
+existing order status and timestamp columns with INSERT ... SELECT
+"""
+
+from app import create_app, db
+from sqlalchemy import inspect, text
+
+
+def migrate_order_events():
+    app = create_app()
+    with app.app_context():
+        try:
+            inspector = inspect(db.engine)
+            is_postgres = db.engine.dialect.name == 'postgresql'
+
+            with db.engine.connect() as conn:
+                if 'order_events' in inspector.get_table_names():
+                    print("✅ order_events table already exists!")
+                    conn.commit()
+                    print("Migration completed successfully!")
+                    return
+
+                print("Creating order_events table...")
+                id_column = ('SERIAL PRIMARY KEY' if is_postgres
+                             else 'INTEGER PRIMARY KEY AUTOINCREMENT')
+                conn.execute(text(f"""
+                    CREATE TABLE order_events (
+                        id {id_column},
+                        order_id INTEGER NOT NULL REFERENCES orders(id) ON DELETE CASCADE,
+                        event VARCHAR(20) NOT NULL,
+                        actor_id INTEGER,
+                        note TEXT,
+                        created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+                    )
+                """))
+                conn.execute(text("""
+                    CREATE INDEX ix_order_events_order_created
+                    ON order_events (order_id, created_at, id)
+                """))
+                print("✅ order_events table created!")
+
+                columns = {c['name'] for c in inspector.get_columns('orders')}
+                changed_at = 'COALESCE(updated_at, created_at)' if 'updated_at' in columns else 'created_at'
+                backfill = [
+                    ('placed', 'created_at', '1 = 1'),
+                    ('paid', 'COALESCE(paid_at, created_at)' if 'paid_at' in columns else 'created_at',
+                     "payment_status IN ('paid', 'completed')"),
+                    ('confirmed', 'confirmed_at', 'confirmed_at IS NOT NULL'),
+                    ('processing', changed_at, "status = 'processing'"),
+                    ('shipped', changed_at, "status = 'shipped'"),
+                    ('delivered', changed_at, "status = 'delivered'"),
+                    ('cancelled', changed_at, "status = 'cancelled'"),
+                    ('refunded', changed_at, "status = 'refunded'"),
+                ]
+                for event, timestamp, condition in backfill:
+                    if 'confirmed_at' not in columns and event == 'confirmed':
+                        continue
+                    inserted = conn.execute(text(f"""
+                        INSERT INTO order_events (order_id, event, note, created_at)
+                        SELECT id, :event, 'backfilled', {timestamp}
+                        FROM orders WHERE {condition}
+                    """), {'event': event}).rowcount
+                    print(f"   Backfilled {inserted} '{event}' events")
+
+                conn.commit()
+
+            print("Migration completed successfully!")
+        except Exception as e:
+            print(f"❌ Migration failed: {str(e)}")
+            raise
+
+
+if __name__ == "__main__":
+    migrate_order_events()
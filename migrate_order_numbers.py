@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Migration script for sequence-backed order numbers
+Creates one sequence per order kind (order_number_counters rows on
+databases without sequences) and makes sure order_number is uniquely
+indexed on orders and cyber_service_orders (see order_numbers.py)
+"""
+
+from app import create_app, db
+from sqlalchemy import inspect, text
+
+from order_numbers import KINDS, SEQUENCE_START
+
+
+def migrate_order_numbers():
+    app = create_app()
+    with app.app_context():
+        try:
+            inspector = inspect(db.engine)
+            is_postgres = db.engine.dialect.name == 'postgresql'
+            tables = inspector.get_table_names()
+
+            with db.engine.connect() as conn:
+                if is_postgres:
+                    for kind, (_, sequence, _) in KINDS.items():
+                        print(f"Creating sequence {sequence}...")
+                        # No CACHE: cached blocks per connection would break monotonic order
+                        conn.execute(text(f"""
+                            CREATE SEQUENCE IF NOT EXISTS {sequence}
+                            AS BIGINT START WITH {SEQUENCE_START} NO CYCLE
+                        """))
+                    print("✅ Order number sequences ready!")
+                else:
+                    if 'order_number_counters' not in tables:
+                        print("Creating order_number_counters table...")
+                        conn.execute(text("""
+                            CREATE TABLE order_number_counters (
+                                name VARCHAR(64) PRIMARY KEY,
+                                value BIGINT NOT NULL
+                            )
+                        """))
+                    for kind, (_, sequence, _) in KINDS.items():
+                        exists = conn.execute(text("""
+                            SELECT 1 FROM order_number_counters WHERE name = :name
+                        """), {'name': sequence}).scalar()
+                        if not exists:
+                            conn.execute(text("""
+                                INSERT INTO order_number_counters (name, value) VALUES (:name, :value)
+                            """), {'name': sequence, 'value': SEQUENCE_START - 1})
+                    print("✅ Order number counters ready!")
+
+                for kind, (_, _, table) in KINDS.items():
+                    if table not in tables:
+                        print(f"⚠️  {table} table not found, skipping index")
+                        continue
+                    unique = any(
+                        index['column_names'] == ['order_number'] and index['unique']
+                        for index in inspector.get_indexes(table)
+                    ) or any(
+                        constraint['column_names'] == ['order_number']
+                        for constraint in inspector.get_unique_constraints(table)
+                    )
+                    if unique:
+                        print(f"✅ {table}.order_number already uniquely indexed!")
+                        continue
+                    print(f"Creating unique index on {table}.order_number...")
+                    conn.execute(text(f"""
+                        CREATE UNIQUE INDEX uq_{table}_order_number ON {table} (order_number)
+                    """))
+
+                conn.commit()
+
+            print("Migration completed successfully!")
+        except Exception as e:
+            print(f"❌ Migration failed: {str(e)}")
+            raise
+
+
+if __name__ == "__main__":
+    migrate_order_numbers()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Migration script for full-text product search (see product_search.py)
+- PostgreSQL: products.search_vector tsvector + GIN index + triggers
+- SQLite: products_fts FTS5 table + triggers (local kibtech_local.db)
+Safe to re-run; it rebuilds the index contents each time.
+"""
+
+from app import create_app, db
+from sqlalchemy import inspect, text
+
+POSTGRES_STATEMENTS = [
+    """
+    ALTER TABLE products ADD COLUMN IF NOT EXISTS search_vector tsvector
+    """,
+    """
+    CREATE OR REPLACE FUNCTION products_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('simple', coalesce(NEW.name, '')), 'A') ||
+            setweight(to_tsvector('simple', coalesce(
+                (SELECT name FROM brands WHERE id = NEW.brand_id), '')), 'B') ||
+            setweight(to_tsvector('simple', coalesce(NEW.short_description, '')), 'B') ||
+            setweight(to_tsvector('simple', coalesce(
+                (SELECT name FROM categories WHERE id = NEW.category_id), '')), 'C') ||
+            setweight(to_tsvector('simple', coalesce(NEW.description, '')), 'D');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS products_search_vector_trigger ON products",
+    """
+    CREATE TRIGGER products_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF name, short_description, description, brand_id, category_id, search_vector
+    ON products FOR EACH ROW EXECUTE FUNCTION products_search_vector_update()
+    """,
+    # Renaming a brand or category re-indexes its products
+    """
+    CREATE OR REPLACE FUNCTION products_search_vector_touch() RETURNS trigger AS $$
+    BEGIN
+        IF TG_TABLE_NAME = 'brands' THEN
+            UPDATE products SET search_vector = NULL WHERE brand_id = NEW.id;
+        ELSE
+            UPDATE products SET search_vector = NULL WHERE category_id = NEW.id;
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS brands_search_touch ON brands",
+    """
+    CREATE TRIGGER brands_search_touch AFTER UPDATE OF name ON brands
+    FOR EACH ROW EXECUTE FUNCTION products_search_vector_touch()
+    """,
+    "DROP TRIGGER IF EXISTS categories_search_touch ON categories",
+    """
+    CREATE TRIGGER categories_search_touch AFTER UPDATE OF name ON categories
+    FOR EACH ROW EXECUTE FUNCTION products_search_vector_touch()
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_products_search_vector ON products USING GIN (search_vector)",
+    # Fire the trigger for existing rows
+    "UPDATE products SET search_vector = NULL",
+]
+
+SQLITE_FTS_ROW = """
+    SELECT p.id, p.name, p.short_description, p.description,
+           (SELECT name FROM brands WHERE id = p.brand_id),
+           (SELECT name FROM categories WHERE id = p.category_id)
+    FROM products p
+"""
+
+SQLITE_STATEMENTS = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+        name, short_description, description, brand, category,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3 4'
+    )
+    """,
+    "DROP TRIGGER IF EXISTS products_fts_insert",
+    f"""
+    CREATE TRIGGER products_fts_insert AFTER INSERT ON products BEGIN
+        INSERT INTO products_fts (rowid, name, short_description, description, brand, category)
+        {SQLITE_FTS_ROW} WHERE p.id = NEW.id;
+    END
+    """,
+    "DROP TRIGGER IF EXISTS products_fts_update",
+    f"""
+    CREATE TRIGGER products_fts_update
+    AFTER UPDATE OF name, short_description, description, brand_id, category_id ON products
+    BEGIN
+        DELETE FROM products_fts WHERE rowid = OLD.id;
+        INSERT INTO products_fts (rowid, name, short_description, description, brand, category)
+        {SQLITE_FTS_ROW} WHERE p.id = NEW.id;
+    END
+    """,
+    "DROP TRIGGER IF EXISTS products_fts_delete",
+    """
+    CREATE TRIGGER products_fts_delete AFTER DELETE ON products BEGIN
+        DELETE FROM products_fts WHERE rowid = OLD.id;
+    END
+    """,
+    "DROP TRIGGER IF EXISTS brands_fts_rename",
+    f"""
+    CREATE TRIGGER brands_fts_rename AFTER UPDATE OF name ON brands BEGIN
+        DELETE FROM products_fts WHERE rowid IN (SELECT id FROM products WHERE brand_id = NEW.id);
+        INSERT INTO products_fts (rowid, name, short_description, description, brand, category)
+        {SQLITE_FTS_ROW} WHERE p.brand_id = NEW.id;
+    END
+    """,
+    "DROP TRIGGER IF EXISTS categories_fts_rename",
+    f"""
+    CREATE TRIGGER categories_fts_rename AFTER UPDATE OF name ON categories BEGIN
+        DELETE FROM products_fts WHERE rowid IN (SELECT id FROM products WHERE category_id = NEW.id);
+        INSERT INTO products_fts (rowid, name, short_description, description, brand, category)
+        {SQLITE_FTS_ROW} WHERE p.category_id = NEW.id;
+    END
+    """,
+    # Rebuild contents from scratch
+    "DELETE FROM products_fts",
+    f"""
+    INSERT INTO products_fts (rowid, name, short_description, description, brand, category)
+    {SQLITE_FTS_ROW}
+    """,
+]
+
+
+def migrate_product_search():
+    app = create_app()
+    with app.app_context():
+        try:
+            dialect = db.engine.dialect.name
+            columns = [c['name'] for c in inspect(db.engine).get_columns('products')]
+            if 'short_description' not in columns:
+                print("❌ products.short_description is missing; run the schema fixes first")
+                return
+
+            if dialect == 'postgresql':
+                statements = POSTGRES_STATEMENTS
+                print("Building PostgreSQL tsvector search index...")
+            elif dialect == 'sqlite':
+                statements = SQLITE_STATEMENTS
+                print("Building SQLite FTS5 search index...")
+            else:
+                print(f"❌ Unsupported database for full-text search: {dialect}")
+                return
+
+            with db.engine.connect() as conn:
+                for statement in statements:
+                    conn.execute(text(statement))
+                conn.commit()
+
+                count = conn.execute(text(
+                    "SELECT COUNT(*) FROM products WHERE search_vector IS NOT NULL"
+                    if dialect == 'postgresql' else
+                    "SELECT COUNT(*) FROM products_fts"
+                )).scalar()
+
+            print(f"✅ Search index built for {count} products")
+            print("Migration completed successfully!")
+        except Exception as e:
+            print(f"❌ Migration failed: {str(e)}")
+            raise
+
+
+if __name__ == "__main__":
+    migrate_product_search()
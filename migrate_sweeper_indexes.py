@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Migration script for the stale sweeper indexes
+Adds carts.updated_at where missing and the age indexes the sweeper reads
+(see stale_sweeper.py):
+- a partial index over unpaid pending orders only, so expiring them never
+  scans paid or finished orders
+- carts (updated_at) for abandoned carts
+"""
+
+from app import create_app, db
+from sqlalchemy import inspect, text
+
+SWEEPER_INDEXES = [
+    ('orders', 'ix_orders_unpaid_created_at',
+     "(created_at) WHERE status = 'pending' AND payment_status = 'pending'"),
+    ('carts', 'ix_carts_updated_at', '(updated_at)'),
+]
+
+
+def migrate_sweeper_indexes():
+    app = create_app()
+    with app.app_context():
+        try:
+            inspector = inspect(db.engine)
+            tables = set(inspector.get_table_names())
+
+            with db.engine.connect() as conn:
+                if 'carts' in tables:
+                    columns = [col['name'] for col in inspector.get_columns('carts')]
+                    if 'updated_at' not in columns:
+                        print("Adding carts.updated_at...")
+                        conn.execute(text("ALTER TABLE carts ADD COLUMN updated_at TIMESTAMP"))
+                        print("✅ carts.updated_at added!")
+                    # Carts with no activity timestamp start ageing now
+                    backfilled = conn.execute(text("""
+                        UPDATE carts SET updated_at = CURRENT_TIMESTAMP WHERE updated_at IS NULL
+                    """)).rowcount
+                    if backfilled:
+                        print(f"✅ Backfilled updated_at for {backfilled} carts")
+
+                for table, name, definition in SWEEPER_INDEXES:
+                    if table not in tables:
+                        print(f"⚠️  Table {table} not found, skipping {name}")
+                        continue
+                    existing = {ix['name'] for ix in inspector.get_indexes(table)}
+                    if name in existing:
+                        print(f"✅ {name} already exists!")
+                        continue
+                    print(f"Creating index {name} on {table} {definition}...")
+                    conn.execute(text(f"CREATE INDEX {name} ON {table} {definition}"))
+                    print(f"✅ {name} created!")
+
+                conn.commit()
+
+            print("Migration completed successfully!")
+        except Exception as e:
+            print(f"❌ Migration failed: {str(e)}")
+            raise
+
+
+if __name__ == "__main__":
+    migrate_sweeper_indexes()
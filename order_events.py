@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Order Event Timeline
+Append-only order_events rows (placed, paid, confirmed, processing,
+shipped, delivered, cancelled, refunded) with timestamps, instead of
+rebuilding progress from status fields on every call.
+
+- record_order_event(): one INSERT, joins the caller's transaction
+- bulk_record_order_event(): the same event for many orders, one statement
+- bulk_update_order_status(): a bulk admin action on hundreds of orders is
+  one INSERT ... SELECT into order_events plus one UPDATE of orders
+  (status, progress_stage, progress_percentage), whatever the batch size
+- get_order_timeline() / get_order_timelines(): the Orders page renders one
+  order, or a whole page of orders, from one indexed query on
+  (order_id, created_at, id)
+
+Run migrate_order_events.py once to create and backfill the table.
+"""
+
+from datetime import datetime
+
+from sqlalchemy import bindparam, text
+
+# event, label, progress_stage, progress_percentage (see ORDER_PROGRESS_IMPLEMENTATION_SUMMARY.md)
+STAGES = [
+    ('placed', 'Order Placed', 'order_placed', 10),
+    ('paid', 'Payment Confirmed', 'payment_confirmed', 30),
+    ('confirmed', 'Order Confirmed', 'order_confirmed', 20),
+    ('processing', 'Processing', 'processing', 50),
+    ('shipped', 'Shipped', 'shipped', 80),
+    ('delivered', 'Delivered', 'delivered', 100),
+]
+EXTRA_EVENTS = ['cancelled', 'refunded']
+EVENTS = [stage[0] for stage in STAGES] + EXTRA_EVENTS
+
+# order status -> event recorded when an order enters it
+STATUS_EVENTS = {
+    'confirmed': 'confirmed',
+    'processing': 'processing',
+    'shipped': 'shipped',
+    'delivered': 'delivered',
+    'cancelled': 'cancelled',
+    'refunded': 'refunded',
+}
+
+# Orders in these states are left alone by bulk status changes
+FINAL_STATUSES = ('cancelled', 'refunded')
+
+_STAGE_BY_EVENT = {event: (stage, percentage) for event, _, stage, percentage in STAGES}
+
+
+class InvalidOrderEvent(ValueError):
+    """Unknown event or status; routes return 400"""
+
+
+def record_order_event(order_id, event, actor_id=None, note=None, connection=None):
+    """Append one event; caller commits"""
+    from app import db
+
+    if event not in EVENTS:
+        raise InvalidOrderEvent(f"Unknown order event {event!r}")
+    executor = connection if connection is not None else db.session
+    executor.execute(text("""
+        INSERT INTO order_events (order_id, event, actor_id, note, created_at)
+        VALUES (:order_id, :event, :actor_id, :note, :now)
+    """), {'order_id': order_id, 'event': event, 'actor_id': actor_id, 'note': note,
+           'now': datetime.utcnow()})
+
+
+def bulk_record_order_event(order_ids, event, actor_id=None, note=None):
+    """Append the same event to many orders with one INSERT ... SELECT; caller commits"""
+    from app import db
+
+    if event not in EVENTS:
+        raise InvalidOrderEvent(f"Unknown order event {event!r}")
+    order_ids = list(order_ids)
+    if not order_ids:
+        return 0
+    return db.session.execute(text("""
+        INSERT INTO order_events (order_id, event, actor_id, note, created_at)
+        SELECT id, :event, :actor_id, :note, :now FROM orders WHERE id IN :ids
+    """).bindparams(bindparam('ids', expanding=True)), {
+        'ids': order_ids, 'event': event, 'actor_id': actor_id, 'note': note,
+        'now': datetime.utcnow()}).rowcount
+
+
+def bulk_update_order_status(order_ids, status, actor_id=None, note=None):
+    """
+    Move many orders to `status` with two statements; caller commits.
+    Orders already in that status or in a final state are skipped.
+    Returns the number of orders changed.
+    """
+    from app import db
+
+    event = STATUS_EVENTS.get(status)
+    if event is None:
+        raise InvalidOrderEvent(f"Unknown order status {status!r}")
+    order_ids = list(order_ids)
+    if not order_ids:
+        return 0
+
+    params = {
+        'ids': order_ids, 'status': status, 'event': event, 'actor_id': actor_id,
+        'note': note, 'now': datetime.utcnow(), 'final': list(FINAL_STATUSES),
+    }
+    eligible = "id IN :ids AND status <> :status AND status NOT IN :final"
+
+    # Events first, while the WHERE clause still sees the old statuses
+    db.session.execute(text(f"""
+        INSERT INTO order_events (order_id, event, actor_id, note, created_at)
+        SELECT id, :event, :actor_id, :note, :now FROM orders WHERE {eligible}
+    """).bindparams(bindparam('ids', expanding=True), bindparam('final', expanding=True)), params)
+
+    assignments = ['status = :status']
+    if event in _STAGE_BY_EVENT:
+        assignments += ['progress_stage = :stage', 'progress_percentage = :percentage']
+        params['stage'], params['percentage'] = _STAGE_BY_EVENT[event]
+    if status == 'confirmed':
+        assignments.append('confirmed_at = COALESCE(confirmed_at, :now)')
+
+    return db.session.execute(text(f"""
+        UPDATE orders SET {', '.join(assignments)} WHERE {eligible}
+    """).bindparams(bindparam('ids', expanding=True), bindparam('final', expanding=True)),
+        params).rowcount
+
+
+def _build_timeline(events):
+    """Stage list in the shape of Order.get_progress_stages(), plus extras"""
+    reached = {}
+    for row in events:
+        reached.setdefault(row['event'], row['created_at'])
+
+    def stamp(value):
+        return value.isoformat() if hasattr(value, 'isoformat') else value
+
+    stages = [{
+        'key': stage,
+        'event': event,
+        'label': label,
+        'percentage': percentage,
+        'completed': event in reached,
+        'timestamp': stamp(reached.get(event)),
+    } for event, label, stage, percentage in STAGES]
+    return {
+        'stages': stages,
+        'events': [dict(row, created_at=stamp(row['created_at'])) for row in events],
+        'cancelled': 'cancelled' in reached,
+        'refunded': 'refunded' in reached,
+    }
+
+
+def get_order_timelines(order_ids):
+    """{order_id: timeline} for a page of orders in one query"""
+    from app import db
+
+    order_ids = list(order_ids)
+    grouped = {order_id: [] for order_id in order_ids}
+    if not order_ids:
+        return {}
+    rows = db.session.execute(text("""
+        SELECT order_id, event, actor_id, note, created_at
+        FROM order_events
+        WHERE order_id IN :ids
+        ORDER BY order_id, created_at, id
+    """).bindparams(bindparam('ids', expanding=True)), {'ids': order_ids}).mappings()
+    for row in rows:
+        grouped[row['order_id']].append({
+            'event': row['event'], 'actor_id': row['actor_id'],
+            'note': row['note'], 'created_at': row['created_at'],
+        })
+    return {order_id: _build_timeline(events) for order_id, events in grouped.items()}
+
+
+def get_order_timeline(order_id):
+    return get_order_timelines([order_id])[order_id]
+
+
+if __name__ == "__main__":
+    import sys
+
+    from app import create_app
+
+    app = create_app()
+    with app.app_context():
+        if len(sys.argv) < 2:
+            print("Usage: python order_events.py <order_id>")
+            sys.exit(1)
+        timeline = get_order_timeline(int(sys.argv[1]))
+        print(f"📦 Order {sys.argv[1]} timeline")
+        for stage in timeline['stages']:
+            mark = '✅' if stage['completed'] else '⬜'
+            print(f"   {mark} {stage['label']} ({stage['percentage']}%) {stage['timestamp'] or ''}")
+        if timeline['cancelled']:
+            print("   ❌ Cancelled")
+        if timeline['refunded']:
+            print("   💸 Refunded")
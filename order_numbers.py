@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Sequence-Backed Order Numbers
+E-commerce and cyber-service order numbers used to be built from the
+current timestamp plus a random digit (e.g. CS202508080919512), so two
+orders in the same second could collide and creation had to retry on the
+unique violation. Numbers now come from a database sequence:
+
+    <prefix><YYYYMMDD><8-digit sequence value>     e.g. CS2025101930000042
+
+- collision-free: every value is handed out once by the database, with no
+  lookup or retry query
+- monotonic: the date prefix only grows and the sequence is global (not
+  reset per day), so each number sorts after every earlier one and new
+  keys always land at the right edge of the unique order_number index
+- compatible with legacy numbers: the sequence starts at 30000001, so the
+  two digits after the date are never a valid hour (00-23) and a new number
+  can never equal a legacy <prefix><YYYYMMDDHHMMSS><n> one
+
+PostgreSQL uses one SEQUENCE per kind (nextval() never blocks and is not
+rolled back). Other databases use a row in order_number_counters, updated
+inside the caller's transaction.
+
+    order.order_number = next_order_number('ecommerce')
+
+Run migrate_order_numbers.py once to create the sequences / counters.
+"""
+
+from datetime import datetime
+
+from sqlalchemy import text
+
+# kind -> (prefix, sequence name, orders table)
+KINDS = {
+    'ecommerce': ('ORD', 'order_number_seq', 'orders'),
+    'cyber_service': ('CS', 'cyber_service_order_number_seq', 'cyber_service_orders'),
+}
+SEQUENCE_START = 30000001
+SEQUENCE_WIDTH = 8
+
+
+def format_order_number(kind, value, when=None):
+    prefix = KINDS[kind][0]
+    return f"{prefix}{(when or datetime.utcnow()).strftime('%Y%m%d')}{value:0{SEQUENCE_WIDTH}d}"
+
+
+def next_order_numbers(kind, count, connection=None):
+    """`count` new numbers in increasing order from one statement"""
+    from app import db
+
+    if kind not in KINDS:
+        raise ValueError(f"Unknown order number kind {kind!r}")
+    sequence = KINDS[kind][1]
+    if connection is not None:
+        # A Connection (e.g. from a mapper event) knows its own dialect
+        executor, dialect = connection, connection.dialect
+    else:
+        executor, dialect = db.session, db.session.get_bind().dialect
+
+    if dialect.name == 'postgresql':
+        values = executor.execute(text(f"""
+            SELECT nextval('{sequence}') FROM generate_series(1, :count)
+        """), {'count': count}).scalars().all()
+    else:
+        # The UPDATE takes SQLite's write lock, so the read-back is ours alone
+        executor.execute(text("""
+            UPDATE order_number_counters SET value = value + :count WHERE name = :name
+        """), {'count': count, 'name': sequence})
+        last = executor.execute(text("""
+            SELECT value FROM order_number_counters WHERE name = :name
+        """), {'name': sequence}).scalar()
+        if last is None:
+            raise RuntimeError("order_number_counters missing; run migrate_order_numbers.py")
+        values = range(last - count + 1, last + 1)
+
+    now = datetime.utcnow()
+    return [format_order_number(kind, value, now) for value in sorted(values)]
+
+
+def next_order_number(kind, connection=None):
+    return next_order_numbers(kind, 1, connection)[0]
+
+
+if __name__ == "__main__":
+    import sys
+
+    from app import create_app, db
+
+    app = create_app()
+    with app.app_context():
+        count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+        for kind in KINDS:
+            started = datetime.utcnow()
+            numbers = next_order_numbers(kind, count)
+            db.session.commit()
+            elapsed = (datetime.utcnow() - started).total_seconds()
+            ok = len(set(numbers)) == len(numbers) and numbers == sorted(numbers)
+            print(f"{'✅' if ok else '❌'} {kind}: {count} numbers in {elapsed * 1000:.1f}ms "
+                  f"({numbers[0]} .. {numbers[-1]})")
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Single-Transaction Order Creation
+Creates an order, its items, the stock reservations and the pending M-Pesa
+payment in one transaction with one commit:
+- product prices, names, SKUs and stock for every cart line in one SELECT
+- shipping rules (shipping_enabled, free_shipping_threshold,
+  ecommerce_shipping_fee) from a versioned in-process cache, not three
+  SystemSettings reads per order
+- a sequence-backed order number (order_numbers.py), no retry on collision
+- the Order INSERT, then atomic conditional stock decrements
+  (inventory_reservations.py), the 'placed' timeline event
+  (order_events.py), all OrderItems in one executemany INSERT and the
+  Payment INSERT, flushed together at commit
+
+    order = create_order(user_id, [(product_id, quantity), ...],
+                         order_fields={'shipping_address': ...},
+                         payment_fields={'phone_number': '2547...'})
+
+Raises OrderError (unknown/inactive product, empty cart) or OutOfStock; the
+caller returns 400/409 and nothing is written.
+"""
+
+from decimal import Decimal
+
+from sqlalchemy import bindparam, text
+
+from inventory_reservations import OutOfStock, reserve_order_items
+from order_events import record_order_event
+from order_numbers import next_order_number
+from versioned_cache import VersionedCache, invalidate_on_change
+
+CACHE_NAME = 'shipping_rules'
+SHIPPING_KEYS = ('shipping_enabled', 'free_shipping_threshold', 'ecommerce_shipping_fee')
+DEFAULT_SHIPPING_FEE = Decimal('200')
+DEFAULT_FREE_SHIPPING_THRESHOLD = Decimal('5000')
+
+
+class OrderError(ValueError):
+    """Cart cannot be turned into an order; routes return 400"""
+
+
+def _decimal(value, default):
+    try:
+        return Decimal(str(value))
+    except Exception:
+        return default
+
+
+def load_shipping_rules():
+    from app import db
+    from app.models import SystemSettings
+
+    settings = dict(db.session.query(SystemSettings.key, SystemSettings.value).filter(
+        SystemSettings.key.in_(SHIPPING_KEYS)).all())
+    return {
+        'enabled': str(settings.get('shipping_enabled', 'false')).lower() == 'true',
+        'free_shipping_threshold': _decimal(settings.get('free_shipping_threshold'),
+                                            DEFAULT_FREE_SHIPPING_THRESHOLD),
+        'fee': _decimal(settings.get('ecommerce_shipping_fee'), DEFAULT_SHIPPING_FEE),
+    }
+
+
+shipping_rules_cache = VersionedCache(CACHE_NAME, load_shipping_rules)
+
+
+def register_shipping_rules_cache():
+    """Call once from create_app() so settings edits bump the cache"""
+    from app.models import SystemSettings
+    invalidate_on_change(CACHE_NAME, SystemSettings)
+
+
+def shipping_cost(subtotal, rules=None):
+    rules = rules or shipping_rules_cache.get()[0]
+    if not rules['enabled'] or subtotal >= rules['free_shipping_threshold']:
+        return Decimal('0.00')
+    return rules['fee']
+
+
+def fetch_products(product_ids):
+    """{id: row} with price, name, sku, stock and active flag in one query"""
+    from app import db
+
+    statement = text("""
+        SELECT id, name, sku, price, stock_quantity, is_active
+        FROM products WHERE id IN :ids
+    """).bindparams(bindparam('ids', expanding=True))
+    return {row.id: row for row in db.session.execute(statement, {'ids': list(product_ids)})}
+
+
+def create_order(user_id, items, order_fields=None, payment_fields=None):
+    """Build and commit the order; returns the Order"""
+    from app import db
+    from app.models import Order, OrderItem, Payment
+
+    quantities = {}
+    for product_id, quantity in items:
+        quantity = int(quantity)
+        if quantity <= 0:
+            raise OrderError(f"Invalid quantity for product {product_id}")
+        quantities[int(product_id)] = quantities.get(int(product_id), 0) + quantity
+    if not quantities:
+        raise OrderError("Cart is empty")
+
+    try:
+        products = fetch_products(quantities)
+        missing = [pid for pid in quantities if pid not in products or not products[pid].is_active]
+        if missing:
+            raise OrderError(f"Products not available: {', '.join(map(str, missing))}")
+        short = [pid for pid, qty in quantities.items() if products[pid].stock_quantity < qty]
+        if short:
+            raise OutOfStock(short[0], quantities[short[0]])
+
+        subtotal = sum((Decimal(str(products[pid].price)) * qty for pid, qty in quantities.items()),
+                       Decimal('0.00'))
+        shipping = shipping_cost(subtotal)
+        total = subtotal + shipping
+
+        order = Order(
+            user_id=user_id,
+            subtotal=subtotal,
+            shipping_cost=shipping,
+            total_amount=total,
+            status='pending',
+            payment_status='pending',
+            order_number=next_order_number('ecommerce'),
+            **(order_fields or {}),
+        )
+        order.update_progress()
+        db.session.add(order)
+        db.session.flush()
+
+        # Authoritative stock check: conditional decrements, product id order
+        reserve_order_items(order.id, quantities.items())
+        record_order_event(order.id, 'placed')
+
+        db.session.execute(OrderItem.__table__.insert(), [
+            {
+                'order_id': order.id,
+                'product_id': pid,
+                'product_name': products[pid].name,
+                'product_sku': products[pid].sku,
+                'price': products[pid].price,
+                'quantity': qty,
+            }
+            for pid, qty in quantities.items()
+        ])
+
+        if payment_fields is not None:
+            db.session.add(Payment(order_id=order.id, amount=total, status='pending',
+                                   **payment_fields))
+
+        db.session.commit()
+        return order
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+if __name__ == "__main__":
+    from app import create_app
+
+    app = create_app()
+    with app.app_context():
+        rules = load_shipping_rules()
+        print("🚚 Shipping rules")
+        print(f"   Enabled: {rules['enabled']}")
+        print(f"   Fee: KSh {rules['fee']}")
+        print(f"   Free above: KSh {rules['free_shipping_threshold']}")
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Password Hashing Pool
+Runs bcrypt hashing/verification in a bounded process pool so login bursts
+do not pin gunicorn workers, with a configurable cost and rehash-on-login.
+"""
+
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import bcrypt
+
+DEFAULT_BCRYPT_ROUNDS = 12
+DEFAULT_QUEUE_LIMIT = 32
+DEFAULT_TIMEOUT = 10  # seconds
+
+
+class HashingQueueFull(Exception):
+    """Raised when more hashing jobs are waiting than PASSWORD_HASH_QUEUE_LIMIT"""
+
+
+def get_bcrypt_rounds():
+    """Cost factor from BCRYPT_LOG_ROUNDS (4-31)"""
+    rounds = int(os.environ.get('BCRYPT_LOG_ROUNDS', DEFAULT_BCRYPT_ROUNDS))
+    return max(4, min(31, rounds))
+
+
+def _hash_password(password, rounds):
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+
+
+def _check_password(password, password_hash):
+    try:
+        return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+    except ValueError:
+        return False
+
+
+class PasswordHasher:
+    """Process pool wrapper that tracks queue depth"""
+
+    def __init__(self, max_workers=None, queue_limit=None, timeout=None):
+        self.max_workers = max_workers or int(
+            os.environ.get('PASSWORD_HASH_WORKERS', os.cpu_count() or 1))
+        self.queue_limit = queue_limit or int(
+            os.environ.get('PASSWORD_HASH_QUEUE_LIMIT', DEFAULT_QUEUE_LIMIT))
+        self.timeout = timeout or float(
+            os.environ.get('PASSWORD_HASH_TIMEOUT', DEFAULT_TIMEOUT))
+        self._executor = None
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.queue_limit)
+        self._in_flight = 0
+        self._peak_in_flight = 0
+        self._rejected = 0
+        self._completed = 0
+
+    def _get_executor(self):
+        # Created lazily so each forked gunicorn worker owns its own pool
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            return self._executor
+
+    def _submit(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise HashingQueueFull("Password hashing queue is full, try again shortly")
+
+        with self._lock:
+            self._in_flight += 1
+            self._peak_in_flight = max(self._peak_in_flight, self._in_flight)
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except Exception:
+            self._release_slot(None)
+            raise
+        # The slot is freed when the job finishes, not when the caller stops
+        # waiting: a timed-out job still occupies the pool
+        future.add_done_callback(self._release_slot)
+        return future.result(timeout=self.timeout)
+
+    def _release_slot(self, future):
+        with self._lock:
+            self._in_flight -= 1
+            self._completed += 1
+        self._slots.release()
+
+    def hash_password(self, password, rounds=None):
+        return self._submit(_hash_password, password, rounds or get_bcrypt_rounds())
+
+    def check_password(self, password, password_hash):
+        if not password_hash:
+            return False
+        return self._submit(_check_password, password, password_hash)
+
+    def get_metrics(self):
+        """Queue-depth metrics for health checks and logs"""
+        with self._lock:
+            return {
+                'workers': self.max_workers,
+                'queue_limit': self.queue_limit,
+                'queue_depth': self._in_flight,
+                'peak_queue_depth': self._peak_in_flight,
+                'rejected': self._rejected,
+                'completed': self._completed,
+            }
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+
+password_hasher = PasswordHasher()
+
+
+def get_hash_rounds(password_hash):
+    """Cost factor of a bcrypt hash ($2b$12$...), or None for other schemes"""
+    if not password_hash or not password_hash.startswith(('$2a$', '$2b$', '$2y$')):
+        return None
+    try:
+        return int(password_hash.split('$')[2])
+    except (IndexError, ValueError):
+        return None
+
+
+def needs_rehash(password_hash):
+    """True if the hash is not bcrypt or was made with a different cost"""
+    return get_hash_rounds(password_hash) != get_bcrypt_rounds()
+
+
+def verify_and_rehash(account, password):
+    """
+    Verify a User/AdminUser password and transparently upgrade the stored hash
+    when BCRYPT_LOG_ROUNDS changed or it is a legacy werkzeug hash.
+    The caller commits the session after a successful login.
+    """
+    password_hash = account.password_hash
+    if get_hash_rounds(password_hash) is None:
+        # Legacy werkzeug hashes (see fix_admin_user_creation.py)
+        from werkzeug.security import check_password_hash
+        try:
+            valid = check_password_hash(password_hash or '', password)
+        except ValueError:
+            valid = False
+    else:
+        valid = password_hasher.check_password(password, password_hash)
+
+    if valid and needs_rehash(password_hash):
+        account.password_hash = password_hasher.hash_password(password)
+
+    return valid
+
+
+if __name__ == "__main__":
+    print("🔐 Password Hashing Pool")
+    print("=" * 40)
+    print(f"Cost factor: {get_bcrypt_rounds()}")
+    sample = password_hasher.hash_password('sample-password')
+    print(f"Hash: {sample[:29]}...")
+    print(f"Verify: {password_hasher.check_password('sample-password', sample)}")
+    print(f"Needs rehash: {needs_rehash(sample)}")
+    print(f"Metrics: {password_hasher.get_metrics()}")
+    password_hasher.shutdown()
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Product Search
+Ranked full-text product search with prefix matching and facet counts.
+- PostgreSQL: products.search_vector (tsvector, GIN index) kept current by a
+  trigger, ranked with ts_rank_cd over weighted name/brand/category/
+  short_description/description.
+- SQLite (kibtech_local.db): products_fts FTS5 table kept current by
+  triggers, ranked with weighted bm25().
+
+Run migrate_product_search.py once per database to build the index.
+"""
+
+import re
+
+from sqlalchemy import text
+
+PRICE_BANDS = [
+    ('under_1000', 0, 1000),
+    ('1000_5000', 1000, 5000),
+    ('5000_20000', 5000, 20000),
+    ('20000_50000', 20000, 50000),
+    ('50000_plus', 50000, None),
+]
+
+MAX_PER_PAGE = 50
+_TOKEN_RE = re.compile(r'[\w]+', re.UNICODE)
+
+
+def _tokens(query):
+    return [t.lower() for t in _TOKEN_RE.findall(query or '')][:8]
+
+
+def _is_postgres():
+    from app import db
+    return db.engine.dialect.name == 'postgresql'
+
+
+def _match_sql(query):
+    """(sql fragment yielding product id + rank, params) for the search terms"""
+    tokens = _tokens(query)
+    if not tokens:
+        return None, {}
+
+    if _is_postgres():
+        # Every token must match; the last one as a prefix for autocomplete
+        terms = [f"{t}" for t in tokens[:-1]] + [f"{tokens[-1]}:*"]
+        return """
+            SELECT p.id AS product_id,
+                   ts_rank_cd(p.search_vector, to_tsquery('simple', :tsquery)) AS rank
+            FROM products p
+            WHERE p.search_vector @@ to_tsquery('simple', :tsquery)
+        """, {'tsquery': ' & '.join(terms)}
+
+    terms = [f'"{t}"' for t in tokens[:-1]] + [f'"{tokens[-1]}"*']
+    # bm25 is lower-is-better; negate so both backends sort rank DESC
+    return """
+        SELECT products_fts.rowid AS product_id,
+               -bm25(products_fts, 10.0, 3.0, 1.0, 4.0, 2.0) AS rank
+        FROM products_fts
+        WHERE products_fts MATCH :fts_query
+    """, {'fts_query': ' '.join(terms)}
+
+
+def _filter_sql(filters):
+    clauses = ['p.is_active = :is_active']
+    params = {'is_active': True}
+    if filters.get('category_id'):
+        clauses.append('p.category_id = :category_id')
+        params['category_id'] = int(filters['category_id'])
+    if filters.get('brand_id'):
+        clauses.append('p.brand_id = :brand_id')
+        params['brand_id'] = int(filters['brand_id'])
+    if filters.get('min_price') is not None:
+        clauses.append('p.price >= :min_price')
+        params['min_price'] = float(filters['min_price'])
+    if filters.get('max_price') is not None:
+        clauses.append('p.price <= :max_price')
+        params['max_price'] = float(filters['max_price'])
+    return ' AND '.join(clauses), params
+
+
+def _price_band_case(column='p.price'):
+    parts = []
+    for name, low, high in PRICE_BANDS:
+        if high is None:
+            parts.append(f"WHEN {column} >= {low} THEN '{name}'")
+        else:
+            parts.append(f"WHEN {column} >= {low} AND {column} < {high} THEN '{name}'")
+    return f"CASE {' '.join(parts)} END"
+
+
+def search_products(query, filters=None, page=1, per_page=20, with_facets=True):
+    """
+    Returns {'results': [{'id', 'rank'}], 'total', 'facets', 'page', 'per_page'}.
+    Product rows are loaded by id afterwards so to_dict() stays the same.
+    """
+    from app import db
+
+    filters = filters or {}
+    per_page = max(1, min(int(per_page), MAX_PER_PAGE))
+    page = max(1, int(page))
+
+    match_sql, params = _match_sql(query)
+    if match_sql is None:
+        return {'results': [], 'total': 0, 'facets': {}, 'page': page, 'per_page': per_page}
+
+    where_sql, filter_params = _filter_sql(filters)
+    params.update(filter_params)
+    base = f"""
+        SELECT p.id, p.category_id, p.brand_id, p.price, m.rank
+        FROM ({match_sql}) m
+        JOIN products p ON p.id = m.product_id
+        WHERE {where_sql}
+    """
+
+    rows = db.session.execute(text(f"""
+        {base}
+        ORDER BY m.rank DESC, p.id DESC
+        LIMIT :limit OFFSET :offset
+    """), dict(params, limit=per_page, offset=(page - 1) * per_page)).fetchall()
+
+    result = {
+        'results': [{'id': r.id, 'rank': float(r.rank or 0)} for r in rows],
+        'page': page,
+        'per_page': per_page,
+    }
+
+    if with_facets:
+        # 'total' is its own COUNT(*): summing a facet misses NULL category_id
+        facet_rows = db.session.execute(text(f"""
+            WITH hits AS ({base})
+            SELECT 'total' AS facet, 'all' AS value, COUNT(*) AS count
+            FROM hits
+            UNION ALL
+            SELECT 'category', CAST(category_id AS VARCHAR(32)), COUNT(*)
+            FROM hits GROUP BY category_id
+            UNION ALL
+            SELECT 'brand', CAST(brand_id AS VARCHAR(32)), COUNT(*)
+            FROM hits GROUP BY brand_id
+            UNION ALL
+            SELECT 'price_band', band, COUNT(*)
+            FROM (SELECT {_price_band_case('price')} AS band FROM hits) banded
+            GROUP BY band
+        """), params).fetchall()
+
+        facets = {'category': {}, 'brand': {}, 'price_band': {}}
+        result['total'] = 0
+        for row in facet_rows:
+            if row.facet == 'total':
+                result['total'] = int(row.count)
+            elif row.value is not None:
+                facets[row.facet][row.value] = int(row.count)
+        result['facets'] = facets
+    else:
+        result['total'] = None
+
+    return result
+
+
+def suggest_products(prefix, limit=8):
+    """Autocomplete: best-ranked active product names for a prefix"""
+    from app import db
+
+    match_sql, params = _match_sql(prefix)
+    if match_sql is None:
+        return []
+    rows = db.session.execute(text(f"""
+        SELECT p.id, p.name, p.slug
+        FROM ({match_sql}) m
+        JOIN products p ON p.id = m.product_id
+        WHERE p.is_active = :is_active
+        ORDER BY m.rank DESC
+        LIMIT :limit
+    """), dict(params, is_active=True, limit=min(int(limit), 20))).fetchall()
+    return [{'id': r.id, 'name': r.name, 'slug': r.slug} for r in rows]
+
+
+def search_response(args):
+    """Build the /api/products/search JSON body from request.args"""
+    from app.models import Product
+
+    found = search_products(
+        args.get('q', ''),
+        filters={
+            'category_id': args.get('category_id'),
+            'brand_id': args.get('brand_id'),
+            'min_price': args.get('min_price', type=float),
+            'max_price': args.get('max_price', type=float),
+        },
+        page=args.get('page', 1, type=int),
+        per_page=args.get('per_page', 20, type=int),
+    )
+
+    ids = [r['id'] for r in found['results']]
+    products = {p.id: p for p in Product.query.filter(Product.id.in_(ids)).all()} if ids else {}
+    found['products'] = [products[i].to_dict() for i in ids if i in products]
+    return found
+
+
+if __name__ == "__main__":
+    import sys
+    from app import create_app
+
+    app = create_app()
+    with app.app_context():
+        query = ' '.join(sys.argv[1:]) or 'phone'
+        print(f"🔍 Searching for '{query}'")
+        print("=" * 40)
+        found = search_products(query)
+        print(f"Total: {found['total']}")
+        for hit in found['results']:
+            print(f"   #{hit['id']} rank={hit['rank']:.3f}")
+        print(f"Facets: {found['facets']}")
+        print(f"Suggestions: {[s['name'] for s in suggest_products(query)]}")
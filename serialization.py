@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Declarative Serialization with Eager Loading
+List endpoints declare the fields they return; the serializer turns
+relationship paths in that declaration into selectinload()/joinedload()
+options, so serializing a page of N products/orders/users costs a fixed
+number of queries instead of the N+1 walks in Model.to_dict().
+
+In development (app.debug, or SERIALIZATION_QUERY_BUDGET set) every
+serialized list runs under a query counter and raises QueryBudgetExceeded
+when it issues more than the budget.
+
+    PRODUCT_CARD = Serializer('Product', [
+        'id', 'name', 'slug', 'price', 'brand.name', 'category.name',
+        'images.image_url',
+    ])
+    products = PRODUCT_CARD.load(Product.query.filter_by(is_active=True).limit(20))
+
+Sparse fieldsets: serializer_for_request(PRODUCT_LIST) narrows a serializer
+to ?fields=id,name,price,brand.name (validated against its declared fields)
+and projects only those columns with load_only(), so both DB I/O and the
+response shrink.
+"""
+
+import os
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime
+from decimal import Decimal
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import joinedload, load_only, selectinload
+
+DEFAULT_QUERY_BUDGET = 5
+MAX_CACHED_SUBSETS = 64
+
+_counter = threading.local()
+_listener_installed = False
+
+
+class QueryBudgetExceeded(AssertionError):
+    """A serialized list issued more queries than its budget (dev only)"""
+
+
+class InvalidFields(ValueError):
+    """?fields= named something the endpoint does not expose; routes return 400"""
+
+
+def _install_listener():
+    global _listener_installed
+    if _listener_installed:
+        return
+    from app import db
+
+    @event.listens_for(db.engine, 'before_cursor_execute')
+    def count_query(conn, cursor, statement, parameters, context, executemany):
+        stack = getattr(_counter, 'stack', None)
+        if stack:
+            for counter in stack:
+                counter['count'] += 1
+                counter['statements'].append(statement)
+
+    _listener_installed = True
+
+
+@contextmanager
+def count_queries():
+    """Yields {'count', 'statements'} for queries run inside the block"""
+    _install_listener()
+    counter = {'count': 0, 'statements': []}
+    if not hasattr(_counter, 'stack'):
+        _counter.stack = []
+    _counter.stack.append(counter)
+    try:
+        yield counter
+    finally:
+        _counter.stack.remove(counter)
+
+
+def _budget_enabled():
+    from flask import current_app
+    return bool(os.environ.get('SERIALIZATION_QUERY_BUDGET')) or current_app.debug
+
+
+def _default_budget():
+    return int(os.environ.get('SERIALIZATION_QUERY_BUDGET') or DEFAULT_QUERY_BUDGET)
+
+
+def _plain(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+def _parse_fields(fields):
+    """['id', 'brand.name', 'images.image_url'] -> {'id': None, 'brand': {'name': None}, ...}"""
+    tree = {}
+    for field in fields:
+        node = tree
+        parts = field.split('.')
+        for part in parts[:-1]:
+            node = node.setdefault(part, {})
+            if node is None:
+                raise ValueError(f"Field {field!r} goes through a scalar column")
+        node.setdefault(parts[-1], None)
+    return tree
+
+
+class Serializer:
+    """Field declaration for one model, resolved lazily against app.models"""
+
+    def __init__(self, model_name, fields, query_budget=None, project_columns=False):
+        self.model_name = model_name
+        self.fields = list(fields)
+        self.tree = _parse_fields(self.fields)
+        self.query_budget = query_budget
+        self.project_columns = project_columns
+        self._options = None
+        self._subsets = {}
+
+    @property
+    def model(self):
+        from app import models
+        return getattr(models, self.model_name)
+
+    def _projected_columns(self, model, tree):
+        """
+        Column attributes to load_only() for one level, or None when a
+        requested field is not a plain column (a property may need others).
+        """
+        mapper = inspect(model)
+        columns = {c.key for c in mapper.column_attrs if c.columns[0].primary_key}
+        for name, subtree in tree.items():
+            if subtree is None:
+                if name not in mapper.column_attrs:
+                    return None
+                columns.add(name)
+            else:
+                # Foreign keys the relationship loads through
+                for column in mapper.relationships[name].local_columns:
+                    attribute = mapper.get_property_by_column(column)
+                    columns.add(attribute.key)
+        return [getattr(model, name) for name in sorted(columns)]
+
+    def _build_options(self, model, tree, parent=None):
+        options = []
+        relationships = inspect(model).relationships
+
+        if parent is None and self.project_columns:
+            columns = self._projected_columns(model, tree)
+            if columns:
+                options.append(load_only(*columns))
+        for name, subtree in tree.items():
+            if subtree is None:
+                if name in relationships:
+                    raise ValueError(f"Declare fields of {model.__name__}.{name}, e.g. '{name}.id'")
+                continue
+            if name not in relationships:
+                raise ValueError(f"{model.__name__}.{name} is not a relationship")
+            relationship = relationships[name]
+            if relationship.lazy == 'dynamic':
+                raise ValueError(
+                    f"{model.__name__}.{name} is lazy='dynamic' and cannot be eager loaded; "
+                    f"declare a count column or query it separately")
+
+            attribute = getattr(model, name)
+            if relationship.uselist:
+                loader = parent.selectinload(attribute) if parent else selectinload(attribute)
+            else:
+                loader = parent.joinedload(attribute) if parent else joinedload(attribute)
+            if self.project_columns:
+                columns = self._projected_columns(relationship.mapper.class_, subtree)
+                if columns:
+                    loader = loader.load_only(*columns)
+            options.append(loader)
+            if subtree:
+                options.extend(self._build_options(relationship.mapper.class_, subtree, loader))
+        return options
+
+    @property
+    def options(self):
+        if self._options is None:
+            self._options = self._build_options(self.model, self.tree)
+        return self._options
+
+    def _dump(self, obj, tree):
+        if obj is None:
+            return None
+        data = {}
+        for name, subtree in tree.items():
+            value = getattr(obj, name)
+            if subtree is None:
+                if isinstance(value, list):
+                    value = [_plain(v) for v in value]
+                data[name] = _plain(value)
+            elif isinstance(value, (list, tuple, set)):
+                data[name] = [self._dump(child, subtree) for child in value]
+            else:
+                data[name] = self._dump(value, subtree)
+        return data
+
+    def dump(self, obj):
+        return self._dump(obj, self.tree)
+
+    def subset(self, requested):
+        """
+        Serializer for a subset of the declared fields. Requesting a
+        relationship name ('brand') selects all its declared fields.
+        """
+        requested = tuple(sorted({f.strip() for f in requested if f.strip()}))
+        if not requested:
+            return self
+        if requested in self._subsets:
+            return self._subsets[requested]
+
+        unknown = []
+        selected = []
+        for field in requested:
+            matches = [f for f in self.fields if f == field or f.startswith(field + '.')]
+            if matches:
+                selected.extend(m for m in matches if m not in selected)
+            else:
+                unknown.append(field)
+        if unknown:
+            raise InvalidFields(
+                f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(self.fields)}")
+
+        if 'id' in self.fields and 'id' not in selected:
+            selected.insert(0, 'id')
+        narrowed = Serializer(self.model_name, selected, self.query_budget, project_columns=True)
+        if len(self._subsets) >= MAX_CACHED_SUBSETS:
+            self._subsets.clear()
+        self._subsets[requested] = narrowed
+        return narrowed
+
+    def load(self, query, budget=None):
+        """Apply eager options, run the query and serialize the rows"""
+        budget = budget or self.query_budget or _default_budget()
+        query = query.options(*self.options)
+
+        if not _budget_enabled():
+            return [self.dump(row) for row in query.all()]
+
+        with count_queries() as counter:
+            result = [self.dump(row) for row in query.all()]
+        if counter['count'] > budget:
+            raise QueryBudgetExceeded(
+                f"{self.model_name} list used {counter['count']} queries (budget {budget}):\n"
+                + "\n".join(counter['statements']))
+        return result
+
+    def dump_many(self, objects, budget=None):
+        """Serialize already-loaded rows (e.g. a pagination page) under the budget"""
+        budget = budget or self.query_budget or _default_budget()
+        if not _budget_enabled():
+            return [self.dump(obj) for obj in objects]
+
+        with count_queries() as counter:
+            result = [self.dump(obj) for obj in objects]
+        if counter['count'] > budget:
+            raise QueryBudgetExceeded(
+                f"{self.model_name} dump used {counter['count']} lazy-load queries (budget {budget}); "
+                f"apply serializer.options to the query")
+        return result
+
+
+PRODUCT_LIST = Serializer('Product', [
+    'id', 'name', 'slug', 'short_description', 'price', 'original_price',
+    'stock_quantity', 'is_active', 'is_featured', 'image_url',
+    'category.id', 'category.name', 'category.slug',
+    'brand.id', 'brand.name', 'brand.slug',
+    'images.image_url', 'images.is_primary', 'images.sort_order',
+])
+
+ORDER_LIST = Serializer('Order', [
+    'id', 'order_number', 'status', 'payment_status', 'total_amount', 'created_at',
+    'paid_at', 'user.id', 'user.name', 'user.email',
+    'items.id', 'items.quantity', 'items.price',
+    'items.product.id', 'items.product.name', 'items.product.image_url',
+])
+
+CYBER_SERVICE_LIST = Serializer('CyberService', [
+    'id', 'name', 'slug', 'short_description', 'description', 'price',
+    'category', 'subcategory', 'estimated_duration', 'requirements',
+    'benefits', 'instructions', 'image_url', 'is_featured', 'is_active', 'sort_order',
+])
+
+USER_LIST = Serializer('User', [
+    'id', 'name', 'email', 'phone', 'referral_code', 'is_active', 'email_verified',
+    'created_at', 'referred_by_id',
+    'wallet.balance', 'wallet.commission_balance',
+    'referred_by.id', 'referred_by.name',
+])
+
+
+def serializer_for_request(serializer, args=None):
+    """Narrow a list serializer to ?fields=a,b,rel.c (comma separated)"""
+    if args is None:
+        from flask import request
+        args = request.args
+    fields = args.get('fields')
+    if not fields:
+        return serializer
+    return serializer.subset(fields.split(','))
+
+
+if __name__ == "__main__":
+    from app import create_app
+    from app.models import Order, Product, User
+
+    app = create_app()
+    with app.app_context():
+        print("🧪 Query counts for 20-row lists")
+        print("=" * 40)
+        for label, serializer, query in [
+            ('Products', PRODUCT_LIST, Product.query.limit(20)),
+            ('Orders', ORDER_LIST, Order.query.limit(20)),
+            ('Users', USER_LIST, User.query.limit(20)),
+        ]:
+            with count_queries() as naive:
+                [row.to_dict() for row in query.all()]
+            with count_queries() as eager:
+                serializer.load(query, budget=1000)
+            print(f"   {label}: to_dict() {naive['count']} queries → serializer {eager['count']} queries")
@@ -1,6 +1,8 @@
 #!/usr/bin/env python3
 """
 Script to build and serve the React frontend from Flask backend
+Build files are precompressed (Brotli + gzip) here so the web dyno only
+streams files; see static_assets.py for how they are served.
 """
 
 import os
@@ -46,12 +48,19 @@ def main():
         
         # Copy build files
         if os.path.exists("frontend/build"):
-            # Remove existing static files
+            # Remove existing static files (uploaded images are kept)
             if os.path.exists("static"):
-                shutil.rmtree("static")
+                for entry in os.listdir("static"):
+                    if entry == "uploads":
+                        continue
+                    path = os.path.join("static", entry)
+                    if os.path.isdir(path):
+                        shutil.rmtree(path)
+                    else:
+                        os.remove(path)
             
             # Copy new build files
-            shutil.copytree("frontend/build", "static")
+            shutil.copytree("frontend/build", "static", dirs_exist_ok=True)
             print("✅ Build files copied to static directory")
         else:
             print("❌ Build directory not found!")
@@ -60,11 +69,21 @@ def main():
         print(f"❌ Error copying build files: {e}")
         return
     
+    # Step 4: Precompress build assets
+    print("🔄 Precompressing build files...")
+    try:
+        from static_assets import compress_build
+        count = compress_build("static")
+        print(f"✅ Wrote {count} Brotli/gzip files")
+    except Exception as e:
+        print(f"❌ Error precompressing build files: {e}")
+        return
+    
     print()
     print("✅ Frontend built and ready to serve!")
     print()
     print("Next steps:")
-    print("1. Update your Flask app to serve static files")
+    print("1. Call static_assets.init_static_serving(app) in create_app()")
     print("2. Restart your Flask application")
     print("3. Access your app at the root URL")
 
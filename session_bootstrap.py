@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Storefront Session Bootstrap
+One authenticated call returning everything the React app fetches after
+login (profile, wallet, cart/wishlist counts, notifications, referral
+stats), instead of six requests each verifying the JWT and loading the user.
+
+    GET /api/auth/bootstrap?sections=profile,wallet&etags=profile:3f9a...,wallet:b71c...
+
+Every section carries its own ETag. Sections whose ETag the client already
+holds come back as {"etag": ..., "unchanged": true} without data; when all
+requested sections are unchanged the response is an empty 304.
+
+Queries: user + wallet (one joined load), counters (one primary-key read,
+see item_counts.py), notifications (one), referral stats (one aggregate).
+"""
+
+import hashlib
+import json
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import joinedload
+
+SECTIONS = ('profile', 'wallet', 'counts', 'notifications', 'referral_stats')
+NOTIFICATION_LIMIT = 20
+
+
+def section_etag(data):
+    raw = json.dumps(data, sort_keys=True, default=str, separators=(',', ':'))
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:16]
+
+
+def parse_known_etags(value):
+    """'profile:abc,wallet:def' -> {'profile': 'abc', 'wallet': 'def'}"""
+    known = {}
+    for part in (value or '').split(','):
+        name, _, etag = part.strip().partition(':')
+        if name and etag:
+            known[name] = etag
+    return known
+
+
+def _load_user(user_id):
+    from app.models import User
+    return User.query.options(joinedload(User.wallet)).filter_by(id=user_id).first()
+
+
+def _notifications(user_id):
+    from app.models import Notification
+
+    query = Notification.query.filter_by(user_id=user_id)
+    rows = query.order_by(Notification.created_at.desc()).limit(NOTIFICATION_LIMIT).all()
+    data = {'notifications': [n.to_dict() for n in rows]}
+    if hasattr(Notification, 'is_read'):
+        data['unread_count'] = query.filter(Notification.is_read.is_(False)).count()
+    return data
+
+
+def _referral_stats(user):
+    from app import db
+    from app.models import Commission, User
+
+    row = db.session.execute(select(
+        select(func.count(User.id)).where(User.referred_by_id == user.id).scalar_subquery()
+        .label('total_referrals'),
+        select(func.coalesce(func.sum(Commission.amount), 0))
+        .where(Commission.referrer_id == user.id).scalar_subquery()
+        .label('total_commissions'),
+    )).one()
+    return {
+        'referral_code': user.referral_code,
+        'total_referrals': row.total_referrals,
+        'total_commissions': float(row.total_commissions),
+        'wallet_balance': float(user.wallet.balance) if user.wallet else 0.0,
+    }
+
+
+def build_bootstrap(user_id, sections=None, known_etags=None):
+    """
+    Returns (payload, all_unchanged). payload is None when the user does
+    not exist or is inactive.
+    """
+    from item_counts import get_item_counts
+
+    # Nothing valid asked for: build everything rather than an empty 304
+    sections = [s for s in (sections or SECTIONS) if s in SECTIONS] or list(SECTIONS)
+    known_etags = known_etags or {}
+
+    user = _load_user(user_id)
+    if user is None or not user.is_active:
+        return None, False
+
+    builders = {
+        'profile': lambda: user.to_dict(),
+        'wallet': lambda: user.wallet.to_dict() if user.wallet else None,
+        'counts': lambda: get_item_counts(user.id),
+        'notifications': lambda: _notifications(user.id),
+        'referral_stats': lambda: _referral_stats(user),
+    }
+
+    payload = {'sections': {}}
+    all_unchanged = True
+    for name in sections:
+        data = builders[name]()
+        etag = section_etag(data)
+        if known_etags.get(name) == etag:
+            payload['sections'][name] = {'etag': etag, 'unchanged': True}
+        else:
+            payload['sections'][name] = {'etag': etag, 'data': data}
+            all_unchanged = False
+    return payload, all_unchanged
+
+
+def bootstrap_response(user_id, args=None):
+    """Flask response for GET /api/auth/bootstrap"""
+    from flask import jsonify, make_response, request
+
+    args = request.args if args is None else args
+    sections = [s.strip() for s in args.get('sections', '').split(',') if s.strip()] or None
+    unknown = [s for s in sections or [] if s not in SECTIONS]
+    if unknown:
+        return jsonify({'error': f"Unknown sections: {', '.join(unknown)}",
+                        'sections': list(SECTIONS)}), 400
+    payload, all_unchanged = build_bootstrap(
+        user_id, sections, parse_known_etags(args.get('etags')))
+    if payload is None:
+        return jsonify({'error': 'User not found'}), 404
+
+    if all_unchanged:
+        response = make_response('', 304)
+    else:
+        response = jsonify(payload)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+if __name__ == "__main__":
+    import sys
+
+    from app import create_app
+    from serialization import count_queries
+
+    app = create_app()
+    with app.app_context():
+        from app.models import User
+
+        user_id = int(sys.argv[1]) if len(sys.argv) > 1 else User.query.first().id
+        with count_queries() as counter:
+            payload, _ = build_bootstrap(user_id)
+        print(f"🚀 Bootstrap for user {user_id}: {counter['count']} queries")
+        for name, section in (payload or {}).get('sections', {}).items():
+            print(f"   {name}: etag {section['etag']}")
@@ -14,101 +14,45 @@ def create_image_upload_endpoint():
     upload_endpoint_code = '''
 # Add this to app/admin/cyber_services.py (or create new file)
 
-import os
-import uuid
 from werkzeug.utils import secure_filename
-from flask import request, jsonify, current_app, url_for
-from flask_jwt_extended import jwt_required
-from PIL import Image
-import io
-
-# Allowed image extensions
-ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
+from flask import request, jsonify
+from flask_jwt_extended import get_jwt_identity, jwt_required
 
-def allowed_file(filename):
-    """Check if file extension is allowed"""
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
-
-def optimize_image(image_data, max_size=(800, 600), quality=85):
-    """Optimize image for web use"""
-    try:
-        # Open image
-        img = Image.open(io.BytesIO(image_data))
-        
-        # Convert to RGB if necessary (for JPEG)
-        if img.mode in ('RGBA', 'LA', 'P'):
-            background = Image.new('RGB', img.size, (255, 255, 255))
-            if img.mode == 'P':
-                img = img.convert('RGBA')
-            background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
-            img = background
-        
-        # Resize if larger than max_size
-        img.thumbnail(max_size, Image.Resampling.LANCZOS)
-        
-        # Save optimized image
-        output = io.BytesIO()
-        img.save(output, format='JPEG', quality=quality, optimize=True)
-        output.seek(0)
-        
-        return output.getvalue()
-    except Exception as e:
-        print(f"Error optimizing image: {e}")
-        return image_data
+# Originals are stored by content hash (duplicates share one file) and
+# acknowledged immediately; thumb/card/detail variants (WebP + JPEG) are
+# rendered by a background job in a process pool. See image_variants.py.
+from image_variants import InvalidImage, delete_upload, handle_image_upload
 
 @bp.route('/upload-image', methods=['POST'])
 @jwt_required()
 def upload_cyber_service_image():
-    """Upload and optimize image for cyber service"""
+    """Store image for cyber service and queue its variants"""
     try:
-        # Check if file is present
         if 'image' not in request.files:
             return jsonify({'error': 'No image file provided'}), 400
-        
-        file = request.files['image']
-        
-        if file.filename == '':
-            return jsonify({'error': 'No file selected'}), 400
-        
-        if not allowed_file(file.filename):
-            return jsonify({'error': 'Invalid file type. Allowed: PNG, JPG, JPEG, GIF, WEBP'}), 400
-        
-        # Create uploads directory if it doesn't exist
-        upload_dir = os.path.join(current_app.root_path, '..', 'static', 'uploads', 'cyber-services')
-        os.makedirs(upload_dir, exist_ok=True)
-        
-        # Generate unique filename
-        file_extension = file.filename.rsplit('.', 1)[1].lower()
-        unique_filename = f"{uuid.uuid4().hex}.{file_extension}"
-        
-        # Read and optimize image
-        image_data = file.read()
-        
-        # Check file size (max 5MB)
-        if len(image_data) > 5 * 1024 * 1024:
-            return jsonify({'error': 'File too large. Maximum size is 5MB'}), 400
-        
-        # Optimize image
-        optimized_data = optimize_image(image_data)
-        
-        # Save optimized image
-        file_path = os.path.join(upload_dir, unique_filename)
-        with open(file_path, 'wb') as f:
-            f.write(optimized_data)
-        
-        # Generate URL for the uploaded image
-        image_url = f"/static/uploads/cyber-services/{unique_filename}"
-        
-        return jsonify({
-            'success': True,
-            'message': 'Image uploaded successfully',
-            'image_url': image_url,
-            'filename': unique_filename
-        }), 200
-        
+
+        payload = handle_image_upload(request.files['image'], 'cyber-services',
+                                      created_by=get_jwt_identity())
+        return jsonify(payload), 200
+
+    except InvalidImage as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# Product images use the same pipeline, e.g. in app/admin/products.py:
+#
+# @bp.route('/upload-image', methods=['POST'])
+# @jwt_required()
+# def upload_product_image():
+#     payload = handle_image_upload(request.files['image'], 'products',
+#                                   created_by=get_jwt_identity())
+#     return jsonify(payload), 200
+#
+# Serializers add srcset fields once variants exist:
+#
+# data.update(image_sources(service.image_url))
+
 @bp.route('/delete-image', methods=['DELETE'])
 @jwt_required()
 def delete_cyber_service_image():
@@ -125,12 +69,8 @@ def delete_cyber_service_image():
         if safe_filename != filename:
             return jsonify({'error': 'Invalid filename'}), 400
         
-        # Construct file path
-        file_path = os.path.join(current_app.root_path, '..', 'static', 'uploads', 'cyber-services', filename)
-        
-        # Delete file if it exists
-        if os.path.exists(file_path):
-            os.remove(file_path)
+        # Drop this reference; files go with the last one
+        if delete_upload('cyber-services', filename):
             return jsonify({'success': True, 'message': 'Image deleted successfully'}), 200
         else:
             return jsonify({'error': 'Image not found'}), 404
@@ -147,8 +87,11 @@ def create_static_file_serving():
     static_config = '''
 # Add this to your main Flask app configuration (app/__init__.py or run.py)
 
-import os
-from flask import Flask, send_from_directory
+from flask import Flask
+
+# Content-addressed uploads are served with Cache-Control: immutable and a
+# one-year expiry (see send_upload in image_variants.py)
+from image_variants import send_upload
 
 def create_app():
     app = Flask(__name__)
@@ -158,16 +101,14 @@ def create_app():
     # Serve uploaded files
     @app.route('/static/uploads/<path:filename>')
     def uploaded_file(filename):
-        upload_dir = os.path.join(app.root_path, '..', 'static', 'uploads')
-        return send_from_directory(upload_dir, filename)
+        return send_upload(filename)
     
     return app
 
 # Alternative: Add to your main routes file
 @app.route('/static/uploads/<path:filename>')
 def uploaded_file(filename):
-    upload_dir = os.path.join(current_app.root_path, '..', 'static', 'uploads')
-    return send_from_directory(upload_dir, filename)
+    return send_upload(filename)
 '''
     
     return static_config
@@ -252,7 +193,7 @@ const handleImageUpload = async (event) => {
         className="block w-full text-sm text-gray-500 file:mr-4 file:py-2 file:px-4 file:rounded-lg file:border-0 file:text-sm file:font-semibold file:bg-blue-50 file:text-blue-700 hover:file:bg-blue-100 disabled:opacity-50"
       />
       <p className="text-xs text-gray-500 mt-1">
-        Upload JPG, PNG, GIF, or WEBP. Max size: 5MB. Images will be optimized automatically.
+        Upload JPG, PNG, GIF, or WEBP. Max size: 5MB. Resized WebP/JPEG versions are generated in the background.
       </p>
     </div>
     
@@ -284,7 +225,7 @@ const handleImageUpload = async (event) => {
     <div className="mt-2 text-sm text-blue-600">
       <div className="flex items-center">
         <div className="animate-spin rounded-full h-4 w-4 border-b-2 border-blue-600 mr-2"></div>
-        Uploading and optimizing image...
+        Uploading image...
       </div>
     </div>
   )}
@@ -348,17 +289,20 @@ if __name__ == "__main__":
     print("=" * 30)
     print("🎯 FEATURES INCLUDED:")
     print("• Direct file upload (drag & drop)")
-    print("• Image optimization (resize, compress)")
+    print("• Background thumb/card/detail variants (WebP + JPEG, srcset)")
     print("• File type validation (JPG, PNG, GIF, WEBP)")
     print("• File size limit (5MB)")
     print("• Live preview")
     print("• URL input as alternative")
     print("• Error handling")
-    print("• Image deletion")
+    print("• Image deletion (reference counted, duplicates stored once)")
+    print("• Immutable caching for content-addressed uploads")
     print()
     print("🔧 SETUP STEPS:")
     print("1. Add upload endpoint to admin routes")
     print("2. Configure static file serving")
     print("3. Update frontend component")
     print("4. Create uploads directory")
-    print("5. Install Pillow for image processing: pip install Pillow")
\ No newline at end of file
+    print("5. Install Pillow for image processing: pip install Pillow")
+    print("6. Run python migrate_background_jobs.py (variant jobs use background_jobs)")
+    print("7. Run python migrate_image_blobs.py (content-hash reference counts)")
\ No newline at end of file
@@ -18,7 +18,8 @@ def create_upload_directories():
     directories = [
         'static',
         'static/uploads',
-        'static/uploads/cyber-services'
+        'static/uploads/cyber-services',
+        'static/uploads/products'
     ]
     
     for directory in directories:
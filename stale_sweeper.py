@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Stale Order and Abandoned Cart Sweeper
+Unpaid pending orders and untouched carts used to pile up forever, and
+every order and cart query had to wade through them. The sweeper reclaims
+them in batches, each batch one indexed range read plus a few set-based
+statements, committed on its own:
+- unpaid orders (status and payment_status 'pending') older than
+  UNPAID_ORDER_EXPIRY_HOURS (default 48) are cancelled through
+  order_events.bulk_update_order_status(), so the timeline gets a
+  'cancelled' event, and their stock reservations are released
+- reservations whose TTL passed are released, and the unpaid orders
+  holding them cancelled with them (release_expired_reservations)
+- carts not touched for ABANDONED_CART_DAYS (default 30) are deleted with
+  their items, and the owners' cart counters are recomputed. Every cart
+  insert and item write sets carts.updated_at (item_storage), and
+  migrate_sweeper_indexes.py backfills old carts, so the read is a range
+  scan of ix_carts_updated_at
+- expired idempotency keys and auth_invalidations rows past the identity
+  cache TTL are purged
+
+Every run reports what it reclaimed: it prints a summary, logs one
+`stale_sweep {...}` JSON line, and stores the metrics as the job result
+when run as a stale_sweep background job.
+
+Schedule `python stale_sweeper.py` hourly (e.g. Heroku Scheduler). Run
+migrate_sweeper_indexes.py once for the partial and age indexes it uses.
+"""
+
+import json
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import bindparam, text
+
+from background_jobs import register_job, update_job
+from identity_cache import prune_invalidations
+from idempotency import purge_expired_keys
+from inventory_reservations import release_expired_reservations, release_orders_reservations
+from item_counts import refresh_item_counts
+from order_events import bulk_update_order_status
+
+JOB_TYPE = 'stale_sweep'
+DEFAULT_ORDER_EXPIRY_HOURS = 48
+DEFAULT_CART_DAYS = 30
+DEFAULT_BATCH_SIZE = 500
+
+logger = logging.getLogger(__name__)
+
+
+def get_sweep_settings():
+    return {
+        'order_expiry': timedelta(hours=int(
+            os.environ.get('UNPAID_ORDER_EXPIRY_HOURS', DEFAULT_ORDER_EXPIRY_HOURS))),
+        'cart_age': timedelta(days=int(os.environ.get('ABANDONED_CART_DAYS', DEFAULT_CART_DAYS))),
+        'batch_size': int(os.environ.get('SWEEP_BATCH_SIZE', DEFAULT_BATCH_SIZE)),
+    }
+
+
+def _skip_locked():
+    from app import db
+    return 'FOR UPDATE SKIP LOCKED' if db.engine.dialect.name == 'postgresql' else ''
+
+
+def expire_unpaid_orders(max_age, batch_size=DEFAULT_BATCH_SIZE):
+    """Cancel unpaid pending orders older than max_age; returns metrics"""
+    from app import db
+
+    cutoff = datetime.utcnow() - max_age
+    note = f"Expired: unpaid after {int(max_age.total_seconds() // 3600)}h"
+    metrics = {'orders_expired': 0, 'order_reservations_released': 0, 'order_units_restocked': 0}
+    while True:
+        # Matches the partial index ix_orders_unpaid_created_at
+        ids = db.session.execute(text(f"""
+            SELECT id FROM orders
+            WHERE status = :pending AND payment_status = :pending AND created_at < :cutoff
+            ORDER BY created_at
+            LIMIT :batch_size
+            {_skip_locked()}
+        """), {'pending': 'pending', 'cutoff': cutoff, 'batch_size': batch_size}).scalars().all()
+        if not ids:
+            return metrics
+        released = release_orders_reservations(ids)
+        metrics['orders_expired'] += bulk_update_order_status(ids, 'cancelled', note=note)
+        metrics['order_reservations_released'] += released['reservations']
+        metrics['order_units_restocked'] += released['units']
+        db.session.commit()
+        if len(ids) < batch_size:
+            return metrics
+
+
+def sweep_abandoned_carts(max_age, batch_size=DEFAULT_BATCH_SIZE):
+    """Delete carts (and items) untouched for max_age; returns metrics"""
+    from app import db
+
+    cutoff = datetime.utcnow() - max_age
+    metrics = {'carts_deleted': 0, 'cart_items_deleted': 0}
+    while True:
+        rows = db.session.execute(text(f"""
+            SELECT id, user_id FROM carts
+            WHERE updated_at < :cutoff
+            ORDER BY updated_at
+            LIMIT :batch_size
+            {_skip_locked()}
+        """), {'cutoff': cutoff, 'batch_size': batch_size}).fetchall()
+        if not rows:
+            return metrics
+        ids = [row.id for row in rows]
+        params = {'ids': ids}
+        metrics['cart_items_deleted'] += db.session.execute(text("""
+            DELETE FROM cart_items WHERE cart_id IN :ids
+        """).bindparams(bindparam('ids', expanding=True)), params).rowcount
+        metrics['carts_deleted'] += db.session.execute(text("""
+            DELETE FROM carts WHERE id IN :ids
+        """).bindparams(bindparam('ids', expanding=True)), params).rowcount
+        refresh_item_counts({row.user_id for row in rows if row.user_id is not None})
+        db.session.commit()
+        if len(rows) < batch_size:
+            return metrics
+
+
+def _ttl_metrics(released):
+    return {'ttl_reservations_released': released['reservations'],
+            'ttl_units_restocked': released['units'],
+            'ttl_orders_expired': released['orders_expired']}
+
+
+def run_sweep(settings=None, progress=None):
+    """All sweep steps in order; returns the combined metrics"""
+    from app import db
+
+    settings = dict(get_sweep_settings(), **(settings or {}))
+    batch_size = settings['batch_size']
+    started = time.monotonic()
+    metrics = {}
+
+    steps = [
+        ('orders', lambda: expire_unpaid_orders(settings['order_expiry'], batch_size)),
+        ('reservations', lambda: _ttl_metrics(release_expired_reservations(batch_size))),
+        ('carts', lambda: sweep_abandoned_carts(settings['cart_age'], batch_size)),
+        ('idempotency_keys', lambda: {'idempotency_keys_purged': purge_expired_keys(batch_size)}),
+        ('auth_invalidations',
+         lambda: {'auth_invalidations_pruned': prune_invalidations(batch_size)}),
+    ]
+    for name, step in steps:
+        try:
+            metrics.update(step())
+        except Exception:
+            db.session.rollback()
+            raise
+        if progress:
+            progress(dict(metrics, step=name))
+
+    metrics['duration_ms'] = int((time.monotonic() - started) * 1000)
+    logger.info('stale_sweep %s', json.dumps(metrics, sort_keys=True))
+    return metrics
+
+
+@register_job(JOB_TYPE)
+def run_stale_sweep(job_id, payload):
+    settings = {}
+    if payload.get('order_expiry_hours'):
+        settings['order_expiry'] = timedelta(hours=int(payload['order_expiry_hours']))
+    if payload.get('cart_days'):
+        settings['cart_age'] = timedelta(days=int(payload['cart_days']))
+    if payload.get('batch_size'):
+        settings['batch_size'] = int(payload['batch_size'])
+    return run_sweep(settings, progress=lambda progress: update_job(job_id, progress=progress))
+
+
+if __name__ == "__main__":
+    from app import create_app
+
+    app = create_app()
+    with app.app_context():
+        settings = get_sweep_settings()
+        print("🧹 Sweeping stale orders and abandoned carts...")
+        print(f"   Unpaid orders older than {settings['order_expiry']}")
+        print(f"   Carts untouched for {settings['cart_age'].days} days")
+        result = run_sweep(settings)
+        for key, value in result.items():
+            print(f"   {key}: {value}")
+        print("✅ Sweep finished")
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Static Asset Serving for the React Build
+serve_frontend.py copies frontend/build into static/ and precompresses it
+(Brotli and gzip sidecars, written once at build time). init_static_serving()
+then puts WhiteNoise in front of the Flask app so the build is served from
+memory-resident file metadata without touching Flask:
+- fingerprinted files (main.3f2a1b9c.js, 512.e4c1d2f0.chunk.css, media/*)
+  get `Cache-Control: max-age=315360000, public, immutable`
+- index.html, manifest.json and service-worker.js get `no-cache`
+- the .br / .gz sidecar is picked from Accept-Encoding, and Range requests,
+  ETag and If-Modified-Since are handled by WhiteNoise
+- client-side routes (/products/abc) fall back to index.html; every other
+  404 (all of /api/) goes to the app's own 404 handler, or a JSON 404
+
+static/uploads is left to the Flask upload route (see send_upload in
+image_variants.py), since uploads appear after the worker starts.
+
+Usage in create_app():
+
+    from static_assets import init_static_serving
+    init_static_serving(app)    # after the app's own error handlers
+
+Precompress an existing build by hand: python static_assets.py [static]
+"""
+
+import os
+import re
+
+from werkzeug.exceptions import NotFound
+from whitenoise import WhiteNoise
+from whitenoise.compress import Compressor
+
+UPLOADS_DIR = 'uploads'
+API_PREFIX = '/api/'
+
+# CRA output names: main.3f2a1b9c.js, 787.c4d2a1e0.chunk.js, logo.6ce24c58023cc2f8fd88.svg
+FINGERPRINTED = re.compile(r'\.[0-9a-f]{8,}\.(?:chunk\.)?\w+$')
+
+# Entry points the browser must revalidate so a deploy is picked up
+NO_CACHE_FILES = {'index.html', 'manifest.json', 'asset-manifest.json', 'service-worker.js'}
+
+SHORT_MAX_AGE = 3600
+
+
+def default_root(app):
+    return os.path.abspath(os.path.join(app.root_path, '..', 'static'))
+
+
+def is_fingerprinted(path, url):
+    return bool(FINGERPRINTED.search(url))
+
+
+def _add_headers(headers, path, url):
+    if url.endswith('/') or os.path.basename(path) in NO_CACHE_FILES:
+        headers['Cache-Control'] = 'no-cache'
+
+
+def compress_build(root, log=print):
+    """Write .br/.gz next to every compressible build file; returns files written"""
+    compressor = Compressor(quiet=True)
+    written = 0
+    for dirpath, dirs, files in os.walk(root):
+        if os.path.abspath(dirpath) == os.path.abspath(root) and UPLOADS_DIR in dirs:
+            dirs.remove(UPLOADS_DIR)
+        for filename in files:
+            if filename.endswith(('.br', '.gz')) or not compressor.should_compress(filename):
+                continue
+            written += len(list(compressor.compress(os.path.join(dirpath, filename))))
+    if not compressor.use_brotli:
+        log("⚠️  Brotli not installed, wrote gzip only (pip install Brotli)")
+    return written
+
+
+def init_static_serving(app, root=None):
+    """Serve the build through WhiteNoise and add the SPA index fallback"""
+    root = root or default_root(app)
+    whitenoise = WhiteNoise(
+        app.wsgi_app,
+        max_age=SHORT_MAX_AGE,
+        index_file=True,
+        immutable_file_test=is_fingerprinted,
+        add_headers_function=_add_headers,
+    )
+    if os.path.isdir(root):
+        for entry in os.scandir(root):
+            if entry.is_dir():
+                if entry.name != UPLOADS_DIR:
+                    whitenoise.add_files(entry.path, prefix=entry.name)
+            elif not entry.name.endswith(('.br', '.gz')):
+                whitenoise.add_file_to_dictionary(f'/{entry.name}', entry.path)
+    app.wsgi_app = whitenoise
+
+    index_path = os.path.join(root, 'index.html')
+    app_not_found = app.error_handler_spec.get(None, {}).get(404, {}).get(NotFound)
+
+    @app.errorhandler(404)
+    def spa_fallback(error):
+        from flask import jsonify, request, send_file
+
+        wants_html = 'text/html' in request.headers.get('Accept', '')
+        if (request.method == 'GET' and wants_html and not request.path.startswith(API_PREFIX)
+                and os.path.exists(index_path)):
+            response = send_file(index_path, mimetype='text/html', conditional=True)
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+        if app_not_found is not None:
+            return app_not_found(error)
+        if request.path.startswith(API_PREFIX):
+            return jsonify({'error': 'Not found'}), 404
+        return error
+
+    return whitenoise
+
+
+if __name__ == "__main__":
+    import sys
+
+    root = sys.argv[1] if len(sys.argv) > 1 else 'static'
+    print(f"🗜️ Precompressing {root}...")
+    count = compress_build(root)
+    print(f"✅ Wrote {count} compressed files")
@@ -68,6 +68,26 @@ def test_all_endpoints():
                         
                 except Exception as e:
                     print(f"   💥 {endpoint}: ERROR - {str(e)}")
+            
+            # The bootstrap endpoint bundles all of the above
+            print("\n🔍 Testing /api/auth/bootstrap...")
+            try:
+                response = client.get('/api/auth/bootstrap', headers=headers)
+                if response.status_code == 200:
+                    sections = response.get_json()['sections']
+                    print(f"   ✅ /api/auth/bootstrap: 200 ({', '.join(sections)})")
+                    
+                    etags = ','.join(f"{name}:{section['etag']}" for name, section in sections.items())
+                    repeat = client.get(f'/api/auth/bootstrap?etags={etags}', headers=headers)
+                    if repeat.status_code == 304:
+                        print("   ✅ Unchanged sections: 304")
+                    else:
+                        print(f"   ⚠️  Expected 304 with known ETags, got {repeat.status_code}")
+                else:
+                    print(f"   ⚠️  /api/auth/bootstrap: {response.status_code}")
+                    print(f"      Response: {response.get_data(as_text=True)}")
+            except Exception as e:
+                print(f"   💥 /api/auth/bootstrap: ERROR - {str(e)}")
         
         return True
 
@@ -61,7 +61,7 @@ def test_complete_user_deletion():
         print("   9. User's cyber service orders + forms")
         print("   10. User's regular orders + order items + payments")
         print("   11. User's wallet")
-        print("   12. Referral relationships (set to NULL)")
+        print("   12. Referral relationships (set to NULL in one UPDATE)")
         print("   13. System logs related to user")
         print("   14. The user record itself")
         
@@ -70,7 +70,7 @@ def test_complete_user_deletion():
         print("✅ Cannot delete users with pending orders")
         print("✅ Cannot delete users with pending withdrawals")
         print("✅ Logs deletion activity for audit trail")
-        print("✅ Database transaction ensures all-or-nothing deletion")
+        print("✅ User is deactivated immediately, dependents purged in chunked batches")
         print("✅ Alternative soft delete (deactivate) option available")
         
         # Check for test users to potentially demonstrate on
@@ -105,7 +105,9 @@ def test_complete_user_deletion():
         print(f"\n🚀 API Endpoints Available:")
         print("=" * 30)
         print("🗑️  DELETE /api/admin/users/<user_id>")
-        print("   → Permanently deletes user and ALL related data")
+        print("   → Marks user deleted and queues a background purge job")
+        print("   → Returns 202 with a job id; progress at GET /api/admin/jobs/<job_id>")
+        print("   → Purges ALL related data in chunked batches per table")
         print("   → Requires 'delete_users' permission")
         print("   → Cannot be undone!")
         
@@ -120,15 +122,16 @@ def test_complete_user_deletion():
         print("2. Show warning about data loss")
         print("3. Offer choice between permanent delete and deactivate")
         print("4. Display safety checks (pending orders/withdrawals)")
-        print("5. Show deletion progress and confirmation")
+        print("5. Poll the deletion job and show per-table progress")
         
         print(f"\n⚡ Testing Complete User Deletion:")
         print("=" * 40)
         print("To test the deletion functionality:")
         print("1. Identify a test user with no orders/withdrawals")
         print("2. Make DELETE request to /api/admin/users/<user_id>")
-        print("3. Verify all related data is removed from database")
-        print("4. Check admin activity logs for deletion record")
+        print("3. Poll the job (or run: python user_deletion_job.py <user_id>) until completed")
+        print("4. Verify all related data is removed from database")
+        print("5. Check admin activity logs for deletion record")
 
 def simulate_user_deletion_check(user_id):
     """Simulate what would be deleted for a specific user"""
@@ -85,6 +85,26 @@ def test_backend_pagination():
             print(f"   Actual pages: {actual_pages}")
             print(f"   Match: {'✅' if expected_pages == actual_pages else '❌'}")
             
+            # Test keyset (cursor) pagination walks every user exactly once
+            print(f"\n4. 🔍 Testing keyset pagination...")
+            from keyset_pagination import get_sort_columns, keyset_paginate
+            
+            seen_ids = []
+            cursor = None
+            pages_walked = 0
+            while True:
+                keyset_page = keyset_paginate(User.query, get_sort_columns('users'),
+                                              cursor=cursor, per_page=20)
+                seen_ids.extend(user.id for user in keyset_page.items)
+                pages_walked += 1
+                if not keyset_page.has_next:
+                    break
+                cursor = keyset_page.next_cursor
+            
+            print(f"   Pages walked: {pages_walked}")
+            print(f"   Users seen: {len(seen_ids)} (unique: {len(set(seen_ids))})")
+            print(f"   Match: {'✅' if len(set(seen_ids)) == total_users == len(seen_ids) else '❌'}")
+            
             return True
             
     except Exception as e:
@@ -73,6 +73,23 @@ def test_product_count_fixes():
             except Exception as e:
                 print(f"❌ Error testing API: {str(e)}")
         
+        print(f"\n🧮 Verifying Cached GROUP BY Counts:")
+        print("=" * 38)
+        
+        from category_cache import load_catalog_menu
+        menu = load_catalog_menu()
+        mismatches = 0
+        for category in menu['categories']:
+            direct_count = Product.query.filter_by(
+                category_id=category['id'], is_active=True
+            ).count()
+            if direct_count != category['product_count']:
+                mismatches += 1
+                print(f"   ❌ {category['name']}: cached {category['product_count']}, direct {direct_count}")
+        
+        if mismatches == 0:
+            print(f"   ✅ All {len(menu['categories'])} category counts match direct counts")
+        
         print(f"\n🔧 Frontend Fixes Applied:")
         print("=" * 30)
         print("✅ ProductSlideshow component:")
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Background Cascading User Deletion
+The admin DELETE marks the user deleted immediately (deactivated, deleted_at
+set) and queues a job; the job then purges dependents table by table in
+chunked batches, committing and reporting progress after each chunk, so no
+single transaction holds locks for the whole cascade.
+
+Referrals are re-parented with one set-based UPDATE.
+"""
+
+from datetime import datetime
+
+from sqlalchemy import delete, select, text, update
+
+from background_jobs import create_job, register_job, start_job, update_job
+
+JOB_TYPE = 'user_deletion'
+DEFAULT_CHUNK_SIZE = 500
+
+
+class UserDeletionBlocked(Exception):
+    """Raised when the user still has pending orders or withdrawals"""
+
+
+def _deletion_steps(user_id):
+    """
+    (label, model, where clause) in child-before-parent order.
+    Mirrors the list in test_complete_user_deletion.py.
+    """
+    from app.models import (
+        OTP, Cart, CartItem, Commission, CyberServiceForm, CyberServiceOrder,
+        Deposit, Notification, Order, OrderItem, Payment, Review, SystemLog,
+        Wallet, Wishlist, WishlistItem, Withdrawal,
+    )
+
+    user_orders = select(Order.id).where(Order.user_id == user_id)
+    user_cyber_orders = select(CyberServiceOrder.id).where(CyberServiceOrder.user_id == user_id)
+    user_carts = select(Cart.id).where(Cart.user_id == user_id)
+    user_wishlists = select(Wishlist.id).where(Wishlist.user_id == user_id)
+
+    return [
+        ('reviews', Review, Review.user_id == user_id),
+        ('cart_items', CartItem, CartItem.cart_id.in_(user_carts)),
+        ('carts', Cart, Cart.user_id == user_id),
+        ('wishlist_items', WishlistItem, WishlistItem.wishlist_id.in_(user_wishlists)),
+        ('wishlists', Wishlist, Wishlist.user_id == user_id),
+        ('notifications', Notification, Notification.user_id == user_id),
+        ('otps', OTP, OTP.user_id == user_id),
+        ('deposits', Deposit, Deposit.user_id == user_id),
+        ('withdrawals', Withdrawal, Withdrawal.user_id == user_id),
+        ('commissions', Commission,
+         (Commission.referrer_id == user_id) | Commission.order_id.in_(user_orders)),
+        ('cyber_service_forms', CyberServiceForm, CyberServiceForm.order_id.in_(user_cyber_orders)),
+        ('cyber_service_orders', CyberServiceOrder, CyberServiceOrder.user_id == user_id),
+        ('order_items', OrderItem, OrderItem.order_id.in_(user_orders)),
+        ('payments', Payment, Payment.order_id.in_(user_orders)),
+        ('orders', Order, Order.user_id == user_id),
+        ('wallets', Wallet, Wallet.user_id == user_id),
+        ('system_logs', SystemLog, SystemLog.user_id == user_id),
+    ]
+
+
+def get_deletion_blockers(user_id):
+    from app.models import Order, Withdrawal
+
+    return {
+        'pending_orders': Order.query.filter_by(user_id=user_id, status='pending').count(),
+        'pending_withdrawals': Withdrawal.query.filter_by(user_id=user_id, status='pending').count(),
+    }
+
+
+def request_user_deletion(app, user_id, admin_id=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                          reparent_to_grandparent=False):
+    """
+    Mark the user deleted and queue the purge. Returns the job id so the
+    admin endpoint can respond 202 with a progress URL.
+    """
+    from app import db
+    from app.models import User
+
+    user = User.query.get(user_id)
+    if not user:
+        raise LookupError(f"User {user_id} not found")
+
+    blockers = get_deletion_blockers(user_id)
+    if any(blockers.values()):
+        raise UserDeletionBlocked(
+            f"Cannot delete user with {blockers['pending_orders']} pending orders "
+            f"and {blockers['pending_withdrawals']} pending withdrawals")
+
+    # Immediately invisible to login and admin lists. deleted_at is added by
+    # migrate_background_jobs.py and is not mapped on User, so it is set in SQL
+    user.is_active = False
+    db.session.execute(text("""
+        UPDATE users SET deleted_at = :now WHERE id = :user_id
+    """), {'now': datetime.utcnow(), 'user_id': user_id})
+
+    job_id = create_job(JOB_TYPE, {
+        'user_id': user_id,
+        'chunk_size': chunk_size,
+        'reparent_to_grandparent': reparent_to_grandparent,
+    }, created_by=admin_id)
+    db.session.commit()
+
+    start_job(app, job_id)
+    return job_id
+
+
+def _purge_in_chunks(model, where, chunk_size):
+    """Delete matching rows chunk_size at a time, yielding the running total"""
+    from app import db
+
+    total = 0
+    while True:
+        ids = [row[0] for row in db.session.execute(
+            select(model.id).where(where).limit(chunk_size))]
+        if not ids:
+            return
+        db.session.execute(
+            delete(model).where(model.id.in_(ids)).execution_options(synchronize_session=False))
+        db.session.commit()
+        total += len(ids)
+        yield total
+
+
+def reparent_referrals(user_id, reparent_to_grandparent=False):
+    """Move the user's referrals in one UPDATE (to NULL or to their referrer)"""
+    from app import db
+    from app.models import User
+
+    new_parent = None
+    if reparent_to_grandparent:
+        new_parent = db.session.execute(
+            select(User.referred_by_id).where(User.id == user_id)).scalar()
+
+    result = db.session.execute(
+        update(User)
+        .where(User.referred_by_id == user_id)
+        .values(referred_by_id=new_parent)
+        .execution_options(synchronize_session=False))
+    db.session.commit()
+    return result.rowcount
+
+
+@register_job(JOB_TYPE)
+def run_user_deletion(job_id, payload):
+    from app import db
+    from app.models import User
+
+    user_id = payload['user_id']
+    chunk_size = payload.get('chunk_size') or DEFAULT_CHUNK_SIZE
+    steps = _deletion_steps(user_id)
+    deleted = {}
+
+    for index, (label, model, where) in enumerate(steps, start=1):
+        deleted[label] = 0
+        for total in _purge_in_chunks(model, where, chunk_size):
+            deleted[label] = total
+            update_job(job_id, progress={
+                'step': index,
+                'total_steps': len(steps) + 2,
+                'current_table': label,
+                'deleted': deleted,
+            })
+
+    deleted['referrals_reparented'] = reparent_referrals(
+        user_id, payload.get('reparent_to_grandparent', False))
+    update_job(job_id, progress={
+        'step': len(steps) + 1,
+        'total_steps': len(steps) + 2,
+        'current_table': 'users.referred_by_id',
+        'deleted': deleted,
+    })
+
+    db.session.execute(delete(User).where(User.id == user_id))
+    db.session.commit()
+    deleted['users'] = 1
+
+    return {'user_id': user_id, 'deleted': deleted}
+
+
+if __name__ == "__main__":
+    import os
+    import sys
+    from app import create_app
+    from background_jobs import get_job, run_job
+
+    if len(sys.argv) != 2:
+        print("Usage: python user_deletion_job.py <user_id>")
+        sys.exit(1)
+
+    # Run in this process instead of a daemon thread
+    os.environ['BACKGROUND_JOBS_INLINE'] = 'false'
+
+    app = create_app()
+    with app.app_context():
+        user_id = int(sys.argv[1])
+        print(f"🗑️  Deleting user {user_id}...")
+        job_id = request_user_deletion(app, user_id)
+        run_job(job_id)
+
+        job = get_job(job_id)
+        print(f"Status: {job['status']}")
+        for label, count in (job['result'] or {}).get('deleted', {}).items():
+            print(f"   {label}: {count}")
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Versioned Read-Mostly Caches
+In-process caches for small, read-mostly datasets (category/brand menu,
+cyber-service catalog). Each cache has a version row in cache_versions;
+writers bump it (directly or via SQLAlchemy events) and every worker checks
+the versions with one query at most every CACHE_VERSION_POLL_SECONDS, on its
+own connection, so warm requests cost zero queries. Responses carry an ETag derived from the version.
+
+Run migrate_cache_versions.py once to create the cache_versions table.
+"""
+
+import os
+import threading
+import time
+
+from flask import jsonify, make_response, request
+from sqlalchemy import event, text
+
+DEFAULT_POLL_SECONDS = 5
+
+_caches = {}
+_versions = {}
+_versions_lock = threading.Lock()
+_next_poll = 0.0
+
+
+def _poll_seconds():
+    return float(os.environ.get('CACHE_VERSION_POLL_SECONDS', DEFAULT_POLL_SECONDS))
+
+
+def _refresh_versions(force=False):
+    """Reload all cache versions in one query when the poll interval passed"""
+    global _next_poll
+    from app import db
+
+    now = time.monotonic()
+    if not force and now < _next_poll:
+        return
+    _next_poll = now + _poll_seconds()
+
+    try:
+        # Own connection: cache reads happen mid-request and must never roll
+        # back the caller's pending work in db.session
+        with db.engine.connect() as conn:
+            rows = conn.execute(text("SELECT name, version FROM cache_versions")).fetchall()
+    except Exception:
+        # Without the table every poll forces a reload, which is still correct
+        rows = []
+        with _versions_lock:
+            for name in _caches:
+                _versions[name] = _versions.get(name, 0) + 1
+        return
+
+    with _versions_lock:
+        for row in rows:
+            _versions[row.name] = row.version
+
+
+class VersionedCache:
+    """Holds one loaded dataset per version"""
+
+    def __init__(self, name, loader):
+        self.name = name
+        self.loader = loader
+        self._lock = threading.Lock()
+        self._version = None
+        self._data = None
+        _caches[name] = self
+
+    @property
+    def etag(self):
+        return f'{self.name}-{self._version}'
+
+    def get(self):
+        """Return (data, etag), reloading only when the version moved"""
+        _refresh_versions()
+        current = _versions.get(self.name, 0)
+        if self._version != current or self._data is None:
+            with self._lock:
+                if self._version != current or self._data is None:
+                    self._data = self.loader()
+                    self._version = current
+        return self._data, self.etag
+
+    def invalidate(self):
+        with self._lock:
+            self._data = None
+
+
+def bump_cache_version(name, connection=None):
+    """
+    Bump a cache version. Pass the flush connection from SQLAlchemy events so
+    the bump commits or rolls back with the write that caused it.
+    """
+    global _next_poll
+    from app import db
+
+    executor = connection if connection is not None else db.session
+    updated = executor.execute(text("""
+        UPDATE cache_versions SET version = version + 1 WHERE name = :name
+    """), {'name': name}).rowcount
+    if not updated:
+        executor.execute(text("""
+            INSERT INTO cache_versions (name, version) VALUES (:name, 1)
+        """), {'name': name})
+
+    # Re-read versions on the next get() so this worker's ETag moves too
+    _next_poll = 0.0
+    cache = _caches.get(name)
+    if cache:
+        cache.invalidate()
+
+
+def invalidate_on_change(name, *models):
+    """Bump `name` whenever any of the models is inserted, updated or deleted"""
+    def bump(mapper, connection, target):
+        bump_cache_version(name, connection)
+
+    for model in models:
+        for event_name in ('after_insert', 'after_update', 'after_delete'):
+            event.listen(model, event_name, bump)
+
+
+def cached_json_response(cache, build=None, max_age=60):
+    """
+    JSON response from a cache with weak ETag / If-None-Match handling.
+    `build(data)` can pick a slice of the cached data (one slug, one category).
+    """
+    data, etag = cache.get()
+    if build is not None:
+        data = build(data)
+        if data is None:
+            return jsonify({'error': 'Not found'}), 404
+
+    if request.if_none_match.contains_weak(etag):
+        return cache_headers(make_response('', 304), etag, max_age), 304
+
+    return cache_headers(jsonify(data), etag, max_age), 200
+
+
+def cache_headers(response, etag, max_age):
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = f'public, max-age={max_age}, must-revalidate'
+    return response
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Wallet PIN Session Tokens
+Short-lived, scope-limited tokens issued by /api/wallet/pin/verify so the
+rest of a withdrawal flow does not re-run the bcrypt PIN check.
+"""
+
+import hashlib
+import hmac
+
+from flask import current_app, request
+from itsdangerous import BadSignature, SignatureExpired, URLSafeTimedSerializer
+
+PIN_SESSION_HEADER = 'X-Wallet-Pin-Session'
+PIN_SESSION_SALT = 'wallet-pin-session'
+DEFAULT_PIN_SESSION_TTL = 300  # seconds
+
+# Actions a PIN session token can be presented for
+PIN_SESSION_SCOPES = ('withdraw', 'withdrawal_status', 'wallet_transfer')
+
+
+def _serializer():
+    """Serializer keyed on the app secret, separate from the JWT secret"""
+    secret_key = current_app.config.get('SECRET_KEY')
+    return URLSafeTimedSerializer(secret_key, salt=PIN_SESSION_SALT)
+
+
+def _pin_fingerprint(user):
+    """Short digest of the stored PIN hash so a PIN change revokes old tokens"""
+    pin_hash = (user.wallet_pin or '').encode('utf-8')
+    return hashlib.sha256(pin_hash).hexdigest()[:16]
+
+
+def get_pin_session_ttl():
+    """Token lifetime in seconds (WALLET_PIN_SESSION_TTL overrides the default)"""
+    return int(current_app.config.get('WALLET_PIN_SESSION_TTL', DEFAULT_PIN_SESSION_TTL))
+
+
+def issue_pin_session_token(user, scopes=PIN_SESSION_SCOPES):
+    """Issue a token after a successful check_wallet_pin()"""
+    unknown = [scope for scope in scopes if scope not in PIN_SESSION_SCOPES]
+    if unknown:
+        raise ValueError(f"Unknown PIN session scopes: {unknown}")
+
+    payload = {
+        'uid': user.id,
+        'scp': list(scopes),
+        'pfp': _pin_fingerprint(user),
+    }
+    return {
+        'pin_session_token': _serializer().dumps(payload),
+        'pin_session_expires_in': get_pin_session_ttl(),
+        'pin_session_scopes': list(scopes),
+    }
+
+
+def verify_pin_session_token(token, user, scope):
+    """Return True if token is valid for this user and scope, without bcrypt"""
+    if not token or scope not in PIN_SESSION_SCOPES:
+        return False
+
+    try:
+        payload = _serializer().loads(token, max_age=get_pin_session_ttl())
+    except (SignatureExpired, BadSignature):
+        return False
+
+    if payload.get('uid') != user.id:
+        return False
+    if scope not in payload.get('scp', []):
+        return False
+    if user.is_pin_locked():
+        return False
+
+    return hmac.compare_digest(payload.get('pfp', ''), _pin_fingerprint(user))
+
+
+def get_request_pin_session_token(data=None):
+    """Token from the X-Wallet-Pin-Session header or the JSON body"""
+    token = request.headers.get(PIN_SESSION_HEADER)
+    if not token and data:
+        token = data.get('pin_session_token')
+    return token
+
+
+def check_pin_or_session(user, data, scope):
+    """
+    Authorize a sensitive wallet action.
+    A valid PIN session token is accepted first; otherwise this falls back
+    to the rate-limited check_wallet_pin() with the PIN from the body.
+    """
+    token = get_request_pin_session_token(data)
+    if token and verify_pin_session_token(token, user, scope):
+        return True
+
+    pin = (data or {}).get('pin')
+    if not pin:
+        return False
+    return user.check_wallet_pin(pin)
+
+
+if __name__ == "__main__":
+    from app import create_app
+    from app.models import User
+
+    app = create_app()
+    with app.app_context():
+        user = User.query.filter(User.wallet_pin.isnot(None)).first()
+        if not user:
+            print("❌ No user with a wallet PIN found")
+        else:
+            issued = issue_pin_session_token(user)
+            token = issued['pin_session_token']
+            print(f"✅ Issued token for {user.email}: {token[:24]}...")
+            print(f"   Expires in: {issued['pin_session_expires_in']}s")
+            print(f"   withdraw scope valid: {verify_pin_session_token(token, user, 'withdraw')}")
+            print(f"   tampered token valid: {verify_pin_session_token(token + 'x', user, 'withdraw')}")